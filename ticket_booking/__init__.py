@@ -0,0 +1,26 @@
+"""
+Ticket booking system.
+
+The domain model and storage backends can be imported without tkinter or a
+display; the GUI lives in ticket_booking.gui and is started with
+``python -m ticket_booking``.
+"""
+from .models import (
+    Admin,
+    Event,
+    Guest,
+    OrderConflictError,
+    PurchaseOrder,
+    Ticket,
+    TicketBookingSystem,
+    TicketType,
+    User,
+)
+from .storage import (
+    GuestPersistenceManager,
+    OrderJournal,
+    PickleStorage,
+    SQLiteStorage,
+    Storage,
+)
+from .text_export import TextExporter
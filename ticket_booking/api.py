@@ -0,0 +1,439 @@
+"""
+HTTP/JSON booking API served with asyncio.
+
+The event loop only parses requests and writes responses; every call into
+TicketBookingSystem runs on a single storage thread, which keeps blocking
+persistence off the loop and serialises access to the system.
+
+Endpoints:
+    GET    /tickets                          ticket catalog (?version= answers 304 if unchanged)
+    POST   /guests                           register a guest
+    GET    /guests/{guest_id}                guest details
+    GET    /guests/{guest_id}/history        purchase history (?cursor=&page_size=)
+    POST   /carts                            open a cart
+    GET    /carts/{cart_id}                  cart contents
+    POST   /carts/{cart_id}/items            add tickets (holds inventory)
+    DELETE /carts/{cart_id}                  abandon a cart (releases holds)
+    POST   /carts/{cart_id}/checkout         place the order (retry with the same idempotency_key)
+    GET    /sales                            sales for a day (?date=YYYY-MM-DD)
+    GET    /metrics                          metrics in Prometheus text format
+
+Run with ``python -m ticket_booking.api --port 8080``.
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import datetime
+import functools
+import itertools
+import json
+import logging
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+from .bulk_import import validate_row
+from .dates import format_date, parse_date
+from .inventory import HoldExpiredError, SoldOutError
+from .metrics import export_prometheus
+from .models import Guest, OrderConflictError, Ticket, TicketBookingSystem, TicketType
+from .storage import SQLiteStorage
+
+MAX_BODY_SIZE = 1024 * 1024
+MAX_CART_QUANTITY = 100
+MAX_PAGE_SIZE = 100
+
+logger = logging.getLogger(__name__)
+
+
+class APIError(Exception):
+    """An error reported to the client with an HTTP status and message."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class BookingAPI:
+    """Routes JSON requests to a TicketBookingSystem."""
+
+    def __init__(self, system: TicketBookingSystem):
+        self.__system = system
+        self.__executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="booking-storage")
+        self.__carts = {}  # cart_id -> list of cart lines
+        self.__cart_ids = itertools.count(1)
+        self.__catalog_record = None  # (Catalog, its JSON record), served until the catalog changes
+        self.__routes = [
+            ("GET", ("tickets",), self.get_tickets),
+            ("POST", ("guests",), self.register_guest),
+            ("GET", ("guests", None), self.get_guest),
+            ("GET", ("guests", None, "history"), self.get_history),
+            ("POST", ("carts",), self.create_cart),
+            ("GET", ("carts", None), self.get_cart),
+            ("POST", ("carts", None, "items"), self.add_cart_items),
+            ("DELETE", ("carts", None), self.delete_cart),
+            ("POST", ("carts", None, "checkout"), self.checkout),
+            ("GET", ("sales",), self.get_sales),
+            ("GET", ("metrics",), self.get_metrics),
+        ]
+
+    def get_system(self):
+        return self.__system
+
+    async def run_blocking(self, function, *args):
+        """Runs a call into the booking system on the storage thread."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.__executor, functools.partial(function, *args))
+
+    async def dispatch(self, method, target, body=b""):
+        """Handles one request and returns (status, JSON-serialisable payload)."""
+        url = urlsplit(target)
+        segments = tuple(segment for segment in url.path.split("/") if segment)
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        try:
+            data = json.loads(body) if body else {}
+            if not isinstance(data, dict):
+                raise APIError(HTTPStatus.BAD_REQUEST, "Request body should be a JSON object.")
+            handler, params = self.__route(method, segments)
+            return await self.run_blocking(handler, *params, query, data)
+        except json.JSONDecodeError:
+            return HTTPStatus.BAD_REQUEST, {"error": "Request body is not valid JSON."}
+        except APIError as error:
+            return error.status, {"error": str(error)}
+        except (SoldOutError, HoldExpiredError, OrderConflictError) as error:
+            return HTTPStatus.CONFLICT, {"error": str(error)}
+        except ValueError as error:
+            return HTTPStatus.BAD_REQUEST, {"error": str(error)}
+        except Exception:
+            logger.exception("Error handling %s %s", method, target)
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Internal server error."}
+
+    def __route(self, method, segments):
+        allowed = False
+        for route_method, pattern, handler in self.__routes:
+            if len(pattern) != len(segments):
+                continue
+            if any(part is not None and part != segment for part, segment in zip(pattern, segments)):
+                continue
+            if route_method != method:
+                allowed = True
+                continue
+            params = [segment for part, segment in zip(pattern, segments) if part is None]
+            return handler, params
+        if allowed:
+            raise APIError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} is not allowed here.")
+        raise APIError(HTTPStatus.NOT_FOUND, "Not found.")
+
+    def __find_guest(self, guest_id):
+        guest = self.__system.fetch_guest_by_id(guest_id)
+        if not guest:
+            raise APIError(HTTPStatus.NOT_FOUND, f"No guest with ID {guest_id}.")
+        return guest
+
+    def __find_cart(self, cart_id):
+        cart = self.__carts.get(cart_id)
+        if cart is None:
+            raise APIError(HTTPStatus.NOT_FOUND, f"No cart with ID {cart_id}.")
+        return cart
+
+    def __quote(self, cart, guest=None):
+        """Prices a cart as an online purchase, for guest once it is known."""
+        return self.__system.quote([(ticket_type, quantity, visit_date)
+                                    for ticket_type, visit_date, quantity, _ in cart], guest, online=True)
+
+    # Handlers, run on the storage thread
+
+    def get_tickets(self, query, data):
+        """
+        Returns the ticket catalog and its version. A client sending the
+        version it has as ?version= gets 304 with no body while it is current.
+        """
+        catalog = self.__system.get_catalog()
+        if query.get("version") == str(catalog.version):
+            return HTTPStatus.NOT_MODIFIED, None
+        cached = self.__catalog_record
+        if cached is None or cached[0] is not catalog:
+            cached = (catalog, catalog.record())
+            self.__catalog_record = cached
+        return HTTPStatus.OK, cached[1]
+
+    def register_guest(self, query, data):
+        guest_id, name, email, password, phone = validate_row(data)
+        if self.__system.fetch_guest_by_id(guest_id):
+            raise APIError(HTTPStatus.CONFLICT, f"Guest ID {guest_id} is already registered.")
+        guest = Guest(guest_id, name, email, password, phone, self.__system)
+        self.__system.register_new_guest(guest)
+        return HTTPStatus.CREATED, guest_record(guest)
+
+    def get_guest(self, guest_id, query, data):
+        return HTTPStatus.OK, guest_record(self.__find_guest(guest_id))
+
+    def get_history(self, guest_id, query, data):
+        guest = self.__find_guest(guest_id)
+        try:
+            page_size = int(query.get("page_size", 20))
+        except ValueError:
+            raise APIError(HTTPStatus.BAD_REQUEST, "Page size should be a whole number.")
+        page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+        records, next_cursor = guest.purchase_history_page(query.get("cursor"), page_size)
+        return HTTPStatus.OK, {"orders": records, "next_cursor": next_cursor}
+
+    def create_cart(self, query, data):
+        cart_id = str(next(self.__cart_ids))
+        self.__carts[cart_id] = []
+        return HTTPStatus.CREATED, {"cart_id": cart_id, "items": []}
+
+    def get_cart(self, cart_id, query, data):
+        return HTTPStatus.OK, cart_record(cart_id, self.__quote(self.__find_cart(cart_id)))
+
+    def add_cart_items(self, cart_id, query, data):
+        cart = self.__find_cart(cart_id)
+        try:
+            ticket_type = TicketType[str(data.get("ticket_type", "")).upper()]
+        except KeyError:
+            raise APIError(HTTPStatus.BAD_REQUEST, f"Unknown ticket type: {data.get('ticket_type')}")
+        visit_date = parse_date(data.get("visit_date"))
+        quantity = data.get("quantity", 1)
+        if not isinstance(quantity, int) or not 0 < quantity <= MAX_CART_QUANTITY:
+            raise APIError(HTTPStatus.BAD_REQUEST, f"Quantity should be between 1 and {MAX_CART_QUANTITY}.")
+
+        hold_id = self.__system.get_inventory().reserve(ticket_type, visit_date, quantity)
+        cart.append((ticket_type, visit_date, quantity, hold_id))
+        return HTTPStatus.OK, cart_record(cart_id, self.__quote(cart))
+
+    def delete_cart(self, cart_id, query, data):
+        cart = self.__carts.pop(cart_id, None)
+        if cart is None:
+            raise APIError(HTTPStatus.NOT_FOUND, f"No cart with ID {cart_id}.")
+        inventory = self.__system.get_inventory()
+        for _, _, _, hold_id in cart:
+            inventory.release(hold_id)
+        return HTTPStatus.OK, {"cart_id": cart_id, "deleted": True}
+
+    def checkout(self, cart_id, query, data):
+        """
+        Places the order of a cart. A retry sent with the same idempotency_key
+        gets the order placed the first time, with status 200, even after the
+        cart is gone; a key reused for another order is a conflict. The order
+        id is generated unless the client sends one.
+        """
+        guest = self.__find_guest(str(data.get("guest_id", "")))
+        idempotency_key = string_field(data, "idempotency_key")
+        payment_method = string_field(data, "payment_method", "Online")
+        cart = self.__carts.get(cart_id)
+        items = [(ticket_type, visit_date, quantity) for ticket_type, visit_date, quantity, _ in cart] \
+            if cart is not None else None
+        repeated = self.__system.find_repeated_order(idempotency_key, guest.get_guest_id(), items, payment_method)
+        if repeated is not None:
+            if cart is not None:
+                self.delete_cart(cart_id, query, data)  # The retry's seats are already in the first order
+            return HTTPStatus.OK, repeated.history_record()
+
+        cart = self.__find_cart(cart_id)
+        if not cart:
+            raise APIError(HTTPStatus.BAD_REQUEST, "The cart is empty.")
+        order_id = string_field(data, "order_id")
+        if order_id is not None and self.__system.fetch_order_by_id(order_id) is not None:
+            raise APIError(HTTPStatus.CONFLICT, f"Order ID {order_id} is already used.")
+
+        inventory = self.__system.get_inventory()
+        try:
+            inventory.commit_many([hold_id for _, _, _, hold_id in cart])  # All seats or none
+        except HoldExpiredError:
+            del self.__carts[cart_id]  # Its seats are given back already
+            raise
+
+        quote = self.__quote(cart, guest)
+        tickets = [
+            Ticket(self.__system.allocate_ticket_id(), line.unit_price, line.visit_date, line.ticket_type)
+            for line in quote.lines
+            for _ in range(line.quantity)
+        ]
+        total = quote.total
+        try:
+            order = guest.add_purchase_order(order_id, tickets, total, payment_method, idempotency_key)
+        except Exception:
+            # No order was placed, so the seats sold for it go back on sale
+            for ticket_type, visit_date, quantity, _ in cart:
+                inventory.cancel(ticket_type, visit_date, quantity)
+            del self.__carts[cart_id]
+            raise
+        del self.__carts[cart_id]  # Committing the order counted its sales
+        return HTTPStatus.CREATED, order.history_record()
+
+    def get_sales(self, query, data):
+        day = parse_date(query.get("date")) or datetime.date.today()
+        sales = self.__system.get_sales()
+        return HTTPStatus.OK, {
+            "date": day.isoformat(),
+            "total": sales.get_total(day),
+            "by_ticket_type": sales.get_totals_by_ticket_type(day),
+            "by_payment_method": sales.get_totals_by_payment_method(day),
+        }
+
+    def get_metrics(self, query, data):
+        return HTTPStatus.OK, export_prometheus()  # Plain text, see encode_response()
+
+    # HTTP server
+
+    async def handle_connection(self, reader, writer):
+        """Serves requests on one connection, keeping it open between requests."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, version = request_line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length", 0))
+                if length > MAX_BODY_SIZE:
+                    writer.write(encode_response(HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                                                 {"error": "Request body is too large."}, False))
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+                status, payload = await self.dispatch(method.upper(), target, body)
+                writer.write(encode_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass  # Malformed request or the client went away
+        finally:
+            writer.close()
+
+    async def flush_periodically(self, interval=1.0):
+        """Lets the write-behind guest queue flush while the server runs."""
+        while True:
+            await asyncio.sleep(interval)
+            await self.run_blocking(self.__system.flush_if_due)
+
+    async def serve(self, host="127.0.0.1", port=8080, backlog=4096):
+        server = await asyncio.start_server(self.handle_connection, host, port, backlog=backlog)
+        flusher = asyncio.create_task(self.flush_periodically())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            flusher.cancel()
+            await self.run_blocking(self.__system.close)
+            self.__executor.shutdown()
+
+
+def string_field(data, name, default=None):
+    """Returns the non-empty string sent as name, or default when it is missing or empty."""
+    value = data.get(name)
+    if value is None or value == "":
+        return default
+    if not isinstance(value, str):
+        raise APIError(HTTPStatus.BAD_REQUEST, f"{name} should be a string.")
+    return value
+
+
+def guest_record(guest):
+    return {
+        "guest_id": guest.get_guest_id(),
+        "name": guest.get_name(),
+        "email": guest.get_email(),
+        "phone": guest.get_phone(),
+    }
+
+
+def cart_record(cart_id, quote):
+    """Returns a cart as JSON from its Quote, which has one line per cart line."""
+    items = [
+        {
+            "ticket_type": line.ticket_type.name,
+            "visit_date": format_date(line.visit_date),
+            "quantity": line.quantity,
+            "unit_price": line.unit_price,
+            "discount": line.discount,
+            "discount_rule": line.rule.describe() if line.rule else None,
+        }
+        for line in quote.lines
+    ]
+    return {"cart_id": cart_id, "items": items, "total": quote.total}
+
+
+def encode_response(status, payload, keep_alive):
+    if payload is None:  # No body, e.g. 304 Not Modified
+        body = b""
+        content_type = None
+    elif isinstance(payload, str):
+        body = payload.encode()
+        content_type = "text/plain; version=0.0.4; charset=utf-8"
+    else:
+        body = json.dumps(payload, default=str).encode()
+        content_type = "application/json"
+    status = HTTPStatus(status)
+    head = (
+        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        + (f"Content-Type: {content_type}\r\n" if content_type else "")
+        + f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+        "\r\n"
+    )
+    return head.encode("latin-1") + body
+
+
+class TestResponse:
+    """Status and decoded JSON body returned by TestClient."""
+
+    def __init__(self, status, payload):
+        self.status = int(status)
+        self.json = payload
+
+
+class TestClient:
+    """
+    Calls a BookingAPI in-process, without a socket, for tests and scripts:
+
+        client = TestClient(BookingAPI(system))
+        response = await client.get("/tickets")
+    """
+
+    def __init__(self, api: BookingAPI):
+        self.__api = api
+
+    async def request(self, method, target, json_body=None):
+        body = json.dumps(json_body).encode() if json_body is not None else b""
+        status, payload = await self.__api.dispatch(method, target, body)
+        # Round-trip through JSON so tests see exactly what a client would
+        return TestResponse(status, json.loads(json.dumps(payload, default=str)))
+
+    async def get(self, target):
+        return await self.request("GET", target)
+
+    async def post(self, target, json_body=None):
+        return await self.request("POST", target, json_body)
+
+    async def delete(self, target):
+        return await self.request("DELETE", target)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the booking API over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--database", default="ticket_booking.db")
+    args = parser.parse_args(argv)
+
+    system = TicketBookingSystem(SQLiteStorage(args.database))
+    system.load_from_storage()
+    try:
+        asyncio.run(BookingAPI(system).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
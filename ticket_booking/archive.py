@@ -0,0 +1,449 @@
+"""
+Columnar archive of purchase orders for analytics.
+
+export_archive() writes every stored order and ticket as fixed-width NumPy
+records to flat binary files, with strings replaced by codes. Order and
+guest ids, one or nearly one per order, are written to string files of
+their own, an offsets array and a blob, while the few payment methods are
+kept in the manifest. OrderArchive maps the files into memory, so queries
+read straight from the page cache and work through the rows in chunks:
+scanning tens of millions of tickets needs memory for one chunk, not for
+the whole archive, and an id is only decoded when it is asked for.
+
+NumPy is optional for the rest of the package and only needed here.
+
+Run with ``python -m ticket_booking.archive export archive/`` and
+``python -m ticket_booking.archive report archive/``.
+"""
+import argparse
+import datetime
+import json
+import os
+import shutil
+import tempfile
+from collections import namedtuple
+
+from . import models
+from .storage import PickleStorage, SQLiteStorage
+
+try:
+    import numpy
+except ImportError:  # Optional dependency, checked when an archive is written or opened
+    numpy = None
+
+FORMAT_VERSION = 2
+MANIFEST_FILE = "manifest.json"
+ORDERS_FILE = "orders.bin"
+TICKETS_FILE = "tickets.bin"
+STRING_FILES = {  # Dictionary name -> (offsets file, blob file)
+    "order_ids": ("order_ids.offsets", "order_ids.strings"),
+    "guest_ids": ("guest_ids.offsets", "guest_ids.strings"),
+}
+CHUNK_ROWS = 1 << 20  # Rows handled per step, when writing and when scanning
+
+# Field layouts, little-endian so archives move between machines
+ORDER_FIELDS = [
+    ("order_code", "<i4"),     # Index of the order id in "order_ids", the order's own row
+    ("guest_code", "<i4"),     # Index of the guest id in "guest_ids", -1 for none
+    ("order_time", "<i8"),     # Seconds since 1970-01-01
+    ("order_month", "<i4"),    # Months since 1970-01
+    ("total_price", "<f8"),
+    ("payment_code", "<i2"),   # Index of the payment method in "payment_methods"
+    ("first_ticket", "<i8"),   # Row of the order's first ticket
+    ("ticket_count", "<i4"),
+]
+TICKET_FIELDS = [
+    ("order_row", "<i8"),
+    ("ticket_id", "<i8"),      # -1 for tickets whose id is not a number
+    ("ticket_type", "<i1"),    # Index in list(TicketType)
+    ("price", "<f8"),          # Price charged, after discounts
+    ("visit_ordinal", "<i4"),  # 0 for no visit date
+    ("order_month", "<i4"),    # Copied from the order, so ticket scans need no join
+]
+
+
+def require_numpy():
+    if numpy is None:
+        raise ImportError("The order archive needs NumPy, install it with 'pip install numpy'.")
+
+
+class StringDictionary:
+    """Assigns consecutive codes to distinct values, in first-seen order."""
+
+    def __init__(self, values=()):
+        self.__values = list(values)
+        self.__codes = {(type(value), value): code for code, value in enumerate(self.__values)}
+
+    def code(self, value):
+        key = (type(value), value)  # Keep guest id 1 apart from guest id "1"
+        code = self.__codes.get(key)
+        if code is None:
+            code = self.__codes[key] = len(self.__values)
+            self.__values.append(value)
+        return code
+
+    def value(self, code):
+        return self.__values[code]
+
+    def get_values(self):
+        return list(self.__values)
+
+
+class StringFileWriter:
+    """
+    Appends values to a string file: each value's JSON text, so guest id 1
+    and "1" stay apart, goes into the blob, and the offsets array holds
+    where each value ends, after a leading 0.
+    """
+
+    def __init__(self, directory, name, chunk_rows=CHUNK_ROWS):
+        offsets_name, blob_name = STRING_FILES[name]
+        self.__offsets_file = open(os.path.join(directory, offsets_name), "wb")
+        self.__blob_file = open(os.path.join(directory, blob_name), "wb")
+        self.__offsets = numpy.zeros(chunk_rows, "<i8")
+        self.__fill = 1  # The leading 0
+        self.__end = 0
+        self.__count = 0
+
+    def append(self, value):
+        data = json.dumps(value).encode()
+        self.__blob_file.write(data)
+        self.__end += len(data)
+        if self.__fill == len(self.__offsets):
+            self.__offsets_file.write(self.__offsets.tobytes())
+            self.__fill = 0
+        self.__offsets[self.__fill] = self.__end
+        self.__fill += 1
+        self.__count += 1
+
+    def __len__(self):
+        return self.__count
+
+    def close(self):
+        self.__offsets_file.write(self.__offsets[:self.__fill].tobytes())
+        self.__offsets_file.close()
+        self.__blob_file.close()
+
+
+class StreamedDictionary(StringDictionary):
+    """A StringDictionary whose new values are written to a string file as they come."""
+
+    def __init__(self, writer):
+        super().__init__()
+        self.__writer = writer
+
+    def code(self, value):
+        code = super().code(value)
+        if code == len(self.__writer):
+            self.__writer.append(value)
+        return code
+
+
+class MappedStrings(namedtuple("MappedStrings", "offsets blob")):
+    """A memory-mapped string file, decoding a value only when it is looked up."""
+
+    __slots__ = ()
+
+    def __getitem__(self, code):
+        if not 0 <= code < len(self):
+            raise IndexError(f"No value with code {code}.")
+        start, end = int(self.offsets[code]), int(self.offsets[code + 1])
+        return json.loads(self.blob[start:end].tobytes())
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+
+def month_index(moment):
+    return (moment.year - 1970) * 12 + moment.month - 1
+
+
+def check_archive_target(directory):
+    """
+    Raises ValueError unless directory is missing, empty or holds an archive,
+    so an export never replaces files that are not its own.
+    """
+    if not os.path.lexists(directory):
+        return
+    if not os.path.isdir(directory) or os.path.islink(directory):
+        raise ValueError(f"{directory} exists and is not a directory.")
+    if not os.listdir(directory):
+        return
+    try:
+        with open(os.path.join(directory, MANIFEST_FILE)) as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        manifest = None
+    if not isinstance(manifest, dict) or "version" not in manifest or "order_fields" not in manifest:
+        raise ValueError(f"{directory} is not empty and does not hold an order archive.")
+
+
+def export_archive(storage, directory, chunk_rows=CHUNK_ROWS, progress=None):
+    """
+    Writes every order in storage to a columnar archive in directory,
+    replacing any archive there; a directory holding anything else is
+    refused. Rows are buffered chunk_rows at a time, so memory stays flat
+    however many orders there are. Returns the manifest.
+    """
+    require_numpy()
+    directory = os.path.abspath(directory)
+    check_archive_target(directory)
+    parent, name = os.path.split(directory)
+    os.makedirs(parent, exist_ok=True)
+
+    # Written beside the old archive under a name of its own and swapped in at the end
+    temporary = tempfile.mkdtemp(prefix=name + ".tmp-", dir=parent)
+    try:
+        manifest = write_archive_files(storage, temporary, chunk_rows, progress)
+    except BaseException:
+        shutil.rmtree(temporary, ignore_errors=True)
+        raise
+
+    if not os.path.lexists(directory):
+        os.replace(temporary, directory)
+        return manifest
+    # The old archive is moved aside, not deleted, until the new one is in place
+    old = tempfile.mkdtemp(prefix=name + ".old-", dir=parent)
+    os.rmdir(old)
+    os.replace(directory, old)
+    try:
+        os.replace(temporary, directory)
+    except BaseException:
+        os.replace(old, directory)
+        shutil.rmtree(temporary, ignore_errors=True)
+        raise
+    shutil.rmtree(old, ignore_errors=True)
+    return manifest
+
+
+def write_archive_files(storage, temporary, chunk_rows, progress):
+    """Writes the archive files for storage into the new directory temporary, returning the manifest."""
+    order_dtype = numpy.dtype(ORDER_FIELDS)
+    ticket_dtype = numpy.dtype(TICKET_FIELDS)
+    ticket_types = {ticket_type: code for code, ticket_type in enumerate(models.TicketType)}
+    payment_methods = StringDictionary()
+
+    orders = numpy.zeros(chunk_rows, order_dtype)
+    tickets = numpy.zeros(chunk_rows, ticket_dtype)
+    order_count = ticket_count = 0
+    order_fill = ticket_fill = 0
+    order_ids = StringFileWriter(temporary, "order_ids", chunk_rows)  # Every order has its own
+    guest_id_file = StringFileWriter(temporary, "guest_ids", chunk_rows)
+    guest_ids = StreamedDictionary(guest_id_file)
+
+    with open(os.path.join(temporary, ORDERS_FILE), "wb") as orders_file, \
+            open(os.path.join(temporary, TICKETS_FILE), "wb") as tickets_file:
+        for guest_id, order in storage.iter_orders():
+            order_date = order.get_order_date()
+            month = month_index(order_date)
+            order_tickets = order.get_tickets()
+            order_ids.append(order.get_order_id())
+            orders[order_fill] = (
+                order_count,
+                -1 if guest_id is None else guest_ids.code(guest_id),
+                int((order_date - datetime.datetime(1970, 1, 1, tzinfo=order_date.tzinfo)).total_seconds()),
+                month,
+                order.get_total_price(),
+                payment_methods.code(order.get_payment_method()),
+                ticket_count,
+                len(order_tickets),
+            )
+            for ticket in order_tickets:
+                ticket_id = ticket.get_ticket_id()
+                tickets[ticket_fill] = (
+                    order_count,
+                    ticket_id if isinstance(ticket_id, int) else -1,
+                    ticket_types[ticket.get_type()],
+                    ticket.get_price(),
+                    ticket.get_visit_ordinal(),
+                    month,
+                )
+                ticket_fill += 1
+                ticket_count += 1
+                if ticket_fill == chunk_rows:
+                    tickets_file.write(tickets.tobytes())
+                    ticket_fill = 0
+            order_fill += 1
+            order_count += 1
+            if order_fill == chunk_rows:
+                orders_file.write(orders.tobytes())
+                order_fill = 0
+                if progress:
+                    progress(order_count)
+        orders_file.write(orders[:order_fill].tobytes())
+        tickets_file.write(tickets[:ticket_fill].tobytes())
+    order_ids.close()
+    guest_id_file.close()
+
+    manifest = {
+        "version": FORMAT_VERSION,
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "orders": order_count,
+        "tickets": ticket_count,
+        "order_fields": ORDER_FIELDS,
+        "ticket_fields": TICKET_FIELDS,
+        "ticket_types": [ticket_type.name for ticket_type in models.TicketType],
+        "payment_methods": payment_methods.get_values(),
+    }
+    with open(os.path.join(temporary, MANIFEST_FILE), "w") as file:
+        json.dump(manifest, file)
+    return manifest
+
+
+class OrderArchive:
+    """Read-only, memory-mapped view of an archive written by export_archive()."""
+
+    def __init__(self, directory):
+        require_numpy()
+        with open(os.path.join(directory, MANIFEST_FILE)) as file:
+            self.__manifest = json.load(file)
+        if self.__manifest["version"] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported archive version {self.__manifest['version']}.")
+        self.__orders = self.__map(directory, ORDERS_FILE, self.__manifest["order_fields"],
+                                   self.__manifest["orders"])
+        self.__tickets = self.__map(directory, TICKETS_FILE, self.__manifest["ticket_fields"],
+                                    self.__manifest["tickets"])
+        self.__ticket_types = self.__manifest["ticket_types"]
+        self.__strings = {name: self.__map_strings(directory, *file_names)
+                          for name, file_names in STRING_FILES.items()}
+
+    @staticmethod
+    def __map(directory, file_name, fields, count):
+        dtype = numpy.dtype([tuple(field) for field in fields])
+        if not count:
+            return numpy.zeros(0, dtype)  # numpy cannot map an empty file
+        return numpy.memmap(os.path.join(directory, file_name), dtype=dtype, mode="r", shape=(count,))
+
+    @staticmethod
+    def __map_strings(directory, offsets_name, blob_name):
+        offsets = numpy.memmap(os.path.join(directory, offsets_name), dtype="<i8", mode="r")
+        if not offsets[-1]:
+            return MappedStrings(offsets, numpy.zeros(0, numpy.uint8))
+        return MappedStrings(offsets, numpy.memmap(os.path.join(directory, blob_name), dtype=numpy.uint8, mode="r"))
+
+    def get_orders(self):
+        """Returns the order rows as a memory-mapped structured array."""
+        return self.__orders
+
+    def get_tickets(self):
+        """Returns the ticket rows as a memory-mapped structured array."""
+        return self.__tickets
+
+    def get_ticket_types(self):
+        return list(self.__ticket_types)
+
+    def get_manifest(self):
+        return dict(self.__manifest)
+
+    def decode(self, dictionary, code):
+        """Turns a code back into its value, e.g. decode("order_ids", row["order_code"])."""
+        strings = self.__strings.get(dictionary)
+        if strings is not None:
+            return strings[code]
+        return self.__manifest[dictionary][code]
+
+    def __len__(self):
+        return len(self.__orders)
+
+    @staticmethod
+    def __month_range(rows):
+        """Returns the first month and the number of months the rows span."""
+        if not len(rows):
+            return 0, 0
+        months = rows["order_month"]  # A strided view of the mapped file
+        first, last = int(months.min()), int(months.max())
+        return first, last - first + 1
+
+    @staticmethod
+    def __month_labels(first, count):
+        return [f"{1970 + (first + offset) // 12}-{(first + offset) % 12 + 1:02d}" for offset in range(count)]
+
+    def revenue_by_type_by_month(self):
+        """
+        Returns (months, ticket types, revenue) where revenue[m, t] is the
+        amount charged for tickets of type t in orders placed in month m.
+        """
+        first, count = self.__month_range(self.__tickets)
+        types = len(self.__ticket_types)
+        revenue = numpy.zeros(count * types)
+        for start in range(0, len(self.__tickets), CHUNK_ROWS):
+            chunk = self.__tickets[start:start + CHUNK_ROWS]  # A view, nothing is copied yet
+            cells = (chunk["order_month"].astype(numpy.int64) - first) * types + chunk["ticket_type"]
+            revenue += numpy.bincount(cells, weights=chunk["price"], minlength=count * types)
+        return self.__month_labels(first, count), self.get_ticket_types(), revenue.reshape(count, types)
+
+    def revenue_by_month(self):
+        """Returns (months, revenue) from the order totals."""
+        first, count = self.__month_range(self.__orders)
+        revenue = numpy.zeros(count)
+        for start in range(0, len(self.__orders), CHUNK_ROWS):
+            chunk = self.__orders[start:start + CHUNK_ROWS]
+            revenue += numpy.bincount(chunk["order_month"] - first, weights=chunk["total_price"],
+                                      minlength=count)
+        return self.__month_labels(first, count), revenue
+
+    def basket_size_by_month(self):
+        """Returns (months, average tickets per order, average order total)."""
+        first, count = self.__month_range(self.__orders)
+        orders = numpy.zeros(count)
+        tickets = numpy.zeros(count)
+        totals = numpy.zeros(count)
+        for start in range(0, len(self.__orders), CHUNK_ROWS):
+            chunk = self.__orders[start:start + CHUNK_ROWS]
+            months = chunk["order_month"] - first
+            orders += numpy.bincount(months, minlength=count)
+            tickets += numpy.bincount(months, weights=chunk["ticket_count"], minlength=count)
+            totals += numpy.bincount(months, weights=chunk["total_price"], minlength=count)
+        with numpy.errstate(invalid="ignore", divide="ignore"):
+            return self.__month_labels(first, count), tickets / orders, totals / orders
+
+    def average_basket_size(self):
+        """Returns (average tickets per order, average order total) over the whole archive."""
+        if not len(self.__orders):
+            return 0.0, 0.0
+        return (float(self.__orders["ticket_count"].mean(dtype=numpy.float64)),
+                float(self.__orders["total_price"].mean(dtype=numpy.float64)))
+
+
+def format_report(archive):
+    """Returns the revenue and basket size report printed by the command line."""
+    lines = [f"{len(archive)} orders, {len(archive.get_tickets())} tickets"]
+    tickets_per_order, order_total = archive.average_basket_size()
+    lines.append(f"Average basket: {tickets_per_order:.2f} tickets, DHS{order_total:.2f}")
+    months, ticket_types, revenue = archive.revenue_by_type_by_month()
+    for month, row in zip(months, revenue):
+        parts = [f"{name.replace('_', ' ').title()}: DHS{amount:.0f}"
+                 for name, amount in zip(ticket_types, row) if amount]
+        if parts:
+            lines.append(f"{month}  " + ", ".join(parts))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export orders to a columnar archive and query it.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_parser = commands.add_parser("export", help="Write every stored order to an archive.")
+    export_parser.add_argument("directory")
+    export_parser.add_argument("--database", help="SQLite database to export (default: the pickle files).")
+    report_parser = commands.add_parser("report", help="Print revenue and basket size from an archive.")
+    report_parser.add_argument("directory")
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        try:
+            check_archive_target(os.path.abspath(args.directory))
+        except ValueError as error:
+            parser.error(str(error))
+        storage =SQLiteStorage(args.database) if args.database else PickleStorage()
+        try:
+            manifest = export_archive(storage, args.directory,
+                                      progress=lambda count: print(f"{count} orders", flush=True))
+        finally:
+            storage.close()
+        print(f"Archived {manifest['orders']} orders and {manifest['tickets']} tickets to {args.directory}.")
+    else:
+        print(format_report(OrderArchive(args.directory)))
+
+
+if __name__ == "__main__":
+    main()
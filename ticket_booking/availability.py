@@ -0,0 +1,153 @@
+"""
+Availability calendar: remaining capacity of every ticket type on every day
+of a season, held in dense NumPy arrays so whole-season questions are
+answered with vectorised operations instead of loops over orders.
+
+NumPy is optional for the rest of the package and only needed here.
+"""
+import datetime
+import threading
+
+from . import models
+from .dates import parse_date
+
+try:
+    import numpy
+except ImportError:  # Optional dependency, checked when a calendar is created
+    numpy = None
+
+
+class AvailabilityCalendar:
+    """
+    Sold tickets and capacity per (day, TicketType) for ``days`` days from
+    start_date. Rows are days and columns follow get_ticket_types().
+
+    The calendar listens to the TicketInventory, so every committed hold and
+    every cancellation updates the one cell it touches. Unlimited ticket
+    types have an infinite capacity. Seats on hold are not counted as sold.
+    """
+
+    def __init__(self, inventory, start_date=None, days=365):
+        if numpy is None:
+            raise ImportError("The availability calendar needs NumPy, install it with 'pip install numpy'.")
+        if days <= 0:
+            raise ValueError("The calendar should cover at least one day.")
+        self.__inventory = inventory
+        self.__start_date = parse_date(start_date) or datetime.date.today()
+        self.__days = days
+        self.__ticket_types = list(models.TicketType)
+        self.__columns = {ticket_type: column for column, ticket_type in enumerate(self.__ticket_types)}
+        self.__capacity = numpy.full((days, len(self.__ticket_types)), numpy.inf)
+        self.__sold = numpy.zeros((days, len(self.__ticket_types)), dtype=numpy.int64)
+        self.__lock = threading.Lock()
+
+        for ticket_type in self.__ticket_types:
+            self.__refresh(ticket_type, None)
+        inventory.add_listener(self.__refresh)
+
+    def __getstate__(self):
+        # The arrays are rebuilt from the inventory, which is the source of truth
+        return {"inventory": self.__inventory, "start_date": self.__start_date, "days": self.__days}
+
+    def __setstate__(self, state):
+        self.__init__(state["inventory"], state["start_date"], state["days"])
+
+    def close(self):
+        """Stops following the inventory."""
+        self.__inventory.remove_listener(self.__refresh)
+
+    def get_start_date(self):
+        return self.__start_date
+
+    def get_days(self):
+        return self.__days
+
+    def get_ticket_types(self):
+        """Returns the TicketTypes in column order."""
+        return list(self.__ticket_types)
+
+    def get_dates(self):
+        """Returns the dates in row order."""
+        return [self.__start_date + datetime.timedelta(days=row) for row in range(self.__days)]
+
+    def __row(self, visit_date):
+        """Returns the row of a date, or None if it is outside the calendar."""
+        if visit_date is None:
+            return None
+        row = (visit_date - self.__start_date).days
+        return row if 0 <= row < self.__days else None
+
+    def __rows(self, start_date, end_date):
+        """Returns the slice of rows from start_date to end_date, both inclusive."""
+        start = 0 if start_date is None else (parse_date(start_date) - self.__start_date).days
+        end = self.__days if end_date is None else (parse_date(end_date) - self.__start_date).days + 1
+        return slice(min(max(start, 0), self.__days), min(max(end, 0), self.__days))
+
+    def __refresh(self, ticket_type, visit_date):
+        """
+        Re-reads one cell, or the whole column when visit_date is None, from
+        the inventory. Reading under the lock means a late notification can
+        never overwrite a newer count with an older one.
+        """
+        column = self.__columns[ticket_type]
+        if visit_date is None:
+            dates = self.get_dates()
+            with self.__lock:
+                self.__capacity[:, column] = [self.__capacity_value(ticket_type, day) for day in dates]
+                self.__sold[:, column] = [self.__inventory.get_sold(ticket_type, day) for day in dates]
+            return
+        row = self.__row(visit_date)
+        if row is None:
+            return
+        with self.__lock:
+            self.__capacity[row, column] = self.__capacity_value(ticket_type, visit_date)
+            self.__sold[row, column] = self.__inventory.get_sold(ticket_type, visit_date)
+
+    def __capacity_value(self, ticket_type, visit_date):
+        capacity = self.__inventory.get_capacity(ticket_type, visit_date)
+        return numpy.inf if capacity is None else capacity
+
+    def remaining(self, start_date=None, end_date=None):
+        """Returns a days x ticket types array of seats left, inf where unlimited."""
+        rows = self.__rows(start_date, end_date)
+        with self.__lock:
+            return numpy.maximum(self.__capacity[rows] - self.__sold[rows], 0)
+
+    def range_minimum(self, start_date=None, end_date=None):
+        """
+        Returns the fewest seats left on any day of the range for each ticket
+        type, i.e. how many tickets valid on every one of those days can still be sold.
+        """
+        remaining = self.remaining(start_date, end_date)
+        if not len(remaining):
+            raise ValueError("The range is outside the calendar.")
+        return remaining.min(axis=0)
+
+    def sold_out_days(self, ticket_type=None, start_date=None, end_date=None):
+        """
+        Returns the dates on which a ticket type, or any limited ticket type
+        if none is given, has no seats left.
+        """
+        rows = self.__rows(start_date, end_date)
+        remaining = self.remaining(start_date, end_date)
+        if ticket_type is None:
+            sold_out = (remaining <= 0).any(axis=1)
+        else:
+            sold_out = remaining[:, self.__columns[ticket_type]] <= 0
+        return [self.__start_date + datetime.timedelta(days=int(rows.start + row))
+                for row in numpy.flatnonzero(sold_out)]
+
+    def utilisation(self, start_date=None, end_date=None):
+        """
+        Returns a days x ticket types heatmap of the share of capacity sold,
+        from 0.0 to 1.0, with NaN for unlimited ticket types.
+        """
+        rows = self.__rows(start_date, end_date)
+        with self.__lock:
+            capacity = self.__capacity[rows].copy()
+            sold = self.__sold[rows].copy()
+        heatmap = numpy.full(capacity.shape, numpy.nan)
+        limited = numpy.isfinite(capacity) & (capacity > 0)
+        numpy.divide(sold, capacity, out=heatmap, where=limited)
+        heatmap[numpy.isfinite(capacity) & (capacity == 0)] = 1.0  # Nothing to sell counts as full
+        return heatmap
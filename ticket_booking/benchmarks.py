@@ -0,0 +1,310 @@
+"""
+Benchmarks for the ticket booking system.
+
+Every benchmark builds its data with a seeded generator, so runs with the
+same seed and size are comparable between versions, and runs inside a
+temporary directory, so the guest and event .txt files never land in the
+working directory. Results are printed, or written with --output, as JSON.
+
+Run with ``python -m ticket_booking.benchmarks all --sizes 1000 10000``.
+"""
+import argparse
+import contextlib
+import datetime
+import gc
+import json
+import os
+import pickle
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from .models import Guest, Ticket, TicketBookingSystem, TicketType
+from .pricing import DEFAULT_PRICES
+from .storage import PickleStorage, SQLiteStorage
+
+DEFAULT_SIZES = (1000, 10000, 100000, 1000000)
+LOOKUPS = 1000  # Queries timed per benchmark, whatever the data size
+FIRST_NAMES = ("Aisha", "Omar", "Fatima", "Khalid", "Mariam", "Saeed", "Noura", "Hamdan", "Layla", "Yousef")
+LAST_NAMES = ("Al Mansoori", "Al Hashemi", "Al Nuaimi", "Al Ketbi", "Al Shamsi", "Al Zaabi", "Al Falasi")
+PAYMENT_METHODS = ("Credit Card", "Digital Wallet", "Cash")
+STORAGES = {
+    "pickle": PickleStorage,
+    "sqlite": SQLiteStorage,
+}
+
+
+class SyntheticData:
+    """
+    Seeded generator of guests, orders and events. Guest ids run from 1 and
+    names repeat, like real guest lists, so name lookups hit shared names.
+    """
+
+    def __init__(self, seed=0, first_day=datetime.date(2025, 1, 1)):
+        self.__random = random.Random(seed)
+        self.__first_day = first_day
+
+    def guest_rows(self, count):
+        """Yields (guest_id, name, email, password, phone) tuples."""
+        for guest_id in range(1, count + 1):
+            name = f"{self.__random.choice(FIRST_NAMES)} {self.__random.choice(LAST_NAMES)}"
+            if self.__random.random() < 0.5:
+                name += f" {guest_id}"  # Half the names are unique
+            yield (guest_id, name, f"guest{guest_id}@example.com", f"password{guest_id}",
+                   f"05{self.__random.randrange(10 ** 8):08d}")
+
+    def visit_date(self):
+        return self.__first_day + datetime.timedelta(days=self.__random.randrange(365))
+
+    def order_rows(self, count, guest_count, next_ticket_id):
+        """
+        Yields (order_id, guest_id, tickets, total_price, payment_method) with
+        one to four tickets of mixed types per order. next_ticket_id is called
+        for each ticket's id.
+        """
+        ticket_types = list(TicketType)
+        for number in range(1, count + 1):
+            tickets = [
+                Ticket(next_ticket_id(), DEFAULT_PRICES[ticket_type.name], self.visit_date(), ticket_type)
+                for ticket_type in self.__random.choices(ticket_types, k=self.__random.randint(1, 4))
+            ]
+            total = sum(ticket.get_price() for ticket in tickets)
+            yield (f"ORD-{number}", self.__random.randint(1, guest_count), tickets, total,
+                   self.__random.choice(PAYMENT_METHODS))
+
+    def event_rows(self, count):
+        """Yields (name, start_date, end_date) tuples of events lasting one to seven days."""
+        for number in range(1, count + 1):
+            start = self.visit_date()
+            yield (f"Event {number}", start, start + datetime.timedelta(days=self.__random.randrange(7)))
+
+    def sample(self, items, count):
+        return [self.__random.choice(items) for _ in range(count)]
+
+
+@contextlib.contextmanager
+def temporary_directory():
+    """Runs the block inside a fresh temporary directory."""
+    previous = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="ticket_booking_bench_") as directory:
+        os.chdir(directory)
+        try:
+            yield directory
+        finally:
+            os.chdir(previous)
+
+
+def timed(function, *args):
+    """Returns (seconds taken, result) of calling function."""
+    gc.collect()
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def result(benchmark, count, operations, seconds, **extra):
+    return {
+        "benchmark": benchmark,
+        "records": count,
+        "operations": operations,
+        "seconds": round(seconds, 6),
+        "microseconds_per_operation": round(seconds * 1e6 / max(operations, 1), 3),
+        **extra,
+    }
+
+
+def add_guests(system, data, count):
+    """Creates count guests in one write-behind batch, without .txt files."""
+    with system.get_guest_persistence().batch(write_text_files=False):
+        for row in data.guest_rows(count):
+            system.register_new_guest(Guest(*row, system))
+
+
+def add_orders(system, data, count, guest_count):
+    guests = system.get_registered_guests()
+    for order_id, guest_number, tickets, total, payment_method in data.order_rows(
+            count, guest_count, system.allocate_ticket_id):
+        guests[guest_number - 1].add_purchase_order(order_id, tickets, total, payment_method)
+
+
+def build_system(count, seed, storage="sqlite", orders=None):
+    """Returns a system holding count guests and ``orders`` orders (default count)."""
+    data = SyntheticData(seed)
+    system = TicketBookingSystem(STORAGES[storage]())
+    add_guests(system, data, count)
+    add_orders(system, data, count if orders is None else orders, count)
+    system.flush()
+    return system, data
+
+
+def bench_guest_construction(count, seed=0, storage="sqlite"):
+    """Creating and registering guests, including their batched write to storage."""
+    with temporary_directory():
+        system = TicketBookingSystem(STORAGES[storage]())
+        seconds, _ = timed(add_guests, system, SyntheticData(seed), count)
+        system.close()
+    return result("guest_construction", count, count, seconds, storage=storage)
+
+
+def bench_order_persistence(count, seed=0, storage="sqlite"):
+    """Placing purchase orders, each committed to storage with its sales counters."""
+    with temporary_directory():
+        data = SyntheticData(seed)
+        guest_count = max(count // 10, 1)
+        system = TicketBookingSystem(STORAGES[storage]())
+        add_guests(system, data, guest_count)
+
+        def place_orders():
+            add_orders(system, data, count, guest_count)
+            system.flush()
+
+        seconds, _ = timed(place_orders)
+        system.close()
+    return result("order_persistence", count, count, seconds, storage=storage)
+
+
+def bench_fetch_guest_by_name(count, seed=0, storage="sqlite"):
+    """Looking guests up by name among count registered guests."""
+    with temporary_directory():
+        system, data = build_system(count, seed, storage, orders=0)
+        names = data.sample([guest.get_name() for guest in system.get_registered_guests()], LOOKUPS)
+        seconds, _ = timed(lambda: [system.fetch_guest_by_name(name) for name in names])
+        system.close()
+    return result("fetch_guest_by_name", count, len(names), seconds, storage=storage)
+
+
+def bench_purchase_history(count, seed=0, storage="sqlite"):
+    """Rendering the purchase history of guests, read from storage, with count orders stored."""
+    with temporary_directory():
+        system, data = build_system(count, seed, storage)
+        system.close()
+        system = TicketBookingSystem(STORAGES[storage]())
+        system.load_from_storage()  # Orders are read from storage, not from memory
+        guests = data.sample(system.get_registered_guests(), min(LOOKUPS, count))
+        seconds, _ = timed(lambda: [guest.purchase_history() for guest in guests])
+        system.close()
+    return result("purchase_history", count, len(guests), seconds, storage=storage)
+
+
+def bench_get_tickets(count, seed=0, storage="sqlite"):
+    """Listing the ticket types as sample Tickets, count times."""
+    with temporary_directory():
+        system = TicketBookingSystem(STORAGES[storage]())
+        seconds, _ = timed(lambda: [system.get_tickets() for _ in range(count)])
+        system.close()
+    return result("get_tickets", count, count, seconds)
+
+
+def bench_get_catalog(count, seed=0, storage="sqlite"):
+    """Reading the ticket catalog snapshot, count times."""
+    with temporary_directory():
+        system = TicketBookingSystem(STORAGES[storage]())
+        seconds, _ = timed(lambda: [system.get_catalog() for _ in range(count)])
+        system.close()
+    return result("get_catalog", count, count, seconds)
+
+
+def bench_pickle_startup(count, seed=0, storage="pickle"):
+    """Loading count guests and their orders from the pickle files at startup."""
+    with temporary_directory():
+        system, _ = build_system(count, seed, "pickle")
+        system.close()
+        file_bytes = sum(os.path.getsize(name) for name in os.listdir(".") if os.path.isfile(name))
+
+        def start_up():
+            restored = TicketBookingSystem(PickleStorage())
+            restored.load_from_storage()
+            return restored
+
+        seconds, restored = timed(start_up)
+        restored.close()
+    return result("pickle_startup", count, 1, seconds, storage="pickle", file_bytes=file_bytes)
+
+
+def measure_ticket_memory(count=100000, seed=0, storage=None):
+    """
+    Measures the memory and pickle size per Ticket when ``count`` tickets
+    with mixed types and visit dates are alive at once.
+    """
+    rng = random.Random(seed)
+    ticket_types = list(TicketType)
+    first_day = datetime.date(2025, 1, 1).toordinal()
+
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    tickets = [
+        Ticket(ticket_id, 275, first_day + rng.randrange(365), rng.choice(ticket_types))
+        for ticket_id in range(count)
+    ]
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    pickled = pickle.dumps(tickets, pickle.HIGHEST_PROTOCOL)
+    list_overhead = sys.getsizeof(tickets)
+    return {
+        "benchmark": "ticket_memory",
+        "tickets": count,
+        "bytes_per_ticket": round((after - before - list_overhead) / count, 1),
+        "pickle_bytes_per_ticket": round(len(pickled) / count, 1),
+    }
+
+
+BENCHMARKS = {
+    "guest-construction": bench_guest_construction,
+    "order-persistence": bench_order_persistence,
+    "fetch-guest-by-name": bench_fetch_guest_by_name,
+    "purchase-history": bench_purchase_history,
+    "get-tickets": bench_get_tickets,
+    "get-catalog": bench_get_catalog,
+    "pickle-startup": bench_pickle_startup,
+    "ticket-memory": measure_ticket_memory,
+}
+
+
+def run(names, sizes, seed=0, storage="sqlite", progress=None):
+    """Runs the named benchmarks at every size and returns the JSON report."""
+    results = []
+    for name in names:
+        for size in sizes:
+            if progress:
+                progress(name, size)
+            results.append(BENCHMARKS[name](size, seed=seed, storage=storage))
+    return {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": seed,
+        "storage": storage,
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run ticket booking benchmarks.")
+    parser.add_argument("benchmark", nargs="+", choices=sorted(BENCHMARKS) + ["all"])
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES),
+                        help="Numbers of records to run each benchmark with.")
+    parser.add_argument("--count", type=int, help="Run with this one size instead of --sizes.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--storage", choices=sorted(STORAGES), default="sqlite")
+    parser.add_argument("--output", help="Write the JSON report to this file.")
+    args = parser.parse_args(argv)
+
+    names = list(BENCHMARKS) if "all" in args.benchmark else args.benchmark
+    sizes = [args.count] if args.count else args.sizes
+    report = run(names, sizes, args.seed, args.storage,
+                 progress=lambda name, size: print(f"{name} x {size}", file=sys.stderr))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Bulk import of guests from CSV, JSON Lines or JSON array files.
+
+Rows are streamed from the file and validated in chunks, and all imported
+guests are written to storage in a single flush at the end. Run it from the
+command line with ``python -m ticket_booking.bulk_import guests.csv``.
+"""
+import argparse
+import csv
+import itertools
+import json
+import sys
+import time
+
+from .models import Guest, TicketBookingSystem, normalise_guest_id
+from .storage import SQLiteStorage
+from .text_export import TextExporter
+
+REQUIRED_FIELDS = ("guest_id", "name", "email", "phone")
+DEFAULT_PASSWORD = "password123"  # Same default the registration window uses
+
+
+class ImportReport:
+    """Outcome of a bulk guest import."""
+
+    def __init__(self):
+        self.__imported = 0
+        self.__duplicates = 0
+        self.__errors = []  # (row number, message)
+        self.__started = time.perf_counter()
+        self.__seconds = 0.0
+
+    def get_imported(self):
+        return self.__imported
+
+    def get_duplicates(self):
+        return self.__duplicates
+
+    def get_errors(self):
+        return self.__errors
+
+    def get_rows(self):
+        return self.__imported + self.__duplicates + len(self.__errors)
+
+    def get_seconds(self):
+        return self.__seconds
+
+    def get_rows_per_second(self):
+        return self.get_rows() / self.__seconds if self.__seconds else 0.0
+
+    def add_imported(self, count):
+        self.__imported += count
+
+    def add_duplicates(self, count):
+        self.__duplicates += count
+
+    def add_error(self, row_number, message):
+        self.__errors.append((row_number, message))
+
+    def stop_clock(self):
+        self.__seconds = time.perf_counter() - self.__started
+
+    def __str__(self):
+        return (f"{self.__imported} imported, {self.__duplicates} duplicates, "
+                f"{len(self.__errors)} errors in {self.__seconds:.2f}s "
+                f"({self.get_rows_per_second():.0f} rows/s)")
+
+
+def detect_format(path):
+    """Returns "csv", "jsonl" or "json" based on the file extension."""
+    path = path.lower()
+    if path.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    if path.endswith(".json"):
+        return "json"
+    return "csv"
+
+
+def read_rows(file, file_format):
+    """
+    Yields one dict per guest row. CSV and JSON Lines are streamed; a JSON
+    file holds one array of rows and is read whole. JSON that cannot be
+    parsed is yielded as a ValueError in place of its row, so that
+    validate_row() reports it and the import carries on.
+    """
+    if file_format == "csv":
+        yield from csv.DictReader(file)
+    elif file_format == "jsonl":
+        for line_number, line in enumerate(file, start=1):
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as error:
+                    yield ValueError(f"Invalid JSON on line {line_number}: {error.msg}.")
+    elif file_format == "json":
+        try:
+            rows = json.load(file)
+        except json.JSONDecodeError as error:
+            yield ValueError(f"Invalid JSON on line {error.lineno}: {error.msg}.")
+            return
+        if isinstance(rows, list):
+            yield from rows
+        else:
+            yield ValueError("A JSON file must hold an array of rows.")
+    else:
+        raise ValueError(f"Unknown import format: {file_format}")
+
+
+def validate_row(row):
+    """Returns the cleaned row, or raises ValueError explaining what is wrong."""
+    if isinstance(row, ValueError):  # Unreadable row from read_rows()
+        raise row
+    if not isinstance(row, dict):
+        raise ValueError("Row is not an object.")
+    missing = [field for field in REQUIRED_FIELDS if not str(row.get(field) or "").strip()]
+    if missing:
+        raise ValueError(f"Missing {', '.join(missing)}.")
+    if isinstance(row["guest_id"], bool) or not isinstance(row["guest_id"], (str, int)):
+        raise ValueError(f"Invalid guest_id: {row['guest_id']!r}")
+    email = str(row["email"]).strip()
+    if "@" not in email:
+        raise ValueError(f"Invalid email: {email}")
+    return (
+        normalise_guest_id(row["guest_id"]),
+        str(row["name"]).strip(),
+        email,
+        str(row.get("password") or DEFAULT_PASSWORD),
+        str(row["phone"]).strip(),
+    )
+
+
+def import_guests(system, rows, replace_existing=False, chunk_size=1000,
+                  write_text_files=False, progress=None):
+    """
+    Imports guest rows into the system and writes them to storage in one flush.
+
+    Rows are validated a chunk at a time. A guest_id that is already
+    registered, or repeated in the input, is counted as a duplicate and
+    skipped unless replace_existing is set. progress, if given, is called
+    with the report after every chunk.
+    """
+    report = ImportReport()
+    numbered_rows = enumerate(rows, start=1)
+
+    with system.get_guest_persistence().batch(write_text_files=write_text_files):
+        while True:
+            chunk = list(itertools.islice(numbered_rows, chunk_size))
+            if not chunk:
+                break
+
+            for row_number, row in chunk:
+                try:
+                    guest_id, name, email, password, phone = validate_row(row)
+                except ValueError as error:
+                    report.add_error(row_number, str(error))
+                    continue
+
+                if system.fetch_guest_by_id(guest_id) and not replace_existing:
+                    report.add_duplicates(1)
+                    continue
+
+                system.register_new_guest(Guest(guest_id, name, email, password, phone, system))
+                report.add_imported(1)
+
+            report.stop_clock()
+            if progress is not None:
+                progress(report)
+
+    report.stop_clock()  # Include the final flush
+    return report
+
+
+def import_file(system, path, file_format=None, **options):
+    """Imports guests from a CSV, JSON Lines or JSON file, see import_guests()."""
+    file_format = file_format or detect_format(path)
+    with open(path, newline="", encoding="utf-8") as file:
+        return import_guests(system, read_rows(file, file_format), **options)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import guests from CSV, JSON Lines or JSON.")
+    parser.add_argument("path", help="CSV file with a header row, JSON Lines file, or JSON array file")
+    parser.add_argument("--format", choices=("csv", "jsonl", "json"), help="defaults to the file extension")
+    parser.add_argument("--database", default="ticket_booking.db", help="SQLite database to import into")
+    parser.add_argument("--replace", action="store_true", help="replace guests whose id already exists")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--text-files", action="store_true", help="also write a guest_<id>.txt file per guest")
+    parser.add_argument("--consolidated-text-file",
+                        help="with --text-files, write every guest to this one file instead")
+    args = parser.parse_args(argv)
+
+    def print_progress(report):
+        print(f"{report.get_rows()} rows, {report.get_rows_per_second():.0f} rows/s", file=sys.stderr)
+
+    system = TicketBookingSystem(SQLiteStorage(args.database),
+                                 TextExporter(consolidated_file=args.consolidated_text_file))
+    system.load_from_storage()  # Existing guests are needed to detect duplicates
+    try:
+        report = import_file(
+            system, args.path, args.format,
+            replace_existing=args.replace,
+            chunk_size=args.chunk_size,
+            write_text_files=args.text_files,
+            progress=print_progress,
+        )
+    finally:
+        system.close()
+
+    print(report)
+    for row_number, message in report.get_errors()[:20]:
+        print(f"  row {row_number}: {message}", file=sys.stderr)
+    return 1 if report.get_errors() else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,264 @@
+"""
+Cart of the purchase window: a quantity per ticket type and visit date,
+priced as it changes, and the order summary shown beside it.
+"""
+from collections import namedtuple
+
+from .dates import format_date, parse_date
+from .pricing import Quote
+
+
+class Cart:
+    """
+    Tickets being bought, one line per (TicketType, visit date) with a
+    quantity, in the order the lines were first added.
+
+    Discounts depend on how many tickets of a type the cart holds, so a
+    change reprices only the lines of the ticket types it touched, and the
+    total is kept from per-type subtotals rather than summed over the cart.
+    add_many() and remove_many() return the keys of the lines that changed,
+    for views that redraw only those.
+
+    Given an inventory, the cart holds seats for its tickets: adding
+    reserves them, all or nothing, removing releases them, and
+    commit_holds() turns them into sales when the order is placed.
+    """
+
+    def __init__(self, system, guest=None, online=False, inventory=None):
+        self.__system = system
+        self.__guest = guest
+        self.__online = online
+        self.__inventory = inventory
+        self.__quantities = {}   # (TicketType, visit date) -> quantity, in the order added
+        self.__by_type = {}      # TicketType -> {key: None} of its lines, in the order added
+        self.__lines = {}        # Key -> priced QuoteLine
+        self.__type_totals = {}  # TicketType -> total price of its lines
+        self.__holds = {}        # Key -> [(hold_id, quantity)] in the inventory
+        self.__total = 0
+        self.__ticket_count = 0
+
+    def __len__(self):
+        return len(self.__quantities)
+
+    def get_guest(self):
+        return self.__guest
+
+    def set_guest(self, guest):
+        """Sets the guest buying, whose renewals may change prices. Returns the keys of the lines that changed."""
+        self.__guest = guest
+        return self.__reprice(set(self.__by_type))
+
+    def get_total(self):
+        return self.__total
+
+    def get_ticket_count(self):
+        return self.__ticket_count
+
+    def get_quantity(self, ticket_type, visit_date):
+        return self.__quantities.get((ticket_type, parse_date(visit_date)), 0)
+
+    def get_line(self, ticket_type, visit_date):
+        """Returns the priced QuoteLine of a ticket type and visit date, or None."""
+        return self.__lines.get((ticket_type, parse_date(visit_date)))
+
+    def get_lines(self):
+        """Returns the priced QuoteLines, in cart order."""
+        return [self.__lines[key] for key in self.__quantities]
+
+    def get_items(self):
+        """Returns the cart as (ticket type, visit date, quantity) items, in cart order."""
+        return [(ticket_type, visit_date, quantity)
+                for (ticket_type, visit_date), quantity in self.__quantities.items()]
+
+    def quote(self):
+        """Returns the cart as a Quote, without pricing it again."""
+        return Quote(self.get_lines(), self.__total)
+
+    def add(self, ticket_type, visit_date, quantity=1):
+        return self.add_many([(ticket_type, visit_date, quantity)])
+
+    def remove(self, ticket_type, visit_date, quantity=None):
+        return self.remove_many([(ticket_type, visit_date, quantity)])
+
+    def add_many(self, items):
+        """
+        Adds (ticket type, visit date, quantity) items. With an inventory,
+        raises SoldOutError and leaves the cart unchanged if any of them
+        cannot be held. Returns the keys of the lines that changed, in cart
+        order.
+        """
+        items = [(ticket_type, parse_date(visit_date), quantity) for ticket_type, visit_date, quantity in items]
+        for _, _, quantity in items:
+            if not isinstance(quantity, int) or quantity <= 0:
+                raise ValueError("Quantity should be a positive whole number.")
+
+        holds = []
+        if self.__inventory is not None:
+            try:
+                for ticket_type, visit_date, quantity in items:
+                    holds.append(self.__inventory.reserve(ticket_type, visit_date, quantity))
+            except Exception:
+                for hold_id in holds:
+                    self.__inventory.release(hold_id)
+                raise
+
+        touched = set()
+        for position, (ticket_type, visit_date, quantity) in enumerate(items):
+            key = (ticket_type, visit_date)
+            self.__quantities[key] = self.__quantities.get(key, 0) + quantity
+            self.__by_type.setdefault(ticket_type, {})[key] = None
+            self.__ticket_count += quantity
+            if holds:
+                self.__holds.setdefault(key, []).append((holds[position], quantity))
+            touched.add(ticket_type)
+        return self.__reprice(touched)
+
+    def remove_many(self, items):
+        """
+        Removes (ticket type, visit date, quantity) items; a quantity of None,
+        or more than the cart holds, removes the whole line. Returns the keys
+        of the lines that changed: the removed lines, then the others in
+        cart order.
+        """
+        touched = set()
+        removed = []
+        for ticket_type, visit_date, quantity in items:
+            key = (ticket_type, parse_date(visit_date))
+            held = self.__quantities.get(key, 0)
+            if not held:
+                continue
+            quantity = held if quantity is None else min(quantity, held)
+            if quantity <= 0:
+                continue
+            self.__release(key, quantity)
+            self.__ticket_count -= quantity
+            if quantity == held:
+                del self.__quantities[key]
+                del self.__lines[key]
+                del self.__by_type[ticket_type][key]
+                if not self.__by_type[ticket_type]:
+                    del self.__by_type[ticket_type]
+                removed.append(key)
+            else:
+                self.__quantities[key] = held - quantity
+            touched.add(ticket_type)
+        return removed + self.__reprice(touched)
+
+    def clear(self):
+        """Empties the cart, releasing its held seats. Returns the keys of the removed lines."""
+        return self.remove_many([(ticket_type, visit_date, None)
+                                 for ticket_type, visit_date in list(self.__quantities)])
+
+    def __release(self, key, quantity):
+        """Gives back quantity held seats of a line, latest holds first."""
+        holds = self.__holds.get(key)
+        while holds and quantity > 0:
+            hold_id, held = holds.pop()
+            if held > quantity:
+                self.__inventory.release(hold_id, quantity)
+                holds.append((hold_id, held - quantity))
+            else:
+                self.__inventory.release(hold_id)
+            quantity -= held
+        if key in self.__holds and not holds:
+            del self.__holds[key]
+
+    def __reprice(self, ticket_types):
+        """Prices the lines of the given ticket types again. Returns the keys of the lines that changed."""
+        changed = set()
+        for ticket_type in ticket_types:
+            keys = list(self.__by_type.get(ticket_type, ()))
+            quote = self.__system.quote(
+                [(ticket_type, self.__quantities[key], key[1]) for key in keys], self.__guest, self.__online)
+            for key, line in zip(keys, quote.lines):
+                if self.__lines.get(key) != line:
+                    self.__lines[key] = line
+                    changed.add(key)
+            self.__total += quote.total - self.__type_totals.pop(ticket_type, 0)
+            if keys:
+                self.__type_totals[ticket_type] = quote.total
+        if len(changed) <= 1:
+            return list(changed)
+        return [key for key in self.__quantities if key in changed]
+
+    def commit_holds(self):
+        """
+        Turns the held seats into sales, before the order is recorded, all
+        or nothing. Raises HoldExpiredError if a hold expired, after giving
+        back every seat of the cart; it must then be filled again.
+        """
+        holds = [hold_id for key_holds in self.__holds.values() for hold_id, _ in key_holds]
+        self.__holds = {}
+        self.__inventory.commit_many(holds)
+
+    def release_holds(self):
+        """Gives back every seat the cart holds, e.g. when the window is closed."""
+        for key_holds in self.__holds.values():
+            for hold_id, _ in key_holds:
+                self.__inventory.release(hold_id)
+        self.__holds = {}
+
+
+class SummaryEdit(namedtuple("SummaryEdit", "action row text")):
+    """One change to the summary: "insert", "replace" or "delete" the row at a 0-based index."""
+
+    __slots__ = ()
+
+
+class CartSummary:
+    """
+    Order summary of a Cart as rows of text: one row per cart line, then a
+    blank row and the total. update() returns edits for only the rows of the
+    lines that changed and the total, so a view showing the summary redraws
+    as little for a long order as for a short one.
+    """
+
+    def __init__(self):
+        self.__keys = []  # Cart line key shown on each row, top to bottom
+        self.__rows = []
+        self.__total = self.format_total(0)
+
+    @staticmethod
+    def format_line(line):
+        name = line.ticket_type.name.replace("_", " ").title()
+        text = f"{name} x{line.quantity} on {format_date(line.visit_date)} - DHS{line.unit_price:g}"
+        if line.discount:
+            text += f" (DHS{line.discount:g} off each)"
+        return text
+
+    @staticmethod
+    def format_total(total):
+        return f"Total Price: DHS{total:g}"
+
+    def get_rows(self):
+        """Returns the rows of the summary, blank row and total included."""
+        return self.__rows + ["", self.__total]
+
+    def get_text(self):
+        return "\n".join(self.get_rows())
+
+    def update(self, cart, changed):
+        """
+        Brings the rows of the cart lines with the given keys up to date, see
+        Cart.add_many(). Returns the SummaryEdits made, in the order to
+        apply them.
+        """
+        edits = []
+        for key in changed:
+            line = cart.get_line(*key)
+            row = self.__keys.index(key) if key in self.__keys else None
+            if line is None:
+                if row is not None:  # Removed from the cart
+                    del self.__keys[row]
+                    del self.__rows[row]
+                    edits.append(SummaryEdit("delete", row, None))
+            elif row is None:  # New line, added above the blank row
+                self.__keys.append(key)
+                self.__rows.append(self.format_line(line))
+                edits.append(SummaryEdit("insert", len(self.__rows) - 1, self.__rows[-1]))
+            else:
+                self.__rows[row] = self.format_line(line)
+                edits.append(SummaryEdit("replace", row, self.__rows[row]))
+        self.__total = self.format_total(cart.get_total())
+        edits.append(SummaryEdit("replace", len(self.__rows) + 1, self.__total))
+        return edits
@@ -0,0 +1,60 @@
+"""
+Versioned snapshots of the ticket catalog: every ticket type with its list
+price, descriptive texts and current discounts.
+"""
+from collections import namedtuple
+
+from . import models
+
+
+class CatalogEntry(namedtuple(
+        "CatalogEntry", "ticket_type price description limitations validity discount_available")):
+    """One ticket type as listed in the catalog."""
+
+    __slots__ = ()
+
+    def record(self):
+        """Returns the entry as plain values, as served by the API."""
+        return {
+            "ticket_type": self.ticket_type.name,
+            "price": self.price,
+            "description": self.description,
+            "limitations": self.limitations,
+            "validity": self.validity,
+            "discount_available": self.discount_available,
+        }
+
+
+class Catalog(namedtuple("Catalog", "version entries")):
+    """
+    The catalog at one version of the prices and discount rules, with one
+    entry per ticket type in TicketType order. A snapshot is never changed:
+    an edit to the prices or rules gives a new snapshot with a different
+    version, so readers can share one and hold on to it safely.
+    """
+
+    __slots__ = ()
+
+    def get(self, ticket_type):
+        """Returns the entry of a ticket type, or None."""
+        for entry in self.entries:
+            if entry.ticket_type is ticket_type:
+                return entry
+        return None
+
+    def record(self):
+        """Returns the catalog as plain values, as served by the API."""
+        return {"version": self.version, "tickets": [entry.record() for entry in self.entries]}
+
+
+def build_catalog(version, prices, rules):
+    """Builds the catalog snapshot of one version of the prices and discount rules."""
+    entries = []
+    for ticket_type in models.TicketType:
+        if ticket_type not in prices:
+            continue
+        info = models.TICKET_TYPE_CATALOG[ticket_type]
+        discounts = [rule.describe() for rule in rules if rule.ticket_type == ticket_type]
+        entries.append(CatalogEntry(ticket_type, prices[ticket_type], info.description, info.limitations,
+                                    info.validity, " ".join(discounts) if discounts else "None."))
+    return Catalog(version, tuple(entries))
@@ -0,0 +1,43 @@
+"""
+Parsing and formatting of the dates typed into the booking system.
+"""
+import datetime
+
+# Day/month/year is how dates are entered in the GUI, ISO dates are accepted too
+DATE_FORMATS = ("%d/%m/%Y", "%Y-%m-%d")
+
+
+def parse_date(value):
+    """
+    Returns a datetime.date for a date, ordinal int or date string, or None
+    for an empty value. Raises ValueError for text that is not a date.
+    """
+    if value is None or value == "" or value == 0:
+        return None
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    if isinstance(value, int):
+        return datetime.date.fromordinal(value)
+    text = str(value).strip()
+    if not text:
+        return None
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(text, date_format).date()
+        except ValueError:
+            pass
+    raise ValueError(f"Invalid date: {value} (expected DD/MM/YYYY)")
+
+
+def to_ordinal(value):
+    """Returns the proleptic Gregorian ordinal of a date, or 0 for no date."""
+    day = parse_date(value)
+    return day.toordinal() if day else 0
+
+
+def format_date(value):
+    """Formats a date the way it is entered, e.g. 2/12/2024, or "" for no date."""
+    day = parse_date(value)
+    return f"{day.day}/{day.month}/{day.year}" if day else ""
@@ -0,0 +1,102 @@
+"""
+Interval index over events, answering "which events overlap these dates".
+"""
+
+
+class IntervalNode:
+    """
+    Node of a centered interval tree: holds the events spanning its center,
+    sorted by start and by end, plus subtrees for the events ending before
+    and starting after the center.
+    """
+
+    __slots__ = ("center", "by_start", "by_end", "left", "right")
+
+    def __init__(self, intervals):
+        endpoints = sorted(point for start, end, _ in intervals for point in (start, end))
+        self.center = endpoints[len(endpoints) // 2]
+        here, left, right = [], [], []
+        for interval in intervals:
+            if interval[1] < self.center:
+                left.append(interval)
+            elif interval[0] > self.center:
+                right.append(interval)
+            else:
+                here.append(interval)
+        self.by_start = sorted(here, key=lambda interval: interval[0])
+        self.by_end = sorted(here, key=lambda interval: interval[1], reverse=True)
+        self.left = IntervalNode(left) if left else None
+        self.right = IntervalNode(right) if right else None
+
+    def collect(self, start, end, found):
+        if end < self.center:
+            # Every interval here reaches the center, so it overlaps if it starts by ``end``
+            for interval in self.by_start:
+                if interval[0] > end:
+                    break
+                found.append(interval[2])
+            if self.left:
+                self.left.collect(start, end, found)
+        elif start > self.center:
+            for interval in self.by_end:
+                if interval[1] < start:
+                    break
+                found.append(interval[2])
+            if self.right:
+                self.right.collect(start, end, found)
+        else:
+            found.extend(interval[2] for interval in self.by_start)
+            if self.left:
+                self.left.collect(start, end, found)
+            if self.right:
+                self.right.collect(start, end, found)
+
+
+class EventIndex:
+    """
+    Finds the events overlapping a date or date range in O(log n + k).
+
+    Events change rarely compared to how often they are looked up, so add()
+    and remove() only mark the tree stale and it is rebuilt on the next query.
+    """
+
+    def __init__(self, events=()):
+        self.__events = {}  # id(event) -> event
+        self.__root = None
+        self.__stale = False
+        for event in events:
+            self.add(event)
+
+    def add(self, event):
+        self.__events[id(event)] = event
+        self.__stale = True
+
+    def remove(self, event):
+        if self.__events.pop(id(event), None) is not None:
+            self.__stale = True
+
+    def __len__(self):
+        return len(self.__events)
+
+    def __build(self):
+        intervals = [(event.get_start_date(), event.get_end_date(), event)
+                     for event in self.__events.values()]
+        self.__root = IntervalNode(intervals) if intervals else None
+        self.__stale = False
+
+    def overlapping(self, start_date, end_date=None):
+        """
+        Returns the events overlapping start_date..end_date (both inclusive),
+        or on start_date alone, ordered by start date.
+        """
+        if end_date is None:
+            end_date = start_date
+        if end_date < start_date:
+            raise ValueError("End date should not be before the start date.")
+        if self.__stale:
+            self.__build()
+        found = []
+        if self.__root is not None:
+            self.__root.collect(start_date, end_date, found)
+        found.sort(key=lambda event: (event.get_start_date(), event.get_end_date()))
+        return found
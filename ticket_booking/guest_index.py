@@ -0,0 +1,142 @@
+"""
+Prefix index over guest names, emails and phone numbers, for search as you type.
+"""
+import bisect
+
+PHONE_PUNCTUATION = " -+()."
+
+
+def search_keys(guest):
+    """
+    Returns the keys a guest is found by: the name, every later word of the
+    name (so "Al" and "Mansoori" both find "Aisha Al Mansoori"), the email
+    and the digits of the phone number.
+    """
+    name = guest.get_name().casefold().strip()
+    words = name.split()
+    keys = {name, guest.get_email().casefold().strip()}
+    keys.update(" ".join(words[position:]) for position in range(1, len(words)))
+    phone = "".join(character for character in str(guest.get_phone()) if character.isdigit())
+    if phone:
+        keys.add(phone)
+    keys.discard("")
+    return tuple(sorted(keys))
+
+
+def normalise_query(text):
+    text = " ".join(text.casefold().split())
+    if text and all(character.isdigit() or character in PHONE_PUNCTUATION for character in text):
+        digits = "".join(character for character in text if character.isdigit())
+        return digits or text
+    return text
+
+
+def id_order(guest_id):
+    """
+    Sort key of a guest id. Ids are ints or strings depending on where the
+    guest was registered, which cannot be compared with each other.
+    """
+    return type(guest_id).__name__, str(guest_id)
+
+
+class GuestSearchIndex:
+    """
+    Sorted list of (key, id_order(guest_id), guest_id) entries, searched by
+    prefix with bisect.
+
+    Guests are registered in bulk at startup and one at a time afterwards, so
+    add() and remove() do not touch the sorted list: additions wait in a
+    pending list merged in on the next search, and removed or outdated
+    entries are skipped at search time until enough of them pile up to be
+    worth dropping. Searches iterate over a list that is replaced, never
+    modified, so a search in progress is not disturbed by later changes.
+    """
+
+    def __init__(self, guests=()):
+        self.__entries = []   # Sorted (key, id_order(guest_id), guest_id)
+        self.__pending = []   # Entries added since the last merge
+        self.__guests = {}    # guest_id -> (Guest, its keys when indexed)
+        self.__dead = 0       # Entries in __entries that no longer match a live guest
+        for guest in guests:
+            self.add(guest)
+
+    def __len__(self):
+        return len(self.__guests)
+
+    def add(self, guest):
+        guest_id = guest.get_guest_id()
+        if guest_id in self.__guests:
+            self.remove(self.__guests[guest_id][0])
+        keys = search_keys(guest)
+        self.__guests[guest_id] = (guest, keys)
+        order = id_order(guest_id)
+        self.__pending.extend((key, order, guest_id) for key in keys)
+
+    def remove(self, guest):
+        indexed = self.__guests.get(guest.get_guest_id())
+        if indexed is None or indexed[0] is not guest:
+            return
+        del self.__guests[guest.get_guest_id()]
+        self.__dead += len(indexed[1])
+
+    def __merge(self):
+        if self.__dead > len(self.__entries) // 2:
+            # Mostly outdated: rebuild from the live guests, dropping duplicates too
+            self.__entries = sorted((key, id_order(guest_id), guest_id)
+                                    for guest_id, (_, keys) in self.__guests.items() for key in keys)
+            self.__dead = 0
+        elif self.__pending:
+            entries = self.__entries + self.__pending
+            entries.sort()  # The old entries are one sorted run, so this costs about sorting the additions
+            self.__entries = entries
+        self.__pending = []
+
+    def iter_matches(self, text):
+        """
+        Yields the guests with a key starting with text, in key order and
+        each guest once, as they are found. Pull as many as are needed.
+        An empty text yields every guest, in the order they were added.
+        """
+        prefix = normalise_query(text)
+        if not prefix:
+            yield from [guest for guest, _ in self.__guests.values()]
+            return
+        if self.__pending or self.__dead > len(self.__entries) // 2:
+            self.__merge()
+        entries = self.__entries  # Replaced, never modified, by later merges
+        position = bisect.bisect_left(entries, (prefix,))
+        seen = set()
+        while position < len(entries):
+            key, _, guest_id = entries[position]
+            if not key.startswith(prefix):
+                break
+            position += 1
+            indexed = self.__guests.get(guest_id)
+            if guest_id in seen or indexed is None or key not in indexed[1]:
+                continue
+            seen.add(guest_id)
+            yield indexed[0]
+
+    def search(self, text, limit=20):
+        """Returns the first ``limit`` guests matching text, see iter_matches()."""
+        found = []
+        for guest in self.iter_matches(text):
+            found.append(guest)
+            if len(found) >= limit:
+                break
+        return found
+
+    def count_upper_bound(self, text):
+        """
+        Returns the number of index entries matching text, in O(log n). A guest
+        matched by several keys is counted once per key, so this is an upper
+        bound on the number of guests, good enough to size a scrollbar.
+        """
+        prefix = normalise_query(text)
+        if not prefix:
+            return len(self.__guests)
+        if self.__pending:
+            self.__merge()
+        start = bisect.bisect_left(self.__entries, (prefix,))
+        end = bisect.bisect_left(self.__entries, (prefix + "\U0010ffff",))
+        return end - start
@@ -0,0 +1,1205 @@
+"""
+Tkinter front end of the ticket booking system.
+
+Only this module imports tkinter, so the domain model in ticket_booking can
+be used without a display. Start it with main().
+"""
+import datetime
+import tkinter as tk
+import tkinter.messagebox as messagebox
+
+from . import metrics
+from .cart import Cart, CartSummary
+from .dates import format_date, parse_date
+from .inventory import HoldExpiredError, SoldOutError
+from .models import (Admin, Guest, OrderConflictError, Ticket, TicketBookingSystem, TicketType,
+                     format_history_record)
+from .pricing import AMOUNT, PERCENT, DiscountRule
+from .storage import SQLiteStorage
+
+HISTORY_PAGE_SIZE = 20  # Orders shown per page in the purchase history window
+
+system = None  # TicketBookingSystem, created by main()
+admin = None
+root = None
+
+
+def create_system(database="ticket_booking.db"):
+    """Creates the booking system, loading saved data and seeding it on first launch."""
+    system = TicketBookingSystem(SQLiteStorage(database))
+    system.load_from_storage()  # Guests and events saved by earlier sessions
+
+    # Seed the sample guests and events on the first launch only
+    if not system.get_registered_guests():
+        # Create Guest instances with reference to the system (Aggregation relationship)
+        guest_1 = Guest(1, "Abdulla", "Abdulla_Alremeithi@gmail.com", "2837003", "0501234567", system)
+        system.register_new_guest(guest_1)
+
+        guest_2 = Guest(2, "Bu Khalfan", "Bu_Khalfan@gmail.com", "8726384", "0503456789", system)
+        system.register_new_guest(guest_2)
+
+        guest_3 = Guest(3, "Afshan", "Afshan@gmail.com", "23894682", "0509876543", system)
+        system.register_new_guest(guest_3)
+
+    if not system.get_events():
+        # Create Events associated with the system (Binary relationship)
+        system.create_event("National Day", "2/12/2024", "3/12/2024")
+        system.create_event("Your Voice Campaign", "16/11/2024", "17/11/2024")
+        system.create_event("Emirati Women's Day", "1/11/2024", "2/11/2024")
+        system.create_event("Flag Day", "3/11/2024", "4/11/2024")
+
+    return system
+
+
+class GuestPicker:
+    """
+    Search box over the registered guests, with the matches listed below it.
+
+    Matches come from the system's prefix index as the list is scrolled, and
+    only the rows in view are put in the Listbox, so the picker opens and
+    searches as fast with a hundred thousand guests as with three.
+    """
+
+    def __init__(self, master, rows=6, on_select=None):
+        self.__rows = rows
+        self.__on_select = on_select
+        self.__matches = iter(())
+        self.__loaded = []          # Guests pulled from the index so far
+        self.__exhausted = False
+        self.__offset = 0           # Position of the first row in view
+        self.__total_hint = 0       # Upper bound on the matches, for the scrollbar
+        self.__selected = None
+
+        self.__frame = tk.Frame(master, bg="#FFE4C4")
+        self.__entry = tk.Entry(self.__frame, font=("Times", 12), width=24)
+        self.__entry.grid(row=0, column=0, columnspan=2, sticky="we")
+        self.__listbox = tk.Listbox(self.__frame, font=("Times", 10), height=rows, width=30,
+                                    exportselection=False)
+        self.__listbox.grid(row=1, column=0, sticky="we")
+        self.__scrollbar = tk.Scrollbar(self.__frame, orient="vertical", command=self.__scroll)
+        self.__scrollbar.grid(row=1, column=1, sticky="ns")
+        self.__selected_label = tk.Label(self.__frame, text="", font=("Times", 10, "italic"),
+                                         bg="#FFE4C4", fg="#4B4B4B")
+        self.__selected_label.grid(row=2, column=0, columnspan=2, sticky="w")
+
+        self.__entry.bind("<KeyRelease>", self.__search)
+        self.__listbox.bind("<<ListboxSelect>>", self.__pick)
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.__listbox.bind(sequence, self.__wheel)
+
+        self.__search()
+        if self.__loaded:
+            self.__set_selected(self.__loaded[0])  # Like the old dropdown, start on the first guest
+
+    def grid(self, **options):
+        self.__frame.grid(**options)
+
+    def get_guest(self):
+        """Returns the selected Guest, or None."""
+        return self.__selected
+
+    def __search(self, _event=None):
+        text = self.__entry.get()
+        self.__matches = system.iter_guest_matches(text)
+        self.__loaded = []
+        self.__exhausted = False
+        self.__offset = 0
+        self.__total_hint = system.count_guest_matches(text)
+        self.__render()
+
+    def __load(self, count):
+        """Pulls matches from the index until count are loaded or there are no more."""
+        while len(self.__loaded) < count and not self.__exhausted:
+            guest = next(self.__matches, None)
+            if guest is None:
+                self.__exhausted = True
+            else:
+                self.__loaded.append(guest)
+
+    def __render(self):
+        self.__load(self.__offset + self.__rows)
+        visible = self.__loaded[self.__offset:self.__offset + self.__rows]
+        self.__listbox.delete(0, tk.END)
+        if not visible:
+            self.__listbox.insert(tk.END, "No matching guests.")
+        for position, guest in enumerate(visible):
+            self.__listbox.insert(tk.END, f"{guest.get_name()} - {guest.get_email()}")
+            if guest is self.__selected:
+                self.__listbox.selection_set(position)
+
+        total = len(self.__loaded) if self.__exhausted else max(self.__total_hint, len(self.__loaded) + 1)
+        if total:
+            self.__scrollbar.set(self.__offset / total, (self.__offset + len(visible)) / total)
+        else:
+            self.__scrollbar.set(0, 1)
+
+    def __scroll_to(self, offset):
+        self.__load(offset + self.__rows)
+        self.__offset = max(0, min(offset, len(self.__loaded) - self.__rows))
+        self.__render()
+
+    def __scroll(self, action, amount, unit=None):
+        """Scrollbar command: ("moveto", fraction) or ("scroll", count, "units" or "pages")."""
+        if action == "moveto":
+            total = len(self.__loaded) if self.__exhausted else self.__total_hint
+            self.__scroll_to(int(float(amount) * total))
+        else:
+            step = self.__rows if unit == "pages" else 1
+            self.__scroll_to(self.__offset + int(amount) * step)
+
+    def __wheel(self, event):
+        up = getattr(event, "num", None) == 4 or getattr(event, "delta", 0) > 0
+        self.__scroll_to(self.__offset + (-1 if up else 1))
+        return "break"
+
+    def __pick(self, _event=None):
+        selection = self.__listbox.curselection()
+        if not selection or self.__offset + selection[0] >= len(self.__loaded):
+            return
+        self.__set_selected(self.__loaded[self.__offset + selection[0]])
+
+    def __set_selected(self, guest):
+        self.__selected = guest
+        self.__selected_label.config(text=f"Selected: {guest.get_name()} (ID {guest.get_guest_id()})")
+        if self.__on_select:
+            self.__on_select(guest)
+
+
+class CartSummaryView:
+    """
+    Shows a CartSummary in a Text widget, applying only the edits of each
+    update, so adding to a long order redraws as little as adding to a
+    short one.
+    """
+
+    def __init__(self, text):
+        self.__text = text
+        self.__summary = CartSummary()
+        self.__edit(lambda: text.insert("1.0", self.__summary.get_text()))
+
+    def __edit(self, change):
+        self.__text.configure(state="normal")
+        change()
+        self.__text.configure(state="disabled")
+
+    def update(self, cart, changed):
+        """Redraws the rows of the cart lines with the given keys, see Cart.add_many()."""
+        edits = self.__summary.update(cart, changed)
+        self.__edit(lambda: self.__apply(edits))
+
+    def __apply(self, edits):
+        text = self.__text
+        for action, row, line in edits:
+            row += 1  # Text widget rows count from 1
+            if action == "delete":
+                text.delete(f"{row}.0", f"{row + 1}.0")
+            elif action == "insert":
+                text.insert(f"{row}.0", line + "\n")
+            else:
+                text.delete(f"{row}.0", f"{row}.end")
+                text.insert(f"{row}.0", line)
+
+
+def open_registration_window():
+    reg_window = tk.Toplevel(root)
+    reg_window.title("Registration Window")
+    reg_window.geometry("400x400")
+    reg_window.configure(bg="#FFE4C4")
+
+    reg_label = tk.Label(
+        reg_window,
+        text="Register a New Guest",
+        font=("Times", 16, "bold"),
+        bg="#FFE4C4",
+        fg="#4B4B4B",
+    )
+    reg_label.pack(pady=20)
+
+    id_label = tk.Label(reg_window, text="Guest ID:", font=(
+        "Times", 12), bg="#FFE4C4", fg="#4B4B4B")
+    id_label.pack(anchor="w", padx=40, pady=5)
+    id_entry = tk.Entry(reg_window, font=("Times", 12), width=30)
+    id_entry.pack(padx=40, pady=5)
+
+    name_label = tk.Label(reg_window, text="Name:", font=(
+        "Times", 12), bg="#FFE4C4", fg="#4B4B4B")
+    name_label.pack(anchor="w", padx=40, pady=5)
+    name_entry = tk.Entry(reg_window, font=("Times", 12), width=30)
+    name_entry.pack(padx=40, pady=5)
+
+    email_label = tk.Label(reg_window, text="Email:", font=(
+        "Times", 12), bg="#FFE4C4", fg="#4B4B4B")
+    email_label.pack(anchor="w", padx=40, pady=5)
+    email_entry = tk.Entry(reg_window, font=("Times", 12), width=30)
+    email_entry.pack(padx=40, pady=5)
+
+    phone_label = tk.Label(reg_window, text="Phone Number:", font=(
+        "Times", 12), bg="#FFE4C4", fg="#4B4B4B")
+    phone_label.pack(anchor="w", padx=40, pady=5)
+    phone_entry = tk.Entry(reg_window, font=("Times", 12), width=30)
+    phone_entry.pack(padx=40, pady=5)
+
+    def submit_registration():
+        guest_id = id_entry.get()
+        name = name_entry.get()
+        email = email_entry.get()
+        phone = phone_entry.get()
+
+        if not guest_id or not name or not email or not phone:
+            messagebox.showerror("Error", "All fields are required!")
+            return
+
+        # Default password for new guests (you can improve this)
+        default_password = "password123"
+
+        # Create the Guest object with all required parameters
+        guest = Guest(guest_id, name, email, default_password, phone, system)
+        system.register_new_guest(guest)
+
+        messagebox.showinfo(
+            "Success", f"Guest Registered:\n\nName: {name}\nEmail: {email}\nPhone: {phone}"
+        )
+        reg_window.destroy()
+
+    submit_button = tk.Button(
+        reg_window,
+        text="Submit",
+        font=("Times", 12, "bold"),
+        bg="#008CBA",
+        fg="white",
+        width=15,
+        command=submit_registration,
+    )
+    submit_button.pack(pady=20)
+
+
+def open_delete_guest_window():
+    delete_window = tk.Toplevel(root)
+    delete_window.title("Guest Delete Window")
+    delete_window.geometry("400x400")
+    delete_window.configure(bg="#FFE4C4")
+
+    # Label for the window
+    delete_label = tk.Label(
+        delete_window,
+        text="Delete a Guest",
+        font=("Times", 16, "bold"),
+        bg="#FFE4C4",
+        fg="#4B4B4B",
+    )
+    delete_label.pack(pady=20)
+
+    id_label = tk.Label(
+        delete_window,
+        text="Enter Guest ID:",
+        font=("Times", 12),
+        bg="#FFE4C4",
+        fg="#4B4B4B",
+    )
+    id_label.pack(anchor="w", padx=40, pady=5)
+
+    id_entry = tk.Entry(delete_window, font=("Times", 12), width=30)
+    id_entry.pack(padx=40, pady=10)
+
+    def delete_guest():
+        guest_id = id_entry.get()
+        if not guest_id:
+            messagebox.showerror("Error", "Guest ID cannot be empty!")
+            return
+
+        res = system.delete_guest(guest_id)
+        if res:
+            messagebox.showinfo(
+                "Success", f"Guest with ID {guest_id} has been deleted successfully!")
+            delete_window.destroy()
+        else:
+            messagebox.showerror(
+                "Failure", f"Guest with ID {guest_id} Not Found!")
+            delete_window.destroy()
+
+    delete_button = tk.Button(
+        delete_window,
+        text="Delete",
+        font=("Times", 12, "bold"),
+        bg="#008CBA",
+        fg="white",
+        width=15,
+        command=delete_guest,
+    )
+    delete_button.pack(pady=20)
+
+
+def open_purchase_ticket_window():
+    ticket_window = tk.Toplevel(root)
+    ticket_window.title("Purchase Ticket")
+    ticket_window.geometry("680x620")
+    ticket_window.configure(bg="#FFE4C4")
+
+    ticket_types = {
+        "Single Day Pass": TicketType.SINGLE_DAY_PASS,
+        "Two Day Pass": TicketType.TWO_DAY_PASS,
+        "Annual Membership": TicketType.ANNUAL_MEMBERSHIP,
+        "Child Ticket": TicketType.CHILD_TICKET,
+        "Group Ticket": TicketType.GROUP_TICKET,
+        "VIP Experience Pass": TicketType.VIP_EXPERIENCE_PASS,
+    }
+    # Tickets added so far, priced as they change, with their seats held until confirmed
+    cart = Cart(system, inventory=system.get_inventory())
+
+    # Order ids are generated; an optional reference keeps a repeated submission from ordering twice
+    reference_label = tk.Label(
+        ticket_window, text="Reference (optional):", font=("Times", 12), bg="#FFE4C4", fg="#4B4B4B"
+    )
+    reference_label.grid(row=0, column=0, padx=10, pady=10, sticky="w")
+
+    reference_entry = tk.Entry(ticket_window, font=("Times", 12), width=20)
+    reference_entry.grid(row=0, column=1, padx=10, pady=10)
+
+    guest_label = tk.Label(
+        ticket_window, text="Select Guest:", font=("Times", 12), bg="#FFE4C4", fg="#4B4B4B"
+    )
+    guest_label.grid(row=1, column=0, padx=10, pady=10, sticky="nw")
+
+    def select_guest(guest):
+        # Renewal discounts depend on the guest, so the cart is re-priced when another one is picked
+        changed = cart.set_guest(guest)
+        if changed:
+            summary.update(cart, changed)
+
+    guest_picker = GuestPicker(ticket_window, on_select=select_guest)
+    guest_picker.grid(row=1, column=1, padx=10, pady=10)
+
+    ticket_label = tk.Label(
+        ticket_window, text="Select Ticket Type:", font=("Times", 12), bg="#FFE4C4", fg="#4B4B4B"
+    )
+    ticket_label.grid(row=2, column=0, padx=10, pady=10, sticky="w")
+
+    ticket_var = tk.StringVar(value="Single Day Pass")  # Default value
+    ticket_dropdown = tk.OptionMenu(ticket_window, ticket_var, *ticket_types)
+    ticket_dropdown.grid(row=2, column=1, padx=10, pady=10)
+
+    visit_date_label = tk.Label(
+        ticket_window, text="Visit Date:", font=("Times", 12), bg="#FFE4C4", fg="#4B4B4B"
+    )
+    visit_date_label.grid(row=3, column=0, padx=10, pady=10, sticky="w")
+
+    visit_date_entry = tk.Entry(ticket_window, font=("Times", 12), width=20)
+    visit_date_entry.grid(row=3, column=1, padx=10, pady=10)
+
+    events_on_date_label = tk.Label(
+        ticket_window, text="", font=("Times", 10, "italic"), bg="#FFE4C4", fg="#4B4B4B",
+        wraplength=300, justify="left"
+    )
+    events_on_date_label.grid(row=6, column=0, columnspan=3, padx=10, sticky="w")
+
+    def show_events_on_visit_date(_event=None):
+        """Lists the events running on the visit date typed so far."""
+        try:
+            visit_date = parse_date(visit_date_entry.get())
+        except ValueError:
+            visit_date = None
+        if visit_date is None:
+            events_on_date_label.config(text="")
+            return
+        names = [event.get_name() for event in system.fetch_events_overlapping(visit_date)]
+        if names:
+            events_on_date_label.config(text="Events on this date: " + ", ".join(names))
+        else:
+            events_on_date_label.config(text="No events on this date.")
+
+    visit_date_entry.bind("<KeyRelease>", show_events_on_visit_date)
+    visit_date_entry.bind("<FocusOut>", show_events_on_visit_date)
+
+    payment_method_label = tk.Label(
+        ticket_window, text="Payment Method:", font=("Times", 12), bg="#FFE4C4", fg="#4B4B4B"
+    )
+    payment_method_label.grid(row=4, column=0, padx=10, pady=10, sticky="w")
+
+    payment_method_var = tk.StringVar(value="Credit Card")  # Default value
+    payment_method_dropdown = tk.OptionMenu(
+        ticket_window, payment_method_var, "Credit Card", "Digital Wallet", "Cash")
+    payment_method_dropdown.grid(row=4, column=1, padx=10, pady=10)
+
+    summary_label = tk.Label(
+        ticket_window, text="Order Summary:", font=("Times", 12), bg="#FFE4C4", fg="#4B4B4B"
+    )
+    summary_label.grid(row=0, column=2, padx=10, pady=10, sticky="w")
+
+    summary_text = tk.Text(ticket_window, font=(
+        "Times", 10), width=32, height=15, state="disabled")
+    summary_text.grid(row=1, column=2, rowspan=4, padx=10, pady=10)
+    summary = CartSummaryView(summary_text)
+
+    quantity_label = tk.Label(
+        ticket_window, text="Quantity:", font=("Times", 12), bg="#FFE4C4", fg="#4B4B4B"
+    )
+    quantity_label.grid(row=5, column=0, padx=10, pady=10, sticky="w")
+
+    quantity_entry = tk.Spinbox(ticket_window, from_=1, to=999, font=("Times", 12), width=6)
+    quantity_entry.grid(row=5, column=1, padx=10, pady=10, sticky="w")
+
+    def read_selection():
+        """Returns (ticket type, visit date, quantity) from the form, or None after showing the error."""
+        try:
+            visit_date = parse_date(visit_date_entry.get())
+        except ValueError as error:
+            messagebox.showerror("Error", str(error))
+            return None
+        quantity = quantity_entry.get().strip() or "1"
+        if not quantity.isdigit() or int(quantity) == 0:
+            messagebox.showerror("Error", "Quantity should be a positive whole number.")
+            return None
+        return ticket_types[ticket_var.get()], visit_date, int(quantity)
+
+    def add_ticket():
+        selection = read_selection()
+        if selection is None:
+            return
+        # The seats are held until the order is confirmed or the window is closed
+        try:
+            changed = cart.add(*selection)
+        except SoldOutError as error:
+            messagebox.showerror("Sold Out", str(error))
+            return
+        summary.update(cart, changed)
+
+    def remove_ticket():
+        selection = read_selection()
+        if selection is None:
+            return
+        summary.update(cart, cart.remove(*selection))
+
+    def close_window():
+        cart.release_holds()
+        ticket_window.destroy()
+
+    ticket_window.protocol("WM_DELETE_WINDOW", close_window)
+
+    add_ticket_button = tk.Button(
+        ticket_window,
+        text="Add Tickets",
+        font=("Times", 12),
+        bg="#008CBA",  # Green
+        fg="white",
+        command=add_ticket,
+    )
+    add_ticket_button.grid(row=7, column=0, pady=10)
+
+    remove_ticket_button = tk.Button(
+        ticket_window,
+        text="Remove Tickets",
+        font=("Times", 12),
+        bg="#008CBA",
+        fg="white",
+        command=remove_ticket,
+    )
+    remove_ticket_button.grid(row=7, column=1, pady=10)
+
+    def confirm_order():
+        reference = reference_entry.get().strip() or None
+
+        if not cart:
+            messagebox.showerror("Error", "Please add at least one ticket.")
+            return
+
+        # Fetch the selected guest and add the order (the guest commits it to the journal)
+        guest = guest_picker.get_guest()
+        if guest:
+            # An order already placed under this reference is not placed again
+            try:
+                repeated = system.find_repeated_order(
+                    reference, guest.get_guest_id(), cart.get_items(), payment_method_var.get())
+            except OrderConflictError:
+                messagebox.showerror(
+                    "Error", "This reference was used for a different order, please enter another one.")
+                return
+            if repeated is not None:
+                messagebox.showinfo(
+                    "Order Already Placed", f"This order was already placed as {repeated.get_order_id()}.")
+                close_window()
+                return
+
+            # The cart is priced for the guest already, discounts included
+            if cart.get_guest() is not guest:
+                cart.set_guest(guest)
+            tickets = [
+                Ticket(system.allocate_ticket_id(), line.unit_price, line.visit_date, line.ticket_type)
+                for line in cart.get_lines()
+                for _ in range(line.quantity)
+            ]
+            total_order_amount = cart.get_total()
+
+            # Turn the held seats into sales before recording the order
+            try:
+                cart.commit_holds()
+            except HoldExpiredError:
+                messagebox.showerror("Error", "Your reservation has expired, please add the tickets again.")
+                ticket_window.destroy()
+                return
+
+            try:
+                order = guest.add_purchase_order(
+                    None, tickets, total_order_amount, payment_method_var.get(), reference)
+            except Exception as error:
+                # No order was placed, so the seats sold for it go back on sale
+                inventory = system.get_inventory()
+                for ticket_type, visit_date, quantity in cart.get_items():
+                    inventory.cancel(ticket_type, visit_date, quantity)
+                messagebox.showerror("Error", f"The order could not be placed: {error}")
+                ticket_window.destroy()
+                return
+
+            messagebox.showinfo(
+                "Order Confirmed", f"Your order {order.get_order_id()} has been successfully placed!")
+        else:
+            messagebox.showerror("Error", "Guest not found.")
+
+        # Close the ticket window
+        close_window()
+
+    confirm_button = tk.Button(
+        ticket_window,
+        text="Confirm Order",
+        font=("Times", 12, "bold"),
+        bg="#008CBA",  # Blue
+        fg="white",
+        command=confirm_order,
+    )
+    confirm_button.grid(row=7, column=2, columnspan=2, pady=10)
+
+
+def open_view_events_window():
+    events_window = tk.Toplevel(root)
+    events_window.title("View Events")
+    events_window.geometry("400x400")
+    events_window.configure(bg="#FFE4C4")
+
+    # Add a heading label
+    heading_label = tk.Label(
+        events_window,
+        text="Event List",
+        font=("Times", 16, "bold"),
+        bg="#FFE4C4",
+        fg="#4B4B4B",
+    )
+    heading_label.pack(pady=10)
+
+    # Get the list of events from the system
+    events = system.get_events()
+
+    # If no events are available
+    if not events:
+        no_events_label = tk.Label(
+            events_window,
+            text="No events available.",
+            font=("Times", 12),
+            bg="#FFE4C4",
+            fg="#4B4B4B",
+        )
+        no_events_label.pack(pady=20)
+        return
+
+    # Create a frame to hold the list of events
+    events_frame = tk.Frame(events_window, bg="#FFE4C4")
+    events_frame.pack(fill="both", expand=True, padx=10, pady=10)
+
+    # Add a scrollbar
+    scrollbar = tk.Scrollbar(events_frame, orient="vertical")
+    scrollbar.pack(side="right", fill="y")
+
+    # Create a listbox to display events
+    events_listbox = tk.Listbox(
+        events_frame,
+        font=("Times", 12),
+        bg="#FFFFFF",
+        fg="#000000",
+        yscrollcommand=scrollbar.set,
+        width=50,
+        height=15,
+    )
+    events_listbox.pack(side="left", fill="both", expand=True)
+    scrollbar.config(command=events_listbox.yview)
+
+    # Populate the listbox with events
+    for event in events:
+        event_name = event.get_name()
+        start_date = format_date(event.get_start_date())
+        end_date = format_date(event.get_end_date())
+        events_listbox.insert(
+            tk.END, f"{event_name} - {start_date} to {end_date}")
+
+    # Close button
+    close_button = tk.Button(
+        events_window,
+        text="Close",
+        font=("Times", 12, "bold"),
+        bg="#008CBA",  # Red button
+        fg="white",
+        command=events_window.destroy,
+    )
+    close_button.pack(pady=10)
+
+def format_sales_breakdown(day):
+    """Returns one line per ticket type and payment method sold on the given day."""
+    sales = system.get_sales()
+    lines = []
+    for ticket_type, (tickets, amount) in sales.get_totals_by_ticket_type(day).items():
+        lines.append(f"{ticket_type.replace('_', ' ').title()}: {tickets} sold, DHS{amount}")
+    for payment_method, (tickets, amount) in sales.get_totals_by_payment_method(day).items():
+        lines.append(f"{payment_method}: DHS{amount}")
+    return "\n".join(lines) if lines else "No tickets sold today."
+
+
+def admin_dashboard_window():
+    services_window = tk.Toplevel(root)
+    services_window.title("Admin Dashboard")
+    services_window.geometry("420x760")
+    services_window.configure(bg="#FFE4C4")
+
+    # Variables
+    ticket_types = [
+        "Single Day Pass",
+        "Two Day Pass",
+        "Annual Membership",
+        "Child Ticket",
+        "Group Ticket",
+        "VIP Experience Pass",
+    ]
+
+    # Fetch today's total sales from the sales counters
+    today = datetime.date.today()
+    total_sales = system.get_sales().get_total(today)
+
+    # Display total sales for today
+    sales_label_var = tk.StringVar(value=f"Total Ticket Sales Today: DHS{total_sales}")
+
+    sales_label = tk.Label(
+        services_window,
+        textvariable=sales_label_var,
+        font=("Times", 14, "bold"),
+        bg="#FFE4C4",
+        fg="#4B4B4B",
+    )
+    sales_label.pack(pady=(20, 5))
+
+    # Today's sales split by ticket type and payment method
+    breakdown_var = tk.StringVar(value=format_sales_breakdown(today))
+
+    breakdown_label = tk.Label(
+        services_window,
+        textvariable=breakdown_var,
+        font=("Times", 10),
+        bg="#FFE4C4",
+        fg="#4B4B4B",
+        justify="left",
+    )
+    breakdown_label.pack(pady=5)
+
+    # Dropdown to select ticket type
+    ticket_label = tk.Label(
+        services_window,
+        text="Select Ticket Type:",
+        font=("Times", 12),
+        bg="#FFE4C4",
+        fg="#4B4B4B",
+    )
+    ticket_label.pack(pady=10)
+
+    ticket_var = tk.StringVar(value=ticket_types[0])  # Default value
+    ticket_dropdown = tk.OptionMenu(services_window, ticket_var, *ticket_types)
+    ticket_dropdown.pack(pady=10)
+
+    current_discount_var = tk.StringVar()
+    current_discount_label = tk.Label(
+        services_window,
+        textvariable=current_discount_var,
+        font=("Times", 10, "italic"),
+        bg="#FFE4C4",
+        fg="#4B4B4B",
+        wraplength=360,
+    )
+    current_discount_label.pack()
+
+    def show_current_discount(*_args):
+        ticket_type = TicketType[ticket_var.get().replace(" ", "_").upper()]
+        current_discount_var.set("Current discount: " + system.get_pricing().describe_discounts(ticket_type))
+
+    ticket_var.trace_add("write", show_current_discount)
+    show_current_discount()
+
+    # Fields of the discount rule replacing the selected type's discounts
+    discount_label = tk.Label(
+        services_window,
+        text="Modify Discount Criteria:",
+        font=("Times", 12),
+        bg="#FFE4C4",
+        fg="#4B4B4B",
+    )
+    discount_label.pack(pady=(10, 0))
+
+    discount_frame = tk.Frame(services_window, bg="#FFE4C4")
+    discount_frame.pack(pady=5)
+
+    kind_var = tk.StringVar(value="Percent")
+    value_entry = tk.Entry(discount_frame, font=("Times", 12), width=8)
+    min_quantity_entry = tk.Entry(discount_frame, font=("Times", 12), width=8)
+    min_quantity_entry.insert(0, "1")
+    valid_from_entry = tk.Entry(discount_frame, font=("Times", 12), width=12)
+    valid_to_entry = tk.Entry(discount_frame, font=("Times", 12), width=12)
+    online_only_var = tk.BooleanVar(value=False)
+    renewal_only_var = tk.BooleanVar(value=False)
+
+    tk.OptionMenu(discount_frame, kind_var, "Percent", "Amount").grid(row=0, column=0, padx=5)
+    value_entry.grid(row=0, column=1, padx=5)
+    tk.Label(discount_frame, text="Minimum Quantity:", font=("Times", 10), bg="#FFE4C4").grid(
+        row=1, column=0, sticky="w")
+    min_quantity_entry.grid(row=1, column=1, padx=5)
+    tk.Label(discount_frame, text="Visits From:", font=("Times", 10), bg="#FFE4C4").grid(
+        row=2, column=0, sticky="w")
+    valid_from_entry.grid(row=2, column=1, padx=5)
+    tk.Label(discount_frame, text="Visits To:", font=("Times", 10), bg="#FFE4C4").grid(
+        row=3, column=0, sticky="w")
+    valid_to_entry.grid(row=3, column=1, padx=5)
+    tk.Checkbutton(discount_frame, text="Online only", variable=online_only_var, font=("Times", 10),
+                   bg="#FFE4C4").grid(row=4, column=0, sticky="w")
+    tk.Checkbutton(discount_frame, text="Renewal only", variable=renewal_only_var, font=("Times", 10),
+                   bg="#FFE4C4").grid(row=4, column=1, sticky="w")
+
+    # Function to handle discount update and show pop-up
+    def update_discount():
+        ticket_type = ticket_var.get()
+        value = value_entry.get().strip()
+
+        if not value:
+            update_ticket_discount(ticket_type, None)
+            show_current_discount()
+            messagebox.showinfo("Success", f"Discounts removed for {ticket_type}.")
+            return
+
+        try:
+            rule = DiscountRule(
+                ticket_type.replace(" ", "_").upper(),
+                PERCENT if kind_var.get() == "Percent" else AMOUNT,
+                float(value),
+                min_quantity=int(min_quantity_entry.get() or 1),
+                online_only=online_only_var.get(),
+                renewal_only=renewal_only_var.get(),
+                valid_from=valid_from_entry.get(),
+                valid_to=valid_to_entry.get(),
+            )
+        except ValueError as error:
+            messagebox.showerror("Error", f"Invalid discount: {error}")
+            return
+
+        update_ticket_discount(ticket_type, rule)
+        show_current_discount()
+        messagebox.showinfo("Success", f"Discount updated for {ticket_type}: {rule.describe()}")
+
+    # Button to update discount
+    update_button = tk.Button(
+        services_window,
+        text="Update Discount",
+        font=("Times", 12),
+        bg="#008CBA",
+        fg="white",
+        width=20,
+        command=update_discount,
+    )
+    update_button.pack(pady=10)
+
+    # Button to refresh sales
+    def refresh_sales():
+        today = datetime.date.today()
+        updated_sales = system.get_sales().get_total(today)
+        sales_label_var.set(f"Total Ticket Sales Today: DHS{updated_sales}")
+        breakdown_var.set(format_sales_breakdown(today))
+
+    refresh_sales_button = tk.Button(
+        services_window,
+        text="Refresh Sales",
+        font=("Times", 12),
+        bg="#008CBA",
+        fg="white",
+        width=20,
+        command=refresh_sales,
+    )
+    refresh_sales_button.pack(pady=10)
+
+    metrics_button = tk.Button(
+        services_window,
+        text="View Metrics",
+        font=("Times", 12),
+        bg="#008CBA",
+        fg="white",
+        width=20,
+        command=open_metrics_window,
+    )
+    metrics_button.pack(pady=(0, 20))
+
+
+def open_metrics_window():
+    """Admin panel showing the timing histograms of the hot paths."""
+    metrics_window = tk.Toplevel(root)
+    metrics_window.title("Metrics")
+    metrics_window.geometry("620x420")
+    metrics_window.configure(bg="#FFE4C4")
+
+    enabled_var = tk.BooleanVar(value=metrics.is_enabled())
+
+    def toggle_metrics():
+        metrics.set_enabled(enabled_var.get())
+        refresh_metrics()
+
+    enabled_check = tk.Checkbutton(
+        metrics_window,
+        text="Collect metrics",
+        variable=enabled_var,
+        command=toggle_metrics,
+        font=("Times", 12),
+        bg="#FFE4C4",
+    )
+    enabled_check.pack(pady=(10, 5))
+
+    metrics_text = tk.Text(metrics_window, font=("Courier", 9), width=80, height=18, state="disabled")
+    metrics_text.pack(padx=10, pady=5)
+
+    def refresh_metrics():
+        metrics_text.configure(state="normal")
+        metrics_text.delete(1.0, tk.END)
+        metrics_text.insert(tk.END, metrics.format_summary())
+        metrics_text.configure(state="disabled")
+
+    def reset_metrics():
+        metrics.REGISTRY.reset()
+        refresh_metrics()
+
+    def save_metrics_dump():
+        with open("metrics.prom", "w") as file:
+            file.write(metrics.export_prometheus())
+        messagebox.showinfo("Metrics", "Metrics written to metrics.prom.")
+
+    buttons_frame = tk.Frame(metrics_window, bg="#FFE4C4")
+    buttons_frame.pack(pady=10)
+    for text, command in (("Refresh", refresh_metrics), ("Reset", reset_metrics),
+                          ("Save Dump", save_metrics_dump)):
+        tk.Button(buttons_frame, text=text, font=("Times", 12), bg="#008CBA", fg="white",
+                  width=10, command=command).pack(side="left", padx=5)
+
+    refresh_metrics()
+
+def update_ticket_discount(ticket_type, rule):
+    """Replaces the discounts of a ticket type, given by its label, with rule (None for no discount)."""
+    ticket_type = TicketType[ticket_type.replace(" ", "_").upper()]
+    system.get_pricing().set_rules(ticket_type, [rule] if rule else [])
+
+
+def open_view_purchase_history_window():
+    history_window = tk.Toplevel(root)
+    history_window.title("View Purchase History")
+    history_window.geometry("560x600")
+    history_window.configure(bg="#FFE4C4")
+
+    # Guest search and selection
+    guest_label = tk.Label(
+        history_window, text="Select Guest:", font=("Times", 12), bg="#FFE4C4", fg="#4B4B4B"
+    )
+    guest_label.grid(row=0, column=0, padx=10, pady=10, sticky="nw")
+
+    guest_picker = GuestPicker(history_window)
+    guest_picker.grid(row=0, column=1, padx=10, pady=10, sticky="w")
+
+    # Text box to display purchase history
+    history_label = tk.Label(
+        history_window, text="Purchase History:", font=("Times", 12, "bold"), bg="#FFE4C4", fg="#4B4B4B"
+    )
+    history_label.grid(row=1, column=0, padx=10, pady=10, sticky="nw")
+
+    history_text = tk.Text(history_window, font=(
+        "Times", 8), width=50, height=15, wrap="word")
+    history_text.grid(row=1, column=1, padx=10, pady=10, columnspan=2)
+
+    # Cursor of the next history page, None when everything is shown, and whose history it is
+    next_cursor = [None]
+    shown_guest = [None]
+
+    def render_page(guest, cursor):
+        """Appends one page of history records to the text box."""
+        records, next_cursor[0] = guest.purchase_history_page(cursor, HISTORY_PAGE_SIZE)
+        if cursor is None:
+            if not records:
+                history_text.insert(tk.END, "No purchase history available for this guest.")
+            else:
+                history_text.insert(tk.END, f"Purchase History for {guest.get_name()}:\n" + "=" * 40 + "\n")
+        for record in records:
+            history_text.insert(tk.END, format_history_record(record))
+        more_button.configure(state="normal" if next_cursor[0] else "disabled")
+
+    # Function to fetch and display purchase history
+    def show_purchase_history():
+        guest = guest_picker.get_guest()
+
+        # Clear previous history
+        history_text.delete("1.0", tk.END)
+
+        # Validate if a guest is selected
+        if guest is None:
+            history_text.insert(tk.END, "No guest selected.")
+            next_cursor[0] = None
+            more_button.configure(state="disabled")
+            return
+
+        # Show the first page, later pages are fetched by "Load More"
+        shown_guest[0] = guest
+        render_page(guest, None)
+
+    def load_more():
+        if next_cursor[0]:
+            render_page(shown_guest[0], next_cursor[0])
+
+    # Button to fetch and show purchase history
+    fetch_button = tk.Button(
+        history_window,
+        text="Show History",
+        font=("Times", 12, "bold"),
+        bg="#008CBA",
+        fg="white",
+        command=show_purchase_history,
+    )
+    fetch_button.grid(row=2, column=1, pady=10, sticky="e")
+
+    # Button to append the next page of history
+    more_button = tk.Button(
+        history_window,
+        text="Load More",
+        font=("Times", 12, "bold"),
+        bg="#008CBA",
+        fg="white",
+        state="disabled",
+        command=load_more,
+    )
+    more_button.grid(row=2, column=0, pady=10, sticky="w", padx=10)
+
+    # Close button
+    close_button = tk.Button(
+        history_window,
+        text="Close",
+        font=("Times", 12, "bold"),
+        bg="#008CBA",
+        fg="white",
+        command=history_window.destroy,
+    )
+    close_button.grid(row=2, column=2, pady=10, sticky="w")
+
+
+def open_view_tickets_window():
+    events_window = tk.Toplevel(root)
+    events_window.title("View Tickets")
+    events_window.geometry("400x400")
+    events_window.configure(bg="#FFE4C4")
+
+    # Add a heading label
+    heading_label = tk.Label(
+        events_window,
+        text="List of Tickets",
+        font=("Times", 16, "bold"),
+        bg="#FFE4C4",
+        fg="#4B4B4B",
+    )
+    heading_label.pack(pady=10)
+
+    # Get the ticket catalog from the system, shared until prices or discounts change
+    tickets = system.get_catalog().entries
+
+    # If no events are available
+    if not tickets:
+        no_events_label = tk.Label(
+            events_window,
+            text="No tickets available.",
+            font=("Times", 12),
+            bg="#FFE4C4",
+            fg="#4B4B4B",
+        )
+        no_events_label.pack(pady=20)
+        return
+
+    # Create a frame to hold the list of events
+    events_frame = tk.Frame(events_window, bg="#FFE4C4")
+    events_frame.pack(fill="both", expand=True, padx=10, pady=10)
+
+    # Add a scrollbar
+    scrollbar = tk.Scrollbar(events_frame, orient="vertical")
+    scrollbar.pack(side="right", fill="y")
+
+    # Create a listbox to display events
+    tickets_listbox = tk.Listbox(
+        events_frame,
+        font=("Times", 12),
+        bg="#FFFFFF",
+        fg="#000000",
+        yscrollcommand=scrollbar.set,
+        width=50,
+        height=15,
+    )
+    tickets_listbox.pack(side="left", fill="both", expand=True)
+    scrollbar.config(command=tickets_listbox.yview)
+
+    # Populate the listbox with events
+    for ticket in tickets:
+        ticket_type = ticket.ticket_type.name
+        ticket_price = ticket.price
+        ticket_discount = ticket.discount_available
+        ticket_description = ticket.description
+
+        # Insert ticket details in multiline format
+        tickets_listbox.insert(tk.END, f"Name: {ticket_type.replace('_', ' ').title()}")
+        tickets_listbox.insert(tk.END, f"Price: DHS{ticket_price:.2f}")
+        tickets_listbox.insert(tk.END, f"Discount: {ticket_discount}")
+        tickets_listbox.insert(tk.END, f"Description: {ticket_description}")
+        # Add a blank line for separation
+        tickets_listbox.insert(tk.END, "*******************")
+
+    # Close button
+    close_button = tk.Button(
+        events_window,
+        text="Close",
+        font=("Times", 12, "bold"),
+        bg="#008CBA",  # Red button
+        fg="white",
+        command=events_window.destroy,
+    )
+    close_button.pack(pady=10)
+
+
+def main():
+    global system, admin, root
+
+    # Creating objects
+    system = create_system()
+
+    # Create Admin instance with reference to the system (Aggregation relationship)
+    admin = Admin("Admin", "Khalifa", "Khalifa123@gmail.com", "khalifa123", system)
+
+    # Create the main window
+    root = tk.Tk()
+    root.title("Ticket Booking System")
+    window_width = 800
+    window_height = 450
+    screen_width = root.winfo_screenwidth()
+    screen_height = root.winfo_screenheight()
+    x_position = (screen_width // 2) - (window_width // 2)
+    y_position = (screen_height // 2) - (window_height // 2)
+    root.geometry(f"{window_width}x{window_height}+{x_position}+{y_position}")
+    root.configure(bg="#FFE4C4")
+
+    # Add a heading label
+    heading_label = tk.Label(
+        root,
+        text="Ticket Booking System",
+        font=("Times", 20, "bold"),
+        pady=20,
+        bg="#FFE4C4",
+        fg="#4B4B4B",
+    )
+    heading_label.pack()
+
+    # Add a right-side frame for actions
+    right_frame = tk.Frame(root, bg="#F8F8F8", width=200,
+                           relief="solid", borderwidth=1, height=300)
+    right_frame.pack(side="right", fill="y", padx=20, pady=10)
+
+    # Add buttons inside the right frame
+    register_button = tk.Button(
+        right_frame,
+        text="Register Guest",
+        font=("Times", 12),
+        bg="#ADD8E6",
+        fg="black",
+        width=20,
+        pady=5,
+        command=open_registration_window,
+    )
+    register_button.pack(pady=10)
+
+    delete_button = tk.Button(
+        right_frame,
+        text="Delete Guest",
+        font=("Times", 12),
+        bg="#ADD8E6",
+        fg="black",
+        width=20,
+        pady=5,
+        command=open_delete_guest_window,
+    )
+    delete_button.pack(pady=10)
+
+    # Add buttons on the left side
+    purchase_ticket_button = tk.Button(
+        root,
+        text="Purchase Ticket",
+        font=("Times", 12),
+        bg="#ADD8E6",
+        fg="black",
+        width=20,
+        pady=5,
+        command=open_purchase_ticket_window,
+    )
+    purchase_ticket_button.pack(anchor="w", padx=40, pady=10)
+
+    view_events_button = tk.Button(
+        root,
+        text="View Events",
+        font=("Times", 12),
+        bg="#ADD8E6",
+        fg="black",
+        width=20,
+        pady=5,
+        command=open_view_events_window,
+    )
+    view_events_button.pack(anchor="w", padx=40, pady=10)
+
+    view_tickets_button = tk.Button(
+        root,
+        text="View Tickets",
+        font=("Times", 12),
+        bg="#ADD8E6",
+        fg="black",
+        width=20,
+        pady=5,
+        command=open_view_tickets_window,
+    )
+    view_tickets_button.pack(anchor="w", padx=40, pady=10)
+
+    view_history_button = tk.Button(
+        root,
+        text="View Guest Purchase History",
+        font=("Times", 12),
+        bg="#ADD8E6",
+        fg="black",
+        width=30,
+        pady=5,
+        command=open_view_purchase_history_window,
+    )
+    view_history_button.pack(anchor="w", padx=40, pady=10)
+
+
+    admin_button = tk.Button(
+        root,
+        text="Admin Dashboard",
+        font=("Times", 12),
+        bg="#ADD8E6",
+        fg="black",
+        width=20,
+        pady=5,
+        command=admin_dashboard_window,)
+    admin_button.pack(anchor="w", padx=40, pady=10)
+
+
+    def flush_pending_writes():
+        """Periodically writes queued guest changes while the window is open."""
+        system.flush_if_due()
+        root.after(1000, flush_pending_writes)
+
+    flush_pending_writes()
+
+    # Start the tkinter main loop
+    root.mainloop()
@@ -0,0 +1,264 @@
+"""
+Ticket inventory: capacity per ticket type and visit date, with atomic
+reservations, and the ticket id allocator.
+"""
+import itertools
+import threading
+import time
+
+from . import models
+
+# Capacity per visit date by TicketType name, None means unlimited
+DEFAULT_CAPACITIES = {
+    "SINGLE_DAY_PASS": None,
+    "TWO_DAY_PASS": None,
+    "ANNUAL_MEMBERSHIP": None,
+    "CHILD_TICKET": None,
+    "GROUP_TICKET": None,
+    "VIP_EXPERIENCE_PASS": 50,  # "Limited availability"
+}
+
+
+class SoldOutError(ValueError):
+    """Raised when a reservation would exceed the remaining capacity."""
+
+
+class HoldExpiredError(ValueError):
+    """Raised when committing a hold that expired or was already released."""
+
+
+class TicketIdAllocator:
+    """
+    Hands out increasing ticket ids without locking: itertools.count's
+    __next__ runs entirely in C, so concurrent threads never get the same id.
+    Allocators with the same step and different starts modulo the step (one
+    per shard) never hand out the same id either.
+    """
+
+    def __init__(self, start=1, step=1):
+        self.__step = step
+        self.__counter = itertools.count(start, step)
+
+    def __getstate__(self):
+        # Take the next id, so the pickled copy continues past every id issued here
+        return {"start": next(self.__counter), "step": self.__step}
+
+    def __setstate__(self, state):
+        self.__init__(state["start"], state.get("step", 1))
+
+    def next_id(self):
+        return next(self.__counter)
+
+
+class InventorySlot:
+    """Sold and held seats of one ticket type on one visit date."""
+
+    __slots__ = ("sold", "held", "holds")
+
+    def __init__(self):
+        self.sold = 0
+        self.held = 0
+        self.holds = {}  # hold_id -> (quantity, expiry time)
+
+
+class TicketInventory:
+    """
+    Tracks sales against the capacity of each (ticket type, visit date) slot.
+
+    reserve() places a hold on seats that expires after hold_seconds unless
+    commit() turns it into a sale; release() gives the seats back. Each slot
+    is guarded by one of ``stripes`` locks chosen by hashing the slot key, so
+    sales for different days and ticket types do not contend with each other.
+    """
+
+    def __init__(self, capacities=None, hold_seconds=900, stripes=64):
+        self.__capacities = {models.TicketType[name]: capacity
+                             for name, capacity in DEFAULT_CAPACITIES.items()}
+        if capacities:
+            self.__capacities.update(capacities)
+        self.__date_capacities = {}  # (ticket_type, visit_date) -> capacity
+        self.__hold_seconds = hold_seconds
+        self.__locks = [threading.Lock() for _ in range(stripes)]
+        self.__slots = {}            # (ticket_type, visit_date) -> InventorySlot
+        self.__holds = {}            # hold_id -> (ticket_type, visit_date)
+        self.__hold_ids = itertools.count(1)
+        self.__listeners = []
+
+    def __getstate__(self):
+        # Locks and live holds stay with this process
+        return {
+            "capacities": self.__capacities,
+            "date_capacities": self.__date_capacities,
+            "hold_seconds": self.__hold_seconds,
+            "stripes": len(self.__locks),
+        }
+
+    def __setstate__(self, state):
+        self.__init__(state["capacities"], state["hold_seconds"], state["stripes"])
+        self.__date_capacities = state["date_capacities"]
+
+    def __lock_for(self, key):
+        return self.__locks[hash(key) % len(self.__locks)]
+
+    def __slot(self, key):
+        slot = self.__slots.get(key)
+        if slot is None:
+            slot = self.__slots.setdefault(key, InventorySlot())  # setdefault is atomic
+        return slot
+
+    def add_listener(self, listener):
+        """
+        Calls listener(ticket_type, visit_date) after the sold count or capacity
+        of a slot changes, with visit_date None when every day changed.
+        """
+        self.__listeners.append(listener)
+
+    def remove_listener(self, listener):
+        self.__listeners.remove(listener)
+
+    def __notify(self, ticket_type, visit_date):
+        for listener in self.__listeners:
+            listener(ticket_type, visit_date)
+
+    def set_capacity(self, ticket_type, capacity, visit_date=None):
+        """Sets the capacity of a ticket type for every day, or for one visit date."""
+        if visit_date is None:
+            self.__capacities[ticket_type] = capacity
+        else:
+            self.__date_capacities[(ticket_type, visit_date)] = capacity
+        self.__notify(ticket_type, visit_date)
+
+    def get_capacity(self, ticket_type, visit_date):
+        key = (ticket_type, visit_date)
+        if key in self.__date_capacities:
+            return self.__date_capacities[key]
+        return self.__capacities.get(ticket_type)
+
+    def get_sold(self, ticket_type, visit_date):
+        slot = self.__slots.get((ticket_type, visit_date))
+        return slot.sold if slot else 0
+
+    def available(self, ticket_type, visit_date):
+        """Returns the number of seats left, or None if the ticket type is unlimited."""
+        capacity = self.get_capacity(ticket_type, visit_date)
+        if capacity is None:
+            return None
+        key = (ticket_type, visit_date)
+        with self.__lock_for(key):
+            slot = self.__slot(key)
+            self.__expire_holds(slot, time.monotonic())
+            return max(capacity - slot.sold - slot.held, 0)
+
+    def __expire_holds(self, slot, now):
+        """Returns the seats of expired holds to the slot. Caller holds the slot lock."""
+        expired = [hold_id for hold_id, (_, expires) in slot.holds.items() if expires <= now]
+        for hold_id in expired:
+            quantity, _ = slot.holds.pop(hold_id)
+            slot.held -= quantity
+            self.__holds.pop(hold_id, None)
+
+    def reserve(self, ticket_type, visit_date, quantity=1, hold_seconds=None):
+        """
+        Holds seats for a pending order and returns the hold id.
+        Raises SoldOutError if not enough seats are left.
+        """
+        if quantity <= 0:
+            raise ValueError("Quantity should be a positive number.")
+        key = (ticket_type, visit_date)
+        capacity = self.get_capacity(ticket_type, visit_date)
+        now = time.monotonic()
+        expires = now + (self.__hold_seconds if hold_seconds is None else hold_seconds)
+        hold_id = next(self.__hold_ids)
+
+        with self.__lock_for(key):
+            slot = self.__slot(key)
+            if capacity is not None and slot.sold + slot.held + quantity > capacity:
+                self.__expire_holds(slot, now)  # Only look for stale holds when short of seats
+                if slot.sold + slot.held + quantity > capacity:
+                    left = max(capacity - slot.sold - slot.held, 0)
+                    raise SoldOutError(
+                        f"Only {left} {ticket_type.name} tickets left for {visit_date}.")
+            slot.holds[hold_id] = (quantity, expires)
+            slot.held += quantity
+            self.__holds[hold_id] = key
+        return hold_id
+
+    def commit(self, hold_id):
+        """
+        Turns a hold into a sale and returns (ticket_type, visit_date,
+        quantity). Raises HoldExpiredError if the hold has expired or was
+        released, in which case its seats are already returned.
+        """
+        key = self.__holds.pop(hold_id, None)
+        if key is None:
+            raise HoldExpiredError(f"Reservation {hold_id} has expired.")
+        with self.__lock_for(key):
+            slot = self.__slots[key]
+            hold = slot.holds.pop(hold_id, None)
+            if hold is None:
+                raise HoldExpiredError(f"Reservation {hold_id} has expired.")
+            quantity, expires = hold
+            slot.held -= quantity
+            if expires <= time.monotonic():
+                raise HoldExpiredError(f"Reservation {hold_id} has expired.")
+            slot.sold += quantity
+        self.__notify(*key)
+        return key[0], key[1], quantity
+
+    def commit_many(self, hold_ids):
+        """
+        Turns the holds of one order into sales, all or nothing. If one of
+        them has expired or was released, the seats already committed are
+        sold back, the remaining holds released and HoldExpiredError raised.
+        """
+        hold_ids = list(hold_ids)
+        committed = []
+        for position, hold_id in enumerate(hold_ids):
+            try:
+                committed.append(self.commit(hold_id))
+            except HoldExpiredError:
+                for ticket_type, visit_date, quantity in committed:
+                    self.cancel(ticket_type, visit_date, quantity)
+                for remaining in hold_ids[position + 1:]:
+                    self.release(remaining)
+                raise
+
+    def release(self, hold_id, quantity=None):
+        """
+        Gives the seats of a hold back, or only quantity of them, keeping the
+        rest held. Returns False if the hold was not active.
+        """
+        if quantity is not None and quantity <= 0:
+            raise ValueError("Quantity should be a positive number.")
+        key = self.__holds.get(hold_id)
+        if key is None:
+            return False
+        with self.__lock_for(key):
+            slot = self.__slots[key]
+            hold = slot.holds.get(hold_id)
+            if hold is None:  # Committed or released meanwhile
+                return False
+            held, expires = hold
+            if quantity is not None and quantity < held:
+                slot.holds[hold_id] = (held - quantity, expires)
+                slot.held -= quantity
+                return True
+            del slot.holds[hold_id]
+            self.__holds.pop(hold_id, None)
+            slot.held -= held
+            return True
+
+    def cancel(self, ticket_type, visit_date, quantity=1):
+        """Returns sold seats to the inventory, e.g. when an order is cancelled."""
+        key = (ticket_type, visit_date)
+        with self.__lock_for(key):
+            slot = self.__slot(key)
+            slot.sold = max(slot.sold - quantity, 0)
+        self.__notify(ticket_type, visit_date)
+
+    def restore_sold(self, counts):
+        """Loads sold counts, a dict of (ticket_type, visit_date) -> tickets sold."""
+        for key, count in counts.items():
+            with self.__lock_for(key):
+                self.__slot(key).sold += count
+            self.__notify(*key)
@@ -0,0 +1,220 @@
+"""
+Timing and counter instrumentation for the hot paths: persistence, text
+file writes, guest lookups and order commits.
+
+Metrics are collected only while enabled, so instrumented code costs one
+attribute check when they are off. Turn them on with set_enabled(True), the
+admin dashboard's Metrics panel, or TICKET_BOOKING_METRICS=1 in the
+environment. export_prometheus() renders everything in the Prometheus text
+exposition format, which the API serves at /metrics.
+"""
+import bisect
+import functools
+import os
+import threading
+import time
+
+# Upper bounds in seconds, from 10 microseconds to 10 seconds
+DEFAULT_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+
+class Histogram:
+    """Distribution of observed durations, by label value."""
+
+    def __init__(self, name, help_text, label_name, buckets=DEFAULT_BUCKETS):
+        self.__name = name
+        self.__help = help_text
+        self.__label_name = label_name
+        self.__buckets = tuple(buckets)
+        self.__series = {}  # label value -> [bucket counts..., sum, count]
+        self.__lock = threading.Lock()
+
+    def get_name(self):
+        return self.__name
+
+    def get_help(self):
+        return self.__help
+
+    def get_buckets(self):
+        return self.__buckets
+
+    def observe(self, label, seconds):
+        index = bisect.bisect_left(self.__buckets, seconds)
+        with self.__lock:
+            series = self.__series.get(label)
+            if series is None:
+                series = self.__series[label] = [0] * (len(self.__buckets) + 3)
+            series[index] += 1  # The slot after the last bucket counts +Inf only
+            series[-2] += seconds
+            series[-1] += 1
+
+    def get_series(self):
+        """Returns {label: (bucket counts, sum, count)} with non-cumulative bucket counts."""
+        with self.__lock:
+            return {label: (series[:-2], series[-2], series[-1])
+                    for label, series in self.__series.items()}
+
+    def quantile(self, label, fraction):
+        """Estimates a quantile of one series from its buckets, or None if it is empty."""
+        counts, _, total = self.get_series().get(label, ((), 0, 0))
+        if not total:
+            return None
+        target = fraction * total
+        seen = 0
+        lower = 0.0
+        for upper, count in zip(self.__buckets + (float("inf"),), counts):
+            if count and seen + count >= target:
+                if upper == float("inf"):
+                    return lower
+                return lower + (upper - lower) * (target - seen) / count
+            seen += count
+            lower = upper
+        return lower
+
+    def reset(self):
+        with self.__lock:
+            self.__series = {}
+
+    def export(self):
+        lines = [f"# HELP {self.__name} {self.__help}", f"# TYPE {self.__name} histogram"]
+        for label, (counts, total_seconds, total) in sorted(self.get_series().items()):
+            label_text = f'{self.__label_name}="{escape_label(label)}"'
+            cumulative = 0
+            for upper, count in zip(self.__buckets, counts):
+                cumulative += count
+                lines.append(f'{self.__name}_bucket{{{label_text},le="{upper:g}"}} {cumulative}')
+            lines.append(f'{self.__name}_bucket{{{label_text},le="+Inf"}} {total}')
+            lines.append(f"{self.__name}_sum{{{label_text}}} {total_seconds:.9g}")
+            lines.append(f"{self.__name}_count{{{label_text}}} {total}")
+        return lines
+
+
+class Counter:
+    """Monotonic count of events, by label value."""
+
+    def __init__(self, name, help_text, label_name):
+        self.__name = name
+        self.__help = help_text
+        self.__label_name = label_name
+        self.__values = {}
+        self.__lock = threading.Lock()
+
+    def get_name(self):
+        return self.__name
+
+    def inc(self, label, amount=1):
+        with self.__lock:
+            self.__values[label] = self.__values.get(label, 0) + amount
+
+    def get_values(self):
+        with self.__lock:
+            return dict(self.__values)
+
+    def reset(self):
+        with self.__lock:
+            self.__values = {}
+
+    def export(self):
+        lines = [f"# HELP {self.__name} {self.__help}", f"# TYPE {self.__name} counter"]
+        for label, value in sorted(self.get_values().items()):
+            lines.append(f'{self.__name}{{{self.__label_name}="{escape_label(label)}"}} {value}')
+        return lines
+
+
+class MetricsRegistry:
+    """The metrics of one process and the switch that turns collection on and off."""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled  # Plain attribute: read on every instrumented call
+        self.__metrics = []
+
+    def set_enabled(self, enabled):
+        self.enabled = bool(enabled)
+
+    def is_enabled(self):
+        return self.enabled
+
+    def register(self, metric):
+        self.__metrics.append(metric)
+        return metric
+
+    def get_metrics(self):
+        return list(self.__metrics)
+
+    def reset(self):
+        for metric in self.__metrics:
+            metric.reset()
+
+    def export_prometheus(self):
+        lines = []
+        for metric in self.__metrics:
+            lines.extend(metric.export())
+        return "\n".join(lines) + "\n"
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REGISTRY = MetricsRegistry(enabled=os.environ.get("TICKET_BOOKING_METRICS", "") not in ("", "0"))
+
+STORAGE_SECONDS = REGISTRY.register(Histogram(
+    "ticket_booking_storage_seconds", "Time spent writing to the storage backend.", "operation"))
+TEXT_FILE_SECONDS = REGISTRY.register(Histogram(
+    "ticket_booking_text_file_seconds", "Time spent writing guest and event .txt files.", "kind"))
+LOOKUP_SECONDS = REGISTRY.register(Histogram(
+    "ticket_booking_lookup_seconds", "Time spent looking up guests.", "lookup"))
+ORDER_SECONDS = REGISTRY.register(Histogram(
+    "ticket_booking_order_seconds", "Time spent committing and cancelling orders.", "operation"))
+RECORDS_WRITTEN = REGISTRY.register(Counter(
+    "ticket_booking_records_written_total", "Records handed to the storage backend.", "kind"))
+
+
+def timed(histogram, label):
+    """Decorator recording each call's duration in a histogram while metrics are enabled."""
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not REGISTRY.enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                histogram.observe(label, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+def count(counter, label, amount=1):
+    """Adds to a counter while metrics are enabled."""
+    if REGISTRY.enabled:
+        counter.inc(label, amount)
+
+
+def set_enabled(enabled):
+    REGISTRY.set_enabled(enabled)
+
+
+def is_enabled():
+    return REGISTRY.is_enabled()
+
+
+def export_prometheus():
+    return REGISTRY.export_prometheus()
+
+
+def format_summary():
+    """Returns a readable summary of every histogram, as shown on the admin dashboard."""
+    lines = []
+    for metric in REGISTRY.get_metrics():
+        if not isinstance(metric, Histogram):
+            continue
+        for label, (_, total_seconds, total) in sorted(metric.get_series().items()):
+            p50 = metric.quantile(label, 0.5)
+            p95 = metric.quantile(label, 0.95)
+            lines.append(
+                f"{metric.get_name().replace('ticket_booking_', '')} [{label}]: {total} calls, "
+                f"mean {total_seconds / total * 1000:.3f} ms, "
+                f"p50 {p50 * 1000:.3f} ms, p95 {p95 * 1000:.3f} ms")
+    return "\n".join(lines) if lines else "No measurements yet."
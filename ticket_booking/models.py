@@ -0,0 +1,1065 @@
+"""
+Domain model of the ticket booking system: guests, events, tickets and
+purchase orders, held together by TicketBookingSystem.
+"""
+import atexit
+import bisect
+import datetime
+import weakref
+from collections import namedtuple
+from enum import Enum
+
+from .availability import AvailabilityCalendar
+from .catalog import build_catalog
+from .dates import format_date, parse_date, to_ordinal
+from .event_index import EventIndex
+from .guest_index import GuestSearchIndex
+from .inventory import TicketIdAllocator, TicketInventory
+from .metrics import LOOKUP_SECONDS, ORDER_SECONDS, STORAGE_SECONDS, TEXT_FILE_SECONDS, timed
+from .pricing import PricingEngine
+from .sales import SalesCounters
+from .storage import GuestPersistenceManager, PickleStorage
+from .text_export import TextExporter
+
+def normalise_guest_id(guest_id):
+    """Numeric ids are stored as ints, like the ids of the seeded guests."""
+    if isinstance(guest_id, str):
+        guest_id = guest_id.strip()
+        if guest_id.isdigit():
+            return int(guest_id)
+    return guest_id
+
+
+_open_systems = weakref.WeakSet()  # Systems not closed yet, see close_open_systems()
+
+
+@atexit.register
+def close_open_systems():
+    """Flushes queued writes and closes the storage of every system still open at exit."""
+    for system in list(_open_systems):
+        system.close()
+
+
+class TicketType(Enum):
+    SINGLE_DAY_PASS = {
+        "description": "Access to the park for one day.",
+        "limitations": "Valid only on selected date.",
+        "validity": "1 day",
+        "discount_available": "None.",
+    }
+    TWO_DAY_PASS = {
+        "description": "Access to the park for two consecutive days.",
+        "limitations": "Cannot be split over multiple trips.",
+        "validity": "2 days",
+        "discount_available": "10% off for online purchase.",
+    }
+    ANNUAL_MEMBERSHIP = {
+        "description": "Unlimited access for one year.",
+        "limitations": "Must be used by the same person",
+        "validity": "1 year",
+        "discount_available": "15% off on renewal.",
+    }
+    CHILD_TICKET = {
+        "description": "Discounted ticket for children age (3-12)",
+        "limitations": "Valid only on selected date must be accompanied by an adult.",
+        "validity": "1 day",
+        "discount_available": "None.",
+    }
+    GROUP_TICKET = {
+        "description": "Special rate for groups of 10",
+        "limitations": "Must be booked in advance.",
+        "validity": "1 day",
+        "discount_available": "20% off when buying 2 or more.",
+    }
+    VIP_EXPERIENCE_PASS = {
+        "description": "Includes expedited access and reserved seating for shows",
+        "limitations": "Limited availability must be purchased in advance.",
+        "validity": "1 day",
+        "discount_available": "None.",
+    }
+
+class OrderConflictError(ValueError):
+    """Raised when an order id or idempotency key is already used by a different order."""
+
+
+def count_tickets(items):
+    """Returns {(TicketType, visit date ordinal): quantity} of (ticket type, visit date, quantity) items."""
+    counts = {}
+    for ticket_type, visit_date, quantity in items:
+        key = (ticket_type, to_ordinal(visit_date))
+        counts[key] = counts.get(key, 0) + quantity
+    return counts
+
+
+class TicketBookingSystem:
+    def __init__(self, storage=None, text_exporter=None):
+        self.__guests = {}            # guest_id -> Guest, in registration order
+        self.__guests_by_name = {}    # casefolded name -> {guest_id: Guest}
+        self.__guests_by_email = {}   # casefolded email -> {guest_id: Guest}
+        self.__guest_search = GuestSearchIndex()  # Name, email and phone prefixes
+        self.__admin = None           # Admin object
+        self.__events = []
+        self.__event_index = EventIndex()  # Events by the dates they run
+        self.__sales_adjustment = 0   # Sales set or added by hand, on top of the committed orders
+        self.__sales = SalesCounters()  # Sales by day, ticket type and payment method
+        self.__storage = storage if storage is not None else PickleStorage()
+        self.__guest_persistence = GuestPersistenceManager(self.__storage)  # Write-behind guest storage
+        self.__inventory = TicketInventory()  # Capacity per ticket type and visit date
+        self.__ticket_ids = TicketIdAllocator()
+        self.__availability = None    # AvailabilityCalendar, created on first use
+        self.__pricing = PricingEngine()  # Prices and discount rules
+        self.__catalog = None         # Catalog snapshot of the pricing version it was built from
+        self.__text_exporter = text_exporter if text_exporter is not None else TextExporter()
+        _open_systems.add(self)  # Closed at exit unless closed before
+
+    # Getters and Setters
+    def get_registered_guests(self):
+        return list(self.__guests.values())
+
+    def set_guests(self, guests):
+        if isinstance(guests, list):
+            self.__guests = {}
+            self.__guests_by_name = {}
+            self.__guests_by_email = {}
+            self.__guest_search = GuestSearchIndex()
+            for guest in guests:
+                self.register_new_guest(guest)
+        else:
+            raise TypeError("Guests should be a list.")
+
+    def get_admin(self):
+        return self.__admin
+
+    def set_admin(self, admin):
+        self.__admin = admin
+
+    def get_events(self):
+        return self.__events
+
+    def set_events(self, events):
+        if isinstance(events, list):
+            self.__events = events
+            self.__event_index = EventIndex(events)
+        else:
+            raise TypeError("Events should be a list.")
+
+    def get_total_sales(self):
+        """Returns the sales of every committed order, from the sales counters, plus any set by hand."""
+        return self.__sales.get_total() + self.__sales_adjustment
+
+    def set_total_sales(self, total_sales):
+        if isinstance(total_sales, (int, float)):
+            self.__sales_adjustment = total_sales - self.__sales.get_total()
+        else:
+            raise TypeError("Total sales should be a number.")
+
+    def increase_total_sales(self, amount):
+        """
+        Increases the total sales by a given amount, for sales made outside
+        purchase orders: committed orders are counted already.
+        """
+        if isinstance(amount, (int, float)) and amount > 0:
+            self.__sales_adjustment += amount
+        else:
+            raise ValueError("Amount should be a positive number.")
+
+    def get_storage(self):
+        return self.__storage
+
+    def get_sales(self):
+        return self.__sales
+
+    @timed(ORDER_SECONDS, "commit")
+    def commit_order(self, guest, order):
+        """
+        Persists a purchase order placed by the given guest, updating the
+        sales counters in the same write. An order saved again under the same
+        order_id replaces the earlier one in the counters.
+        """
+        guest_id = guest.get_guest_id() if guest else None
+        changes = []
+        previous = self.__storage.fetch_order(order.get_order_id())
+        if previous is not None:
+            changes += self.__sales.remove_order(previous)
+        changes += self.__sales.record_order(order)
+        self.__storage.save_order(order, guest_id, changes)
+
+    @timed(ORDER_SECONDS, "cancel")
+    def cancel_order(self, order_id):
+        """
+        Cancels a purchase order: removes it from storage and the sales
+        counters and returns its seats to the inventory. Returns the order.
+        """
+        order = self.__storage.fetch_order(order_id)
+        if order is None:
+            raise ValueError(f"No order with ID {order_id}.")
+        changes = self.__sales.remove_order(order)
+        guest_id = self.__storage.delete_order(order_id, changes)
+
+        seats = {}
+        for ticket in order.get_tickets():
+            key = (ticket.get_type(), ticket.get_visit_date())
+            seats[key] = seats.get(key, 0) + 1
+        for (ticket_type, visit_date), quantity in seats.items():
+            self.__inventory.cancel(ticket_type, visit_date, quantity)
+
+        guest = self.fetch_guest_by_id(guest_id) if guest_id is not None else None
+        if guest:
+            guest.remove_purchase_order(order_id)
+        return order
+
+    def fetch_order_by_id(self, order_id):
+        """Returns a purchase order by its id, or None if it does not exist."""
+        return self.__storage.fetch_order(order_id)
+
+    def fetch_order_by_idempotency_key(self, idempotency_key):
+        """Returns (guest_id, order) of the order placed under an idempotency key, or None."""
+        return self.__storage.fetch_order_by_key(idempotency_key)
+
+    def find_repeated_order(self, idempotency_key, guest_id, items=None, payment_method=None):
+        """
+        Returns the order already placed under idempotency_key, so a retried
+        submission gets it back instead of placing a second order, or None if
+        the key is new or empty. Raises OrderConflictError if the key was used
+        by another guest, for other (ticket type, visit date, quantity) items
+        or with another payment method; items or payment_method left None are
+        not compared.
+        """
+        if not idempotency_key:
+            return None
+        found = self.__storage.fetch_order_by_key(idempotency_key)
+        if found is None:
+            return None
+        owner, order = found
+        if (str(owner) != str(guest_id)
+                or items is not None and count_tickets(items) != order.count_tickets()
+                or payment_method is not None and payment_method != order.get_payment_method()):
+            raise OrderConflictError(f"Idempotency key {idempotency_key} was used for a different order.")
+        return order
+
+    def new_order_id(self, tickets):
+        """
+        Returns a server-generated id for an order of the given tickets:
+        ORD-<id of its first ticket>. Ticket ids are handed out without
+        locking and never twice, so neither are these. An id already taken by
+        an order entered by hand is skipped.
+        """
+        number = tickets[0].get_ticket_id() if tickets else self.allocate_ticket_id()
+        order_id = f"ORD-{number}"
+        while self.__storage.fetch_order(order_id) is not None:
+            order_id = f"ORD-{self.allocate_ticket_id()}"
+        return order_id
+
+    def fetch_orders_for_guest(self, guest_id, after=None, limit=None):
+        """
+        Returns the stored purchase orders of a guest in history order, see
+        PurchaseOrder.history_key(), optionally only those after a given
+        (order_date, order_id) key and at most limit of them.
+        """
+        return self.__storage.fetch_orders_for_guest(guest_id, after, limit)
+
+    def index_event(self, event):
+        self.__event_index.add(event)
+
+    def unindex_event(self, event):
+        self.__event_index.remove(event)
+
+    def fetch_events_overlapping(self, start_date, end_date=None):
+        """
+        Returns the events running on any day from start_date to end_date,
+        or on start_date alone, ordered by start date.
+        """
+        start_date = parse_date(start_date)
+        end_date = parse_date(end_date) if end_date is not None else None
+        if start_date is None:
+            raise ValueError("Please enter a date.")
+        return self.__event_index.overlapping(start_date, end_date)
+
+    def get_sales_by_date(self, day):
+        """Returns the total price of the orders placed on the given date."""
+        return self.__storage.sales_by_date(day)
+
+    def get_guest_persistence(self):
+        return self.__guest_persistence
+
+    def get_inventory(self):
+        return self.__inventory
+
+    def get_text_exporter(self):
+        return self.__text_exporter
+
+    def set_text_exporter(self, text_exporter):
+        self.__text_exporter = text_exporter
+
+    def get_availability_calendar(self):
+        """
+        Returns the availability calendar of the next 365 days, kept in step
+        with the inventory. Needs NumPy.
+        """
+        if self.__availability is None:
+            self.__availability = AvailabilityCalendar(self.__inventory)
+        return self.__availability
+
+    def set_ticket_id_allocator(self, allocator):
+        """Replaces the ticket id allocator, e.g. with one of a shard's disjoint sequence."""
+        self.__ticket_ids = allocator
+
+    def allocate_ticket_id(self):
+        """Returns a new ticket id, unique even when tickets are sold concurrently."""
+        return self.__ticket_ids.next_id()
+
+    @timed(STORAGE_SECONDS, "load")
+    def load_from_storage(self):
+        """
+        Loads the guests and events saved by the storage backend into the system.
+        Purchase orders stay in storage until a guest's orders are first needed,
+        only the number of tickets sold per type and visit date is loaded.
+        """
+        for guest in self.__storage.load_guests(self):
+            self.__add_guest(guest)  # Saved ids are kept, their orders are stored under them
+        self.__events = self.__storage.load_events(self)
+        self.__event_index = EventIndex(self.__events)
+        if self.__text_exporter.is_consolidated():
+            # The consolidated file is rewritten whole, so it needs the saved guests and events too
+            for item in self.get_registered_guests() + self.__events:
+                self.__text_exporter.preload(item.get_text_file_name(), item.format_text_file())
+
+        sold = {}
+        for (type_name, visit_date), count in self.__storage.count_tickets_sold().items():
+            key = (TicketType[type_name], parse_date(visit_date))
+            sold[key] = sold.get(key, 0) + count  # Older rows may spell the same date differently
+        self.__inventory.restore_sold(sold)
+        self.__ticket_ids = TicketIdAllocator(self.__storage.max_ticket_id() + 1)
+
+        self.__sales = SalesCounters()
+        self.__sales.load_rows(self.__storage.load_sales())
+
+    def flush(self):
+        """Forces all pending writes to disk."""
+        self.__guest_persistence.flush()
+        self.__storage.flush()
+        self.__text_exporter.flush()
+
+    def close(self):
+        """Flushes pending writes and releases the storage backend. Closing again does nothing."""
+        if self not in _open_systems:
+            return
+        _open_systems.discard(self)
+        self.__guest_persistence.flush()
+        self.__storage.close()
+        self.__text_exporter.close()
+
+    def flush_if_due(self):
+        """Writes queued guest changes if the write-behind interval has passed."""
+        self.__guest_persistence.flush_if_due()
+
+    def register_new_guest(self, new_guest):
+        """
+        Adding a new guest to the system, replacing any guest with the same ID.
+        The ID is normalised first, so "7" typed in the GUI is the same guest
+        7 as one imported or registered through the API.
+        """
+        guest_id = normalise_guest_id(new_guest.get_guest_id())
+        if guest_id != new_guest.get_guest_id():
+            new_guest.set_guest_id(guest_id)  # Also queues it to be saved under the new ID
+        self.__add_guest(new_guest)
+
+    def __add_guest(self, new_guest):
+        existing = self.__guests.get(new_guest.get_guest_id())
+        if existing is not None:
+            self.unindex_guest(existing)
+        self.index_guest(new_guest)
+
+    def delete_guest(self, guest_id):
+        """Deleting a guest from the system by their ID."""
+        guest = self.fetch_guest_by_id(guest_id)
+        if not guest:
+            return False
+        guest_id = guest.get_guest_id()
+        self.unindex_guest(guest)
+        self.__guest_persistence.mark_deleted(guest_id)
+        return True
+
+    def index_guest(self, guest):
+        """Adds a guest to the id, name, email and search indexes."""
+        guest_id = guest.get_guest_id()
+        self.__guests[guest_id] = guest
+        self.__guests_by_name.setdefault(guest.get_name().casefold(), {})[guest_id] = guest
+        self.__guests_by_email.setdefault(guest.get_email().casefold(), {})[guest_id] = guest
+        self.__guest_search.add(guest)
+
+    def unindex_guest(self, guest):
+        """
+        Removes a guest from the id, name, email and search indexes.
+        Returns False if the guest is not registered in this system.
+        """
+        guest_id = guest.get_guest_id()
+        if self.__guests.get(guest_id) is not guest:
+            return False
+        del self.__guests[guest_id]
+        self.__remove_from_bucket(self.__guests_by_name, guest.get_name().casefold(), guest_id)
+        self.__remove_from_bucket(self.__guests_by_email, guest.get_email().casefold(), guest_id)
+        self.__guest_search.remove(guest)
+        return True
+
+    def __remove_from_bucket(self, index, key, guest_id):
+        bucket = index.get(key)
+        if bucket is not None:
+            bucket.pop(guest_id, None)
+            if not bucket:
+                del index[key]
+
+    @timed(LOOKUP_SECONDS, "by_id")
+    def fetch_guest_by_id(self, id):
+        '''
+        Returns a guest by the id
+        '''
+        guest = self.__guests.get(normalise_guest_id(id))
+        if guest is None:  # Saved before ids were normalised, maybe as text
+            guest = self.__guests.get(id) or self.__guests.get(str(id))
+        return guest or False
+
+    @timed(LOOKUP_SECONDS, "by_name")
+    def fetch_guest_by_name(self, name):
+        """
+        Returns a guest by name
+        """
+        same_name = self.__guests_by_name.get(name.casefold())  # Case-insensitive match
+        if not same_name:
+            return None  # Explicitly return None when no guest is found
+        return next(iter(same_name.values()))  # Earliest registered guest with this name
+
+    @timed(LOOKUP_SECONDS, "by_email")
+    def fetch_guest_by_email(self, email):
+        """
+        Returns a guest by email, or None if no guest uses it
+        """
+        same_email = self.__guests_by_email.get(email.casefold())
+        if not same_email:
+            return None
+        return next(iter(same_email.values()))
+
+    @timed(LOOKUP_SECONDS, "search")
+    def search_guests(self, text, limit=20):
+        """
+        Returns up to limit guests whose name, any word of their name, email
+        or phone number starts with text (case-insensitive).
+        """
+        return self.__guest_search.search(text, limit)
+
+    def iter_guest_matches(self, text):
+        """Yields every guest search_guests() would find, as they are found."""
+        return self.__guest_search.iter_matches(text)
+
+    def count_guest_matches(self, text):
+        """Returns an upper bound on the number of guests matching text, in O(log n)."""
+        return self.__guest_search.count_upper_bound(text)
+
+    def create_event(self, name, start_date, end_date):
+        '''
+        Creates event and adds it into the system
+        '''
+        event = Event(name, start_date, end_date)
+        self.__events.append(event)
+
+    def fetch_guest_purchase_history(self, guest_name):
+        """
+        Returns the purchase history for the guest
+        """
+        guest = self.fetch_guest_by_name(guest_name)
+        if not guest:  # Check if the guest was not found
+            return f"No guest found with the name '{guest_name}'."
+        return guest.purchase_history()
+
+    def fetch_guest_purchase_history_page(self, guest_name, cursor=None, page_size=20):
+        """
+        Returns one page of the guest's purchase history as (records, next_cursor),
+        or None if no guest has that name. See Guest.purchase_history_page().
+        """
+        guest = self.fetch_guest_by_name(guest_name)
+        if not guest:
+            return None
+        return guest.purchase_history_page(cursor, page_size)
+
+    def get_pricing(self):
+        return self.__pricing
+
+    def get_catalog(self):
+        """
+        Returns the ticket catalog, an immutable Catalog snapshot. The same
+        snapshot is returned until the prices or discount rules change, then
+        one is built for the new version.
+        """
+        catalog = self.__catalog
+        version, prices, rules = self.__pricing.get_snapshot()
+        if catalog is None or catalog.version != version:
+            catalog = build_catalog(version, prices, rules)
+            self.__catalog = catalog  # Replaced whole, readers keep the snapshot they have
+        return catalog
+
+    def get_tickets(self):
+        """
+        Returns one sample ticket per type, at its list price and with its
+        current discounts. Prefer get_catalog(), which builds no tickets.
+        """
+        tickets = []
+        for number, entry in enumerate(self.get_catalog().entries, start=1):
+            ticket = Ticket(number, entry.price, "", entry.ticket_type)
+            ticket.set_discount_available(entry.discount_available)
+            tickets.append(ticket)
+        return tickets
+
+    def quote(self, cart, guest=None, online=False):
+        """
+        Prices a cart of (ticket_type, quantity, visit_date) lines with the
+        pricing engine. Annual memberships bought by a guest who already
+        holds one count as renewals.
+        """
+        cart = list(cart)
+        renewal = False
+        if guest and any(ticket_type == TicketType.ANNUAL_MEMBERSHIP for ticket_type, _, _ in cart):
+            renewal = any(ticket.get_type() == TicketType.ANNUAL_MEMBERSHIP
+                          for order in guest.get_purchase_orders() for ticket in order.get_tickets())
+        return self.__pricing.quote(cart, online, renewal)
+
+    def create_event(self, name, start_date, end_date):
+        event = Event(name, start_date, end_date, self)  # Binary association
+        self.__events.append(event)
+        self.__event_index.add(event)
+        return event
+
+class Event:
+    def __init__(self, name, start_date, end_date, system: TicketBookingSystem, restored=False):
+        self.__name = name
+        self.__start_date = parse_date(start_date)
+        self.__end_date = parse_date(end_date)
+        if self.__start_date is None or self.__end_date is None:
+            raise ValueError("Events need a start and an end date.")
+        if self.__end_date < self.__start_date:
+            raise ValueError("An event cannot end before it starts.")
+        self.__system = system  # Binary association
+        if not restored:  # Events rebuilt from storage are already saved
+            self.__save_to_file()
+            self.save_to_text_file()
+
+    def __getstate__(self):
+        # The system is not pickled along, reattach it with set_system() after loading
+        state = self.__dict__.copy()
+        state["_Event__system"] = None
+        return state
+
+    def __setstate__(self, state):
+        # Events pickled before dates were parsed hold them as strings
+        self.__dict__.update(state)
+        self.__start_date = parse_date(self.__start_date)
+        self.__end_date = parse_date(self.__end_date)
+
+    def get_text_file_name(self):
+        return f"event_{self.__name.replace(' ', '_')}.txt"
+
+    def format_text_file(self):
+        return (f"Event Name: {self.__name}\n"
+                f"Start Date: {format_date(self.__start_date)}\n"
+                f"End Date: {format_date(self.__end_date)}\n")
+
+    @timed(TEXT_FILE_SECONDS, "event")
+    def save_to_text_file(self):
+        """Queues the event details to be written to its .txt file in the background."""
+        self.__system.get_text_exporter().write(self.get_text_file_name(), self.format_text_file())
+
+    def get_name(self):
+        return self.__name
+
+    def set_name(self, name):
+        self.__name = name
+
+    def get_start_date(self):
+        return self.__start_date
+
+    def set_start_date(self, start_date):
+        self.__system.unindex_event(self)
+        self.__start_date = parse_date(start_date)
+        self.__system.index_event(self)
+
+    def get_end_date(self):
+        return self.__end_date
+
+    def set_end_date(self, end_date):
+        self.__system.unindex_event(self)
+        self.__end_date = parse_date(end_date)
+        self.__system.index_event(self)
+
+    def get_system(self):
+        return self.__system
+
+    def set_system(self, system):
+        self.__system = system
+
+    def __save_to_file(self):
+        """
+        Saves the event through the system's storage backend.
+        """
+        self.__system.get_storage().save_event(self)
+
+
+class User:
+    def __init__(self, name, email, password):
+        self.__name = name
+        self.__email = email
+        self.__password = password
+
+    def get_name(self):
+        return self.__name
+
+    def set_name(self, name):
+        self.__name = name
+
+    def get_email(self):
+        return self.__email
+
+    def set_email(self, email):
+        self.__email = email
+
+    def get_password(self):
+        return self.__password
+
+    def set_password(self, password):
+        self.__password = password
+
+class Guest(User):
+    def __init__(self, guest_id, name, email, password, phone, system: TicketBookingSystem,
+                 restored=False):
+        super().__init__(name, email, password)
+        self.__guest_id = guest_id
+        self.__phone = phone
+        self.__bookingsystem = system  # Aggregation
+
+        if restored:
+            # Rebuilt from storage: already saved, orders are fetched on first use
+            self.__purchase_orders = None
+        else:
+            self.__purchase_orders = []
+            # Queue the guest to be written to storage and its .txt file
+            self.__bookingsystem.get_guest_persistence().mark_dirty(self)
+
+    def __getstate__(self):
+        # Neither the system nor the orders are pickled along: reattach the
+        # system with set_system() after loading, orders are fetched from it
+        state = self.__dict__.copy()
+        state["_Guest__bookingsystem"] = None
+        state["_Guest__purchase_orders"] = None
+        return state
+
+    def get_text_file_name(self):
+        return f"guest_{self.__guest_id}.txt"
+
+    def format_text_file(self):
+        return (f"Guest ID: {self.__guest_id}\n"
+                f"Name: {self.get_name()}\n"
+                f"Email: {self.get_email()}\n"
+                f"Phone: {self.__phone}\n")
+
+    @timed(TEXT_FILE_SECONDS, "guest")
+    def save_to_text_file(self):
+        """Queues the guest details to be written to its .txt file in the background."""
+        self.__bookingsystem.get_text_exporter().write(self.get_text_file_name(), self.format_text_file())
+
+    def get_guest_id(self):
+        return self.__guest_id
+
+    def set_guest_id(self, guest_id):
+        persistence = self.__bookingsystem.get_guest_persistence()
+        registered = self.__bookingsystem.unindex_guest(self)
+        persistence.mark_deleted(self.__guest_id)
+        self.__guest_id = guest_id
+        if registered:
+            self.__bookingsystem.index_guest(self)  # Keep the system's lookups in step
+        persistence.mark_dirty(self)
+
+    def set_name(self, name):
+        registered = self.__bookingsystem.unindex_guest(self)
+        super().set_name(name)
+        if registered:
+            self.__bookingsystem.index_guest(self)
+        self.__bookingsystem.get_guest_persistence().mark_dirty(self)
+
+    def set_email(self, email):
+        registered = self.__bookingsystem.unindex_guest(self)
+        super().set_email(email)
+        if registered:
+            self.__bookingsystem.index_guest(self)
+        self.__bookingsystem.get_guest_persistence().mark_dirty(self)
+
+    def set_password(self, password):
+        super().set_password(password)
+        self.__bookingsystem.get_guest_persistence().mark_dirty(self)
+
+    def get_phone(self):
+        return self.__phone
+
+    def set_phone(self, phone):
+        registered = self.__bookingsystem.unindex_guest(self)
+        self.__phone = phone
+        if registered:
+            self.__bookingsystem.index_guest(self)  # Phone numbers are searchable
+        self.__bookingsystem.get_guest_persistence().mark_dirty(self)
+
+    def get_system(self):
+        return self.__bookingsystem
+
+    def set_system(self, system):
+        self.__bookingsystem = system
+
+    def get_purchase_orders(self):
+        if self.__purchase_orders is None:
+            self.__purchase_orders = self.__bookingsystem.fetch_orders_for_guest(self.__guest_id)
+        return self.__purchase_orders
+
+    def set_purchase_orders(self, purchase_orders):
+        self.__purchase_orders = purchase_orders
+
+    def remove_purchase_order(self, order_id):
+        """Drops a cancelled order from the orders loaded for this guest."""
+        if self.__purchase_orders is not None:
+            self.__purchase_orders = [order for order in self.__purchase_orders
+                                      if order.get_order_id() != order_id]
+
+    def add_purchase_order(self, order_id, tickets, total_price, payment_method="Unknown", idempotency_key=None):
+        """
+        Records a new order of this guest. Leave order_id None to have one
+        generated. Raises OrderConflictError if the order id or idempotency
+        key is already used; see TicketBookingSystem.find_repeated_order() to
+        return the earlier order to a retried submission instead.
+        """
+        system = self.__bookingsystem
+        if order_id is None:
+            order_id = system.new_order_id(tickets)
+        elif system.fetch_order_by_id(order_id) is not None:
+            raise OrderConflictError(f"Order ID {order_id} is already used.")
+        if idempotency_key and system.fetch_order_by_idempotency_key(idempotency_key) is not None:
+            raise OrderConflictError(f"Idempotency key {idempotency_key} is already used.")
+        purchase_order = PurchaseOrder(order_id, tickets, total_price, datetime.datetime.now(),
+                                       payment_method, idempotency_key)  # Composition
+        # Kept in history order, where an order placed now almost always goes last
+        bisect.insort(self.get_purchase_orders(), purchase_order, key=PurchaseOrder.history_key)
+        self.__bookingsystem.commit_order(self, purchase_order)
+        return purchase_order
+
+    def purchase_history_page(self, cursor=None, page_size=20):
+        """
+        Returns one page of purchase history records, oldest order first, and
+        the cursor of the next page, or None after the last page. The cursor is
+        the ISO order date and order id of the last record, so orders placed
+        at the same moment are neither skipped nor repeated between pages.
+        """
+        if not isinstance(page_size, int) or page_size < 1:
+            raise ValueError("Page size should be a positive whole number.")
+        after = None
+        if cursor:
+            order_date, _, order_id = cursor.partition("|")
+            after = (datetime.datetime.fromisoformat(order_date), order_id)
+        if self.__purchase_orders is None:
+            # Not loaded yet: read just this page from storage
+            orders = self.__bookingsystem.fetch_orders_for_guest(self.__guest_id, after, page_size + 1)
+        else:
+            start = 0
+            if after is not None:  # Orders are kept in history order
+                start = bisect.bisect_right(self.__purchase_orders, after, key=PurchaseOrder.history_key)
+            orders = self.__purchase_orders[start:start + page_size + 1]
+
+        records = [order.history_record() for order in orders[:page_size]]
+        next_cursor = None
+        if len(orders) > page_size:
+            next_cursor = f"{records[-1]['order_date']}|{orders[page_size - 1].history_key()[1]}"
+        return records, next_cursor
+
+    def iter_purchase_history(self, page_size=100):
+        """Yields purchase history records one page at a time, oldest first."""
+        cursor = None
+        while True:
+            records, cursor = self.purchase_history_page(cursor, page_size)
+            yield from records
+            if cursor is None:
+                return
+
+    def purchase_history(self):
+        """Return a string representation of the guest's purchase history."""
+        parts = []
+        for record in self.iter_purchase_history():
+            if not parts:
+                parts.append(f"Purchase History for {self.get_name()}:\n" + "=" * 40 + "\n")
+            parts.append(format_history_record(record))
+        if not parts:
+            return "No purchase history available."
+        return "".join(parts)
+
+
+def format_history_record(record):
+    """Returns the text shown for one purchase history record."""
+    lines = [
+        f"Order ID: {record['order_id']}\n",
+        f"Order Date: {datetime.datetime.fromisoformat(record['order_date'])}\n",
+        f"Total Price: DHS{record['total_price']}\n",
+        "Tickets:\n",
+    ]
+    for ticket in record["tickets"]:
+        lines.append(
+            f"  - Ticket ID: {ticket['ticket_id']}\n"
+            f"    Description: {ticket['description']}\n"
+            f"    Price: DHS{ticket['price']}\n"
+            f"    Visit Date: {ticket['visit_date']}\n"
+            f"    Limitations: {ticket['limitations']}\n"
+            f"    Validity: {ticket['validity']} days\n"
+            f"    Discount Available: {ticket['discount_available']}\n"
+        )
+    lines.append("-" * 40 + "\n")
+    return "".join(lines)
+
+
+class PurchaseOrder:
+    def __init__(self, order_id, tickets, total_price, order_date, payment_method="Unknown",
+                 idempotency_key=None):
+        self.__order_id = order_id
+        self.__tickets = tickets  # Directly use the list of Ticket objects
+        self.__total_price = total_price
+        self.__order_date = order_date
+        self.__payment_method = payment_method
+        self.__idempotency_key = idempotency_key  # Client's key for retries of the same submission
+
+    def __setstate__(self, state):
+        # Orders pickled before idempotency keys were kept have no key
+        state.setdefault("_PurchaseOrder__idempotency_key", None)
+        self.__dict__.update(state)
+
+    def get_order_id(self):
+        return self.__order_id
+
+    def set_order_id(self, order_id):
+        self.__order_id = order_id
+
+    def get_tickets(self):
+        return self.__tickets  # List of Ticket objects
+
+    def set_tickets(self, tickets):
+        self.__tickets = tickets
+
+    def get_total_price(self):
+        return self.__total_price
+
+    def set_total_price(self, total_price):
+        self.__total_price = total_price
+
+    def get_order_date(self):
+        return self.__order_date
+
+    def set_order_date(self, order_date):
+        self.__order_date = order_date
+
+    def get_payment_method(self):
+        return self.__payment_method
+
+    def set_payment_method(self, payment_method):
+        self.__payment_method = payment_method
+
+    def get_idempotency_key(self):
+        return self.__idempotency_key
+
+    def set_idempotency_key(self, idempotency_key):
+        self.__idempotency_key = idempotency_key
+
+    def count_tickets(self):
+        """Returns {(TicketType, visit date ordinal): quantity} of the order's tickets, see count_tickets()."""
+        counts = {}
+        for ticket in self.__tickets:
+            key = (ticket.get_type(), ticket.get_visit_ordinal())
+            counts[key] = counts.get(key, 0) + 1
+        return counts
+
+    def history_key(self):
+        """Returns (order_date, order_id as text), the order purchase history is listed in."""
+        return self.__order_date, str(self.__order_id)
+
+    def history_record(self):
+        """Returns the order as a purchase history record of plain values."""
+        return {
+            "order_id": self.__order_id,
+            "order_date": self.__order_date.isoformat(),
+            "total_price": self.__total_price,
+            "payment_method": self.__payment_method,
+            "tickets": [ticket.history_record() for ticket in self.__tickets],
+        }
+
+
+class TicketTypeInfo(namedtuple(
+        "TicketTypeInfo", "ticket_type description limitations validity discount_available")):
+    """Immutable catalog entry describing a TicketType, shared by all its tickets."""
+
+    __slots__ = ()
+
+
+# One shared entry per ticket type, built from the TicketType definitions
+TICKET_TYPE_CATALOG = {
+    ticket_type: TicketTypeInfo(ticket_type, **ticket_type.value) for ticket_type in TicketType
+}
+
+
+class Ticket:
+    """
+    A single ticket. Tickets are kept compact because archived orders hold
+    millions of them: the type's descriptive text is read from the shared
+    TICKET_TYPE_CATALOG entry, the visit date is stored as a date ordinal
+    (0 for no date) and there is no per-instance __dict__.
+    """
+
+    __slots__ = ("__ticket_id", "__price", "__visit_ordinal", "__info", "__overrides")
+
+    def __init__(self, ticket_id, price, visit_date, ticket_type: TicketType):
+        if not isinstance(ticket_type, TicketType):
+            raise ValueError(f"Invalid ticket type: {ticket_type}")
+        self.__ticket_id = ticket_id
+        self.__price = price
+        self.__visit_ordinal = to_ordinal(visit_date)
+        self.__info = TICKET_TYPE_CATALOG[ticket_type]
+        self.__overrides = None  # Per-ticket text that differs from the catalog, rarely used
+
+    def __getstate__(self):
+        # The trailing 2 marks prices stored as charged, see __setstate__
+        return (self.__ticket_id, self.__price, self.__visit_ordinal,
+                self.__info.ticket_type, self.__overrides, 2)
+
+    def __setstate__(self, state):
+        # Tickets pickled before the pricing engine stored group tickets at the
+        # per-person price and multiplied it by 10 when read
+        if isinstance(state, dict):  # Pickled before tickets had __slots__
+            ticket_type = state["_Ticket__ticket_type"]
+            price = state["_Ticket__price"]
+            self.__init__(state["_Ticket__ticket_id"],
+                          price * 10 if ticket_type == TicketType.GROUP_TICKET else price,
+                          state["_Ticket__visit_date"], ticket_type)
+            return
+        ticket_id, price, visit_ordinal, ticket_type, overrides = state[:5]
+        if len(state) == 5 and ticket_type == TicketType.GROUP_TICKET:
+            price *= 10
+        self.__ticket_id = ticket_id
+        self.__price = price
+        self.__visit_ordinal = visit_ordinal
+        self.__info = TICKET_TYPE_CATALOG[ticket_type]
+        self.__overrides = overrides
+
+    def get_ticket_id(self):
+        return self.__ticket_id
+
+    def set_ticket_id(self, ticket_id):
+        self.__ticket_id = ticket_id
+
+    def get_price(self):
+        """Returns the price charged for the ticket, see PricingEngine."""
+        return self.__price
+
+    def set_price(self, price):
+        self.__price = price
+
+    def get_visit_date(self):
+        """Returns the visit date as a datetime.date, or None if none was given."""
+        return datetime.date.fromordinal(self.__visit_ordinal) if self.__visit_ordinal else None
+
+    def set_visit_date(self, visit_date):
+        self.__visit_ordinal = to_ordinal(visit_date)
+
+    def get_visit_ordinal(self):
+        return self.__visit_ordinal
+
+    def get_ticket_type(self):
+        return self.__info.ticket_type.name  # Return name of the Enum
+
+    def get_type(self):
+        return self.__info.ticket_type
+
+    def set_ticket_type(self, ticket_type):
+        self.__info = TICKET_TYPE_CATALOG[ticket_type]
+
+    def get_info(self):
+        return self.__info
+
+    def get_text_overrides(self):
+        """Returns the per-ticket texts that differ from the catalog, as a dict, or None."""
+        return dict(self.__overrides) if self.__overrides else None
+
+    def set_text_overrides(self, overrides):
+        self.__overrides = dict(overrides) if overrides else None
+
+    def __get_text(self, field):
+        if self.__overrides and field in self.__overrides:
+            return self.__overrides[field]
+        return getattr(self.__info, field)
+
+    def __set_text(self, field, value):
+        if self.__overrides is None:
+            self.__overrides = {}
+        self.__overrides[field] = value
+
+    def get_description(self):
+        return self.__get_text("description")
+
+    def set_description(self, description):
+        self.__set_text("description", description)
+
+    def get_limitations(self):
+        return self.__get_text("limitations")
+
+    def set_limitations(self, limitations):
+        self.__set_text("limitations", limitations)
+
+    def get_validity(self):
+        return self.__get_text("validity")
+
+    def set_validity(self, validity):
+        self.__set_text("validity", validity)
+
+    def get_discount_available(self):
+        return self.__get_text("discount_available")
+
+    def set_discount_available(self, discount_available):
+        self.__set_text("discount_available", discount_available)
+
+    def history_record(self):
+        """Returns the ticket as part of a purchase history record."""
+        return {
+            "ticket_id": self.__ticket_id,
+            "ticket_type": self.__info.ticket_type.name,
+            "description": self.get_description(),
+            "price": self.get_price(),
+            "visit_date": format_date(self.__visit_ordinal),
+            "limitations": self.get_limitations(),
+            "validity": self.get_validity(),
+            "discount_available": self.get_discount_available(),
+        }
+
+
+class Admin(User):
+    def __init__(self, admin_id, name, email, password, system: TicketBookingSystem):
+        super().__init__(name, email, password)
+        self.__admin_id = admin_id
+        self.__bookingsystem = system  # Aggregation
+
+    def __getstate__(self):
+        # The system is not pickled along, reattach it with set_system() after loading
+        state = self.__dict__.copy()
+        state["_Admin__bookingsystem"] = None
+        return state
+
+    def get_system(self):
+        return self.__bookingsystem
+
+    def set_system(self, system):
+        self.__bookingsystem = system
+
+    def get_admin_id(self):
+        return self.__admin_id
+
+    def set_admin_id(self, admin_id):
+        self.__admin_id = admin_id
+
+    def manage_system(self):
+        # Example of admin interacting with the TicketBookingSystem
+        return f"Managing system with total sales: {self.__bookingsystem.get_total_sales()}"
@@ -0,0 +1,245 @@
+"""
+Ticket prices and discount rules.
+
+PricingEngine is the one place prices come from. Discount rules are
+structured (a percentage or a fixed amount off, with group size, online,
+renewal and visit date conditions) and are compiled into lookup tables per
+ticket type, so pricing a cart line is a dict lookup and a bisect.
+"""
+import bisect
+import itertools
+import secrets
+from collections import namedtuple
+
+from . import models
+from .dates import format_date, parse_date
+
+# List price per ticket by TicketType name. A group ticket admits a group of 10.
+DEFAULT_PRICES = {
+    "SINGLE_DAY_PASS": 275,
+    "TWO_DAY_PASS": 480,
+    "ANNUAL_MEMBERSHIP": 1840,
+    "CHILD_TICKET": 185,
+    "GROUP_TICKET": 2200,
+    "VIP_EXPERIENCE_PASS": 550,
+}
+
+PERCENT = "percent"
+AMOUNT = "amount"
+
+
+class DiscountRule(namedtuple("DiscountRule", (
+        "ticket_type", "kind", "value", "min_quantity", "online_only", "renewal_only",
+        "valid_from", "valid_to"), defaults=(1, False, False, None, None))):
+    """
+    A discount on one ticket type: ``value`` percent or ``value`` dirhams off
+    each ticket, when the cart holds at least min_quantity tickets of the
+    type, optionally only online, only for renewals, or only for visits
+    from valid_from to valid_to (both inclusive, either may be open).
+    """
+
+    __slots__ = ()
+
+    def __new__(cls, ticket_type, kind, value, min_quantity=1, online_only=False, renewal_only=False,
+                valid_from=None, valid_to=None):
+        if not isinstance(ticket_type, models.TicketType):
+            ticket_type = models.TicketType[ticket_type]
+        if kind not in (PERCENT, AMOUNT):
+            raise ValueError(f"Discount kind should be '{PERCENT}' or '{AMOUNT}'.")
+        if value < 0 or (kind == PERCENT and value > 100):
+            raise ValueError("Discount value is out of range.")
+        if min_quantity < 1:
+            raise ValueError("Minimum quantity should be at least 1.")
+        valid_from, valid_to = parse_date(valid_from), parse_date(valid_to)
+        if valid_from and valid_to and valid_to < valid_from:
+            raise ValueError("Discount window ends before it starts.")
+        return super().__new__(cls, ticket_type, kind, value, min_quantity, bool(online_only),
+                               bool(renewal_only), valid_from, valid_to)
+
+    def saving(self, price):
+        """Returns the amount taken off one ticket of the given price."""
+        if self.kind == PERCENT:
+            return round(price * self.value / 100, 2)
+        return min(self.value, price)
+
+    def applies_on(self, visit_date):
+        if self.valid_from is None and self.valid_to is None:
+            return True
+        if visit_date is None:
+            return False
+        return ((self.valid_from is None or self.valid_from <= visit_date)
+                and (self.valid_to is None or visit_date <= self.valid_to))
+
+    def describe(self):
+        """Returns the rule as the text shown to guests."""
+        amount = f"{self.value:g}%" if self.kind == PERCENT else f"DHS{self.value:g}"
+        text = f"{amount} off"
+        if self.min_quantity > 1:
+            text += f" when buying {self.min_quantity} or more"
+        if self.online_only:
+            text += " for online purchase"
+        if self.renewal_only:
+            text += " on renewal"
+        if self.valid_from or self.valid_to:
+            text += f" for visits {format_date(self.valid_from) or '...'} to {format_date(self.valid_to) or '...'}"
+        return text + "."
+
+
+def default_rules():
+    """The discounts advertised in the ticket catalog."""
+    return [
+        DiscountRule("TWO_DAY_PASS", PERCENT, 10, online_only=True),
+        DiscountRule("ANNUAL_MEMBERSHIP", PERCENT, 15, renewal_only=True),
+        DiscountRule("GROUP_TICKET", PERCENT, 20, min_quantity=2),  # Two group tickets make 20 people
+    ]
+
+
+QuoteLine = namedtuple("QuoteLine", (
+    "ticket_type", "quantity", "visit_date", "unit_price", "discount", "line_total", "rule"))
+Quote = namedtuple("Quote", ("lines", "total"))
+
+
+class TypeTable:
+    """
+    Compiled rules of one ticket type for one (online, renewal) context.
+    thresholds holds the sorted minimum quantities of the undated rules and
+    best_savings[i] the largest saving per ticket among the rules up to
+    thresholds[i]; dated rules are few and checked one by one.
+    """
+
+    __slots__ = ("price", "thresholds", "best_savings", "best_rules", "dated_rules")
+
+    def __init__(self, price, rules):
+        self.price = price
+        self.thresholds = []
+        self.best_savings = []
+        self.best_rules = []
+        best_saving, best_rule = 0, None
+        for rule in sorted((rule for rule in rules if rule.valid_from is None and rule.valid_to is None),
+                           key=lambda rule: rule.min_quantity):
+            saving = rule.saving(price)
+            if saving > best_saving:
+                best_saving, best_rule = saving, rule
+            self.thresholds.append(rule.min_quantity)
+            self.best_savings.append(best_saving)
+            self.best_rules.append(best_rule)
+        self.dated_rules = [rule for rule in rules if rule.valid_from is not None or rule.valid_to is not None]
+
+    def best(self, quantity, visit_date):
+        """Returns (saving per ticket, rule) of the best discount, or (0, None)."""
+        index = bisect.bisect_right(self.thresholds, quantity) - 1
+        saving, rule = (self.best_savings[index], self.best_rules[index]) if index >= 0 else (0, None)
+        for dated in self.dated_rules:
+            if dated.min_quantity <= quantity and dated.applies_on(visit_date):
+                dated_saving = dated.saving(self.price)
+                if dated_saving > saving:
+                    saving, rule = dated_saving, dated
+        return saving, rule
+
+
+class PricingEngine:
+    """
+    Prices carts from the list prices and discount rules. Discounts do not
+    stack: each ticket gets the single best discount it qualifies for.
+
+    Every change to the prices or rules gives a new version, see
+    get_snapshot(). A version is a token drawn for the engine followed by a
+    count of its changes, like an ETag: an engine built or loaded in another
+    process, or after a restart, never repeats one a client may hold.
+    """
+
+    def __init__(self, prices=None, rules=None):
+        self.__prices = {models.TicketType[name]: price for name, price in DEFAULT_PRICES.items()}
+        if prices:
+            self.__prices.update(prices)
+        self.__rules = default_rules() if rules is None else list(rules)
+        self.__token = secrets.token_hex(4)
+        self.__versions = itertools.count(1)  # next() runs in C, so concurrent edits never share a version
+        self.__tables = {}
+        self.__snapshot = None
+        self.__compile()
+
+    def __getstate__(self):
+        return {"prices": self.__prices, "rules": self.__rules}
+
+    def __setstate__(self, state):
+        self.__init__(state["prices"], state["rules"])  # A new token, so catalogs built before never look current
+
+    def __compile(self):
+        """Builds the lookup table of every ticket type and context."""
+        tables = {}
+        for ticket_type, price in self.__prices.items():
+            rules = [rule for rule in self.__rules if rule.ticket_type == ticket_type]
+            for online in (False, True):
+                for renewal in (False, True):
+                    usable = [rule for rule in rules
+                              if (online or not rule.online_only) and (renewal or not rule.renewal_only)]
+                    tables[(ticket_type, online, renewal)] = TypeTable(price, usable)
+        self.__tables = tables  # Swapped in whole, so quotes in progress see one version
+        version = f"{self.__token}-{next(self.__versions)}"
+        self.__snapshot = (version, dict(self.__prices), tuple(self.__rules))
+
+    def get_version(self):
+        return self.__snapshot[0]
+
+    def get_snapshot(self):
+        """
+        Returns (version, prices by TicketType, rules) as of the latest change.
+        The tuple is replaced whole on every change and its parts are copies,
+        so a reader never sees half an edit.
+        """
+        return self.__snapshot
+
+    def get_price(self, ticket_type):
+        """Returns the list price of a ticket type, before discounts."""
+        return self.__prices[ticket_type]
+
+    def set_price(self, ticket_type, price):
+        if not isinstance(price, (int, float)) or price < 0:
+            raise ValueError("Price should be a positive number.")
+        self.__prices[ticket_type] = price
+        self.__compile()
+
+    def get_rules(self, ticket_type=None):
+        return [rule for rule in self.__rules if ticket_type is None or rule.ticket_type == ticket_type]
+
+    def add_rule(self, rule):
+        self.__rules.append(rule)
+        self.__compile()
+
+    def set_rules(self, ticket_type, rules):
+        """Replaces every rule of a ticket type."""
+        self.__rules = [rule for rule in self.__rules if rule.ticket_type != ticket_type] + list(rules)
+        self.__compile()
+
+    def describe_discounts(self, ticket_type):
+        """Returns the discounts of a ticket type as text, as shown on its ticket."""
+        rules = self.get_rules(ticket_type)
+        return " ".join(rule.describe() for rule in rules) if rules else "None."
+
+    def quote(self, cart, online=False, renewal=False):
+        """
+        Prices a cart, an iterable of (ticket_type, quantity, visit_date)
+        lines. Group size thresholds count every ticket of a type in the cart.
+        Returns a Quote of QuoteLines and the total.
+        """
+        cart = list(cart)
+        quantities = {}
+        for ticket_type, quantity, _ in cart:
+            quantities[ticket_type] = quantities.get(ticket_type, 0) + quantity
+        tables = self.__tables
+        lines = []
+        total = 0
+        for ticket_type, quantity, visit_date in cart:
+            table = tables[(ticket_type, online, renewal)]
+            saving, rule = table.best(quantities[ticket_type], visit_date)
+            unit_price = table.price - saving
+            line_total = unit_price * quantity
+            lines.append(QuoteLine(ticket_type, quantity, visit_date, unit_price, saving, line_total, rule))
+            total += line_total
+        return Quote(lines, total)
+
+    def quote_many(self, carts, online=False, renewal=False):
+        """Prices many carts in one call, see quote()."""
+        quote = self.quote
+        return [quote(cart, online, renewal) for cart in carts]
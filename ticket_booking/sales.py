@@ -0,0 +1,94 @@
+"""
+Sales aggregates maintained as orders are committed.
+"""
+import threading
+
+
+class SalesCounters:
+    """
+    Running ticket counts and sales amounts keyed by
+    (order date, TicketType name, payment method).
+
+    Each committed order updates the counters once, so totals for a day,
+    ticket type or payment method are read from the counters instead of
+    rescanning purchase orders. Per-day totals are kept separately so the
+    dashboard figure is a single lookup.
+    """
+
+    def __init__(self):
+        self.__counters = {}      # (date, ticket type name, payment method) -> [tickets, amount]
+        self.__daily_totals = {}  # date -> amount
+        self.__lock = threading.Lock()
+
+    def __getstate__(self):
+        return {"counters": self.get_rows()}
+
+    def __setstate__(self, state):
+        self.__init__()
+        self.load_rows(state["counters"])
+
+    def __apply(self, day, ticket_type, payment_method, tickets, amount):
+        counter = self.__counters.setdefault((day, ticket_type, payment_method), [0, 0])
+        counter[0] += tickets
+        counter[1] += amount
+        self.__daily_totals[day] = self.__daily_totals.get(day, 0) + amount
+
+    def __order_changes(self, order, sign):
+        """Groups an order's tickets into one change per counter key."""
+        day = order.get_order_date().date()
+        payment_method = order.get_payment_method()
+        grouped = {}
+        for ticket in order.get_tickets():
+            change = grouped.setdefault(ticket.get_ticket_type(), [0, 0])
+            change[0] += sign
+            change[1] += sign * ticket.get_price()
+        return [(day, ticket_type, payment_method, tickets, amount)
+                for ticket_type, (tickets, amount) in grouped.items()]
+
+    def record_order(self, order):
+        """Adds an order to the counters and returns the changes applied."""
+        return self.apply_changes(self.__order_changes(order, 1))
+
+    def remove_order(self, order):
+        """Takes an order back out of the counters and returns the changes applied."""
+        return self.apply_changes(self.__order_changes(order, -1))
+
+    def apply_changes(self, changes):
+        """Applies (date, ticket type name, payment method, tickets, amount) changes."""
+        with self.__lock:
+            for change in changes:
+                self.__apply(*change)
+        return changes
+
+    def load_rows(self, rows):
+        """Loads counter rows saved by a storage backend."""
+        self.apply_changes(rows)
+
+    def get_rows(self):
+        """Returns every counter as a (date, ticket type name, payment method, tickets, amount) row."""
+        with self.__lock:
+            return [key + tuple(value) for key, value in self.__counters.items()]
+
+    def get_total(self, day=None):
+        """Returns the sales amount of one day, or of all days."""
+        if day is None:
+            return sum(self.__daily_totals.values())
+        return self.__daily_totals.get(day, 0)
+
+    def get_totals_by_ticket_type(self, day):
+        """Returns {ticket type name: [tickets, amount]} for one day."""
+        return self.__totals_for(day, 1)
+
+    def get_totals_by_payment_method(self, day):
+        """Returns {payment method: [tickets, amount]} for one day."""
+        return self.__totals_for(day, 2)
+
+    def __totals_for(self, day, position):
+        totals = {}
+        with self.__lock:
+            for key, (tickets, amount) in self.__counters.items():
+                if key[0] == day and (tickets or amount):
+                    total = totals.setdefault(key[position], [0, 0])
+                    total[0] += tickets
+                    total[1] += amount
+        return totals
@@ -0,0 +1,104 @@
+"""
+Versioned records of guests, events and purchase orders, for storage.
+
+A record is a tuple of plain values led by its format version. References
+between objects are written as keys: an order names its guest by guest_id,
+and no record refers to the TicketBookingSystem, which the load functions
+take as an argument and attach to the objects they rebuild. Saving one
+entity therefore writes only that entity, however much else the system holds.
+
+Records written before versions were added are recognised by their shape
+and upgraded when loaded.
+"""
+import datetime
+
+from . import models
+from .dates import parse_date
+
+GUEST_VERSION = 1
+EVENT_VERSION = 1
+ORDER_VERSION = 2
+
+
+def check_version(record, version, kind):
+    if record[0] != version:
+        raise ValueError(f"Unsupported {kind} record version {record[0]}.")
+
+
+def dump_guest(guest):
+    """Returns (version, guest_id, name, email, password, phone)."""
+    return (GUEST_VERSION, guest.get_guest_id(), guest.get_name(), guest.get_email(),
+            guest.get_password(), guest.get_phone())
+
+
+def load_guest(record, system, guest_id=None):
+    """
+    Rebuilds a Guest of system from a record. Unversioned records, stored as
+    (name, email, password, phone) under the guest's id, need guest_id.
+    """
+    if len(record) == 4:
+        record = (GUEST_VERSION, guest_id) + tuple(record)
+    check_version(record, GUEST_VERSION, "guest")
+    _, guest_id, name, email, password, phone = record
+    return models.Guest(guest_id, name, email, password, phone, system, restored=True)
+
+
+def dump_event(event):
+    """Returns (version, name, start date ordinal, end date ordinal)."""
+    return (EVENT_VERSION, event.get_name(), event.get_start_date().toordinal(),
+            event.get_end_date().toordinal())
+
+
+def load_event(record, system, name=None):
+    """
+    Rebuilds an Event of system from a record. Unversioned records, stored
+    as (start_date, end_date) under the event's name, need name.
+    """
+    if len(record) == 2:
+        record = (EVENT_VERSION, name, parse_date(record[0]).toordinal(), parse_date(record[1]).toordinal())
+    check_version(record, EVENT_VERSION, "event")
+    _, name, start_ordinal, end_ordinal = record
+    return models.Event(name, start_ordinal, end_ordinal, system, restored=True)
+
+
+def dump_ticket(ticket):
+    """Returns (ticket_id, ticket type name, price, visit date ordinal, text overrides or None)."""
+    return (ticket.get_ticket_id(), ticket.get_ticket_type(), ticket.get_price(),
+            ticket.get_visit_ordinal(), ticket.get_text_overrides())
+
+
+def load_ticket(record):
+    ticket_id, type_name, price, visit_ordinal, overrides = record
+    ticket = models.Ticket(ticket_id, price, visit_ordinal, models.TicketType[type_name])
+    if overrides:
+        ticket.set_text_overrides(overrides)
+    return ticket
+
+
+def dump_order(order, guest_id=None):
+    """
+    Returns (version, order_id, guest_id, total_price, ISO order date,
+    payment_method, ticket records, idempotency key or None). The guest is
+    named by id only.
+    """
+    return (ORDER_VERSION, order.get_order_id(), guest_id, order.get_total_price(),
+            order.get_order_date().isoformat(), order.get_payment_method(),
+            tuple(dump_ticket(ticket) for ticket in order.get_tickets()), order.get_idempotency_key())
+
+
+def load_order(record):
+    """
+    Returns (guest_id, PurchaseOrder) from a record. Unversioned records are
+    (guest_id, pickled PurchaseOrder) pairs and are returned as they are;
+    version 1 records have no idempotency key.
+    """
+    if len(record) == 2:
+        return tuple(record)
+    if record[0] == 1:
+        record = (ORDER_VERSION,) + tuple(record[1:]) + (None,)
+    check_version(record, ORDER_VERSION, "order")
+    _, order_id, guest_id, total_price, order_date, payment_method, tickets, idempotency_key = record
+    order = models.PurchaseOrder(order_id, [load_ticket(ticket) for ticket in tickets], total_price,
+                                 datetime.datetime.fromisoformat(order_date), payment_method,
+                                 idempotency_key)
+    return guest_id, order
@@ -0,0 +1,457 @@
+"""
+Sharded order processing across worker processes.
+
+Guests are hash-partitioned by guest_id over N shards. Each shard is a worker
+process with its own TicketBookingSystem and storage in its own directory,
+so checkouts on different shards run on different cores and write to
+different files. ShardedBookingService is the front dispatcher: it routes
+each request to the shard owning the guest, fans queries that span guests
+out to every shard, and merges global aggregates such as total sales.
+
+Capacity-limited ticket types are split into per-shard quotas, so a shard
+can sell out of a slot while another still has seats of it left.
+
+Run a ticket drop with ``python -m ticket_booking.sharding --shards 4 --orders 20000``.
+"""
+import argparse
+import concurrent.futures
+import datetime
+import itertools
+import multiprocessing
+import os
+import pickle
+import queue
+import threading
+import time
+import zlib
+
+from .dates import parse_date
+from .inventory import DEFAULT_CAPACITIES, TicketIdAllocator
+from .models import Guest, OrderConflictError, Ticket, TicketBookingSystem, TicketType
+from .storage import PickleStorage, SQLiteStorage
+
+STORAGES = {
+    "pickle": PickleStorage,
+    "sqlite": SQLiteStorage,
+}
+
+POLL_SECONDS = 1.0  # How often the collector looks for shards that died without a word
+
+
+def shard_of(guest_id, shard_count):
+    """Returns the shard owning a guest. Stable across processes and runs, unlike hash()."""
+    return zlib.crc32(str(guest_id).encode()) % shard_count
+
+
+def quota(capacity, shard_index, shard_count):
+    """Returns one shard's share of a capacity, None (unlimited) staying None."""
+    if capacity is None:
+        return None
+    return capacity // shard_count + (1 if shard_index < capacity % shard_count else 0)
+
+
+class ShardWorker:
+    """The booking system of one shard, answering the dispatcher's requests in its process."""
+
+    REQUESTS = frozenset((
+        "register_guest", "fetch_guest", "search_guests", "place_order", "cancel_order",
+        "purchase_history", "total_sales", "sales", "tickets_sold", "flush",
+    ))
+
+    def __init__(self, shard_index, shard_count, storage="sqlite", capacities=None):
+        self.__shard_index = shard_index
+        self.__system = TicketBookingSystem(STORAGES[storage]())
+        self.__system.load_from_storage()
+
+        # Ticket ids step by the shard count from a start of their own, so no two shards share one
+        next_id = self.__system.allocate_ticket_id()
+        start = next_id + (shard_index + 1 - next_id) % shard_count
+        self.__system.set_ticket_id_allocator(TicketIdAllocator(start, shard_count))
+
+        inventory = self.__system.get_inventory()
+        limits = {TicketType[name]: capacity for name, capacity in DEFAULT_CAPACITIES.items()}
+        limits.update(capacities or {})
+        for ticket_type, capacity in limits.items():
+            inventory.set_capacity(ticket_type, quota(capacity, shard_index, shard_count))
+
+    def handle(self, method, args):
+        if method not in self.REQUESTS:
+            raise ValueError(f"Unknown shard request: {method}")
+        result = getattr(self, method)(*args)
+        self.__system.flush_if_due()
+        return result
+
+    def close(self):
+        self.__system.close()
+
+    def __guest(self, guest_id):
+        guest = self.__system.fetch_guest_by_id(guest_id)
+        if not guest:
+            raise KeyError(f"No guest with ID {guest_id}.")
+        return guest
+
+    @staticmethod
+    def __guest_record(guest):
+        return {
+            "guest_id": guest.get_guest_id(),
+            "name": guest.get_name(),
+            "email": guest.get_email(),
+            "phone": guest.get_phone(),
+        }
+
+    def register_guest(self, guest_id, name, email, password, phone):
+        guest = Guest(guest_id, name, email, password, phone, self.__system)
+        self.__system.register_new_guest(guest)
+        return self.__guest_record(guest)
+
+    def fetch_guest(self, guest_id):
+        guest = self.__system.fetch_guest_by_id(guest_id)
+        return self.__guest_record(guest) if guest else None
+
+    def search_guests(self, text, limit):
+        return [self.__guest_record(guest) for guest in self.__system.search_guests(text, limit)]
+
+    def place_order(self, guest_id, lines, payment_method, order_id, idempotency_key=None):
+        """
+        Reserves, prices and records an order of (ticket type name, quantity,
+        visit date) lines for a guest of this shard, all or nothing. A retry
+        with the same idempotency_key returns the first order's record.
+        """
+        guest = self.__guest(guest_id)
+        cart = [(TicketType[type_name], quantity, parse_date(visit_date))
+                for type_name, quantity, visit_date in lines]
+        repeated = self.__system.find_repeated_order(
+            idempotency_key, guest_id, [(ticket_type, visit_date, quantity)
+                                        for ticket_type, quantity, visit_date in cart], payment_method)
+        if repeated is not None:
+            return repeated.history_record()
+        if order_id is not None and self.__system.fetch_order_by_id(order_id) is not None:
+            raise OrderConflictError(f"Order ID {order_id} is already used.")
+
+        inventory = self.__system.get_inventory()
+        holds = []
+        try:
+            for ticket_type, quantity, visit_date in cart:
+                holds.append(inventory.reserve(ticket_type, visit_date, quantity))
+        except Exception:
+            for hold_id in holds:
+                inventory.release(hold_id)
+            raise
+        inventory.commit_many(holds)  # All seats or none
+
+        try:
+            quote = self.__system.quote(cart, guest, online=True)
+            tickets = [
+                Ticket(self.__system.allocate_ticket_id(), line.unit_price, line.visit_date, line.ticket_type)
+                for line in quote.lines
+                for _ in range(line.quantity)
+            ]
+            # Generated ids are made of ticket ids, which are unique across shards
+            order = guest.add_purchase_order(order_id, tickets, quote.total, payment_method, idempotency_key)
+        except Exception:
+            # No order was placed, so the seats sold for it go back on sale
+            for ticket_type, quantity, visit_date in cart:
+                inventory.cancel(ticket_type, visit_date, quantity)
+            raise
+        return order.history_record()
+
+    def cancel_order(self, guest_id, order_id):
+        """Cancels one of the guest's orders. Returns its history record, or None if there is no such order."""
+        orders = self.__guest(guest_id).get_purchase_orders()
+        if not any(order.get_order_id() == order_id for order in orders):
+            return None
+        return self.__system.cancel_order(order_id).history_record()
+
+    def purchase_history(self, guest_id, cursor, page_size):
+        return self.__guest(guest_id).purchase_history_page(cursor, page_size)
+
+    def total_sales(self):
+        return self.__system.get_total_sales()
+
+    def sales(self, day):
+        sales = self.__system.get_sales()
+        return (sales.get_total(day), sales.get_totals_by_ticket_type(day),
+                sales.get_totals_by_payment_method(day))
+
+    def tickets_sold(self, type_name, visit_date):
+        return self.__system.get_inventory().get_sold(TicketType[type_name], parse_date(visit_date))
+
+    def flush(self):
+        self.__system.flush()
+
+
+def sendable(error):
+    """Returns error, or a RuntimeError describing it if it would be lost pickling it into a queue."""
+    try:
+        pickle.dumps(error)
+    except Exception:
+        return RuntimeError(f"{type(error).__name__}: {error}")
+    return error
+
+
+def run_shard(shard_index, shard_count, directory, storage, capacities, requests, results):
+    """
+    Worker process main loop: answers (request_id, method, args) from the
+    requests queue on the results queue until it receives None. It then
+    sends (None, shard_index, error), error being None unless the shard
+    could not start or stopped on an error.
+    """
+    worker = None
+    failure = None
+    try:
+        os.makedirs(directory, exist_ok=True)
+        os.chdir(directory)  # The shard's storage and text files live here
+        worker = ShardWorker(shard_index, shard_count, storage, capacities)
+        while True:
+            request = requests.get()
+            if request is None:
+                break
+            request_id, method, args = request
+            try:
+                results.put((request_id, True, worker.handle(method, args)))
+            except Exception as error:  # Sent back to the caller, the shard keeps serving
+                results.put((request_id, False, sendable(error)))
+    except Exception as error:
+        failure = sendable(error)
+    finally:
+        try:
+            if worker is not None:
+                worker.close()
+        finally:
+            results.put((None, shard_index, failure))
+
+
+def shard_down(shard_index, error):
+    """Returns the error a request to a stopped shard fails with."""
+    down = RuntimeError(f"Shard {shard_index} is down: {error}")
+    down.__cause__ = error
+    return down
+
+
+class ShardedBookingService:
+    """
+    Front dispatcher of the shards. Requests are sent to the worker processes
+    without waiting, and answered through Futures completed by a collector
+    thread, so a batch of checkouts runs on every shard at once.
+    """
+
+    def __init__(self, shard_count=None, directory="shards", storage="sqlite", capacities=None):
+        self.__shard_count = shard_count or os.cpu_count() or 1
+        self.__directory = os.path.abspath(directory)
+        self.__storage = storage
+        self.__capacities = capacities
+        self.__processes = []
+        self.__request_queues = []
+        self.__results = None
+        self.__collector = None
+        self.__pending = {}           # request_id -> (shard_index, Future)
+        self.__failed = {}            # shard_index -> error it stopped on
+        self.__request_ids = itertools.count(1)
+        self.__lock = threading.Lock()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def get_shard_count(self):
+        return self.__shard_count
+
+    def start(self):
+        """Starts one worker process per shard."""
+        if self.__processes:
+            return
+        context = multiprocessing.get_context("spawn")  # No locks or threads inherited from this process
+        self.__failed = {}
+        self.__results = context.Queue()
+        for shard_index in range(self.__shard_count):
+            requests = context.Queue()
+            process = context.Process(
+                target=run_shard, name=f"shard-{shard_index}", daemon=True,
+                args=(shard_index, self.__shard_count, os.path.join(self.__directory, f"shard_{shard_index}"),
+                      self.__storage, self.__capacities, requests, self.__results))
+            process.start()
+            self.__request_queues.append(requests)
+            self.__processes.append(process)
+        self.__collector = threading.Thread(target=self.__collect, name="shard-results", daemon=True)
+        self.__collector.start()
+
+    def __collect(self):
+        running = set(range(self.__shard_count))
+        while running:
+            try:
+                result = self.__results.get(timeout=POLL_SECONDS)
+            except queue.Empty:
+                for shard_index in list(running):  # A crashed shard sends nothing
+                    exitcode = self.__processes[shard_index].exitcode
+                    if exitcode not in (None, 0):
+                        running.discard(shard_index)
+                        self.__fail_shard(shard_index, RuntimeError(f"Process exited with code {exitcode}."))
+                continue
+            request_id, ok, value = result
+            if request_id is None:  # (None, shard_index, error): the shard stopped
+                _, shard_index, error = result
+                if shard_index in running:
+                    running.discard(shard_index)
+                    if error is not None:
+                        self.__fail_shard(shard_index, error)
+                continue
+            with self.__lock:
+                _, future = self.__pending.pop(request_id)
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    def __fail_shard(self, shard_index, error):
+        """Fails the requests a stopped shard will never answer; later ones fail on submit."""
+        with self.__lock:
+            self.__failed[shard_index] = error
+            request_ids = [request_id for request_id, (index, _) in self.__pending.items() if index == shard_index]
+            futures = [self.__pending.pop(request_id)[1] for request_id in request_ids]
+        for future in futures:
+            future.set_exception(shard_down(shard_index, error))
+
+    def close(self):
+        """Lets every shard finish its queued requests, flush and exit."""
+        if not self.__processes:
+            return
+        for shard_index, requests in enumerate(self.__request_queues):
+            requests.put(None)
+            if shard_index in self.__failed:
+                requests.cancel_join_thread()  # Nobody reads it, do not wait on exit to flush it
+        for process in self.__processes:
+            process.join()
+        self.__collector.join()
+        self.__processes, self.__request_queues = [], []
+
+    def submit(self, shard_index, method, *args):
+        """Sends a request to one shard and returns a Future of its answer."""
+        future = concurrent.futures.Future()
+        request_id = next(self.__request_ids)
+        with self.__lock:
+            error = self.__failed.get(shard_index)
+            if error is None:
+                self.__pending[request_id] = (shard_index, future)
+        if error is not None:
+            future.set_exception(shard_down(shard_index, error))
+            return future
+        self.__request_queues[shard_index].put((request_id, method, args))
+        return future
+
+    def submit_for_guest(self, guest_id, method, *args):
+        """Sends a request to the shard owning guest_id."""
+        return self.submit(shard_of(guest_id, self.__shard_count), method, guest_id, *args)
+
+    def broadcast(self, method, *args):
+        """Sends a request to every shard and returns their answers, in shard order."""
+        futures = [self.submit(shard_index, method, *args) for shard_index in range(self.__shard_count)]
+        return [future.result() for future in futures]
+
+    # Routed by guest
+
+    def register_guest(self, guest_id, name, email, password, phone):
+        return self.submit_for_guest(guest_id, "register_guest", name, email, password, phone).result()
+
+    def register_guests(self, rows):
+        """Registers (guest_id, name, email, password, phone) rows on their shards in parallel."""
+        futures = [self.submit_for_guest(row[0], "register_guest", *row[1:]) for row in rows]
+        return [future.result() for future in futures]
+
+    def fetch_guest(self, guest_id):
+        return self.submit_for_guest(guest_id, "fetch_guest").result()
+
+    def place_order(self, guest_id, lines, payment_method="Online", order_id=None, idempotency_key=None):
+        """
+        Places an order of (ticket type name, quantity, visit date) lines for
+        a guest and returns its history record. Order ids given by the caller
+        are checked for reuse within the guest's shard only; leave order_id
+        out to get an id unique across shards. Resubmitting with the same
+        idempotency_key returns the first order instead of placing another;
+        like order ids, keys are checked within the guest's shard.
+        """
+        return self.submit_for_guest(guest_id, "place_order", lines, payment_method, order_id,
+                                     idempotency_key).result()
+
+    def place_orders(self, orders):
+        """
+        Places many (guest_id, lines, payment_method) orders at once, every
+        shard working on its share in parallel. Returns one history record
+        per order, or the exception that order failed with.
+        """
+        futures = [self.submit_for_guest(guest_id, "place_order", lines, payment_method, None)
+                   for guest_id, lines, payment_method in orders]
+        return [future.exception() or future.result() for future in futures]
+
+    def cancel_order(self, guest_id, order_id):
+        return self.submit_for_guest(guest_id, "cancel_order", order_id).result()
+
+    def purchase_history(self, guest_id, cursor=None, page_size=20):
+        """Returns (records, next_cursor), see Guest.purchase_history_page()."""
+        return tuple(self.submit_for_guest(guest_id, "purchase_history", cursor, page_size).result())
+
+    # Fanned out to every shard and merged
+
+    def search_guests(self, text, limit=20):
+        found = [guest for answer in self.broadcast("search_guests", text, limit) for guest in answer]
+        found.sort(key=lambda guest: (guest["name"].casefold(), str(guest["guest_id"])))
+        return found[:limit]
+
+    def total_sales(self):
+        return sum(self.broadcast("total_sales"))
+
+    def sales(self, day=None):
+        """Returns the sales of a day summed over the shards, like the API's /sales."""
+        day = parse_date(day) or datetime.date.today()
+        total, by_ticket_type, by_payment_method = 0, {}, {}
+        for shard_total, shard_by_type, shard_by_method in self.broadcast("sales", day):
+            total += shard_total
+            for merged, shard in ((by_ticket_type, shard_by_type), (by_payment_method, shard_by_method)):
+                for key, (tickets, amount) in shard.items():
+                    total_of_key = merged.setdefault(key, [0, 0])
+                    total_of_key[0] += tickets
+                    total_of_key[1] += amount
+        return {"date": day.isoformat(), "total": total, "by_ticket_type": by_ticket_type,
+                "by_payment_method": by_payment_method}
+
+    def tickets_sold(self, ticket_type, visit_date):
+        return sum(self.broadcast("tickets_sold", ticket_type, parse_date(visit_date)))
+
+    def flush(self):
+        self.broadcast("flush")
+
+
+def main(argv=None):
+    from .benchmarks import SyntheticData  # Only the command line needs the generator
+
+    parser = argparse.ArgumentParser(description="Run a synthetic ticket drop on sharded worker processes.")
+    parser.add_argument("--shards", type=int, default=os.cpu_count())
+    parser.add_argument("--guests", type=int, default=1000)
+    parser.add_argument("--orders", type=int, default=10000)
+    parser.add_argument("--directory", default="shards")
+    parser.add_argument("--storage", choices=sorted(STORAGES), default="sqlite")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    data = SyntheticData(args.seed)
+    with ShardedBookingService(args.shards, args.directory, args.storage) as service:
+        service.register_guests(list(data.guest_rows(args.guests)))
+        orders = [
+            (guest_id, [(ticket.get_ticket_type(), 1, ticket.get_visit_date().isoformat()) for ticket in tickets],
+             payment_method)
+            for _, guest_id, tickets, _, payment_method in data.order_rows(args.orders, args.guests, lambda: 0)
+        ]
+        start = time.perf_counter()
+        results = service.place_orders(orders)
+        service.flush()
+        seconds = time.perf_counter() - start
+        failed = sum(isinstance(result, Exception) for result in results)
+        print(f"{len(orders) - failed} orders placed ({failed} failed) on {args.shards} shards "
+              f"in {seconds:.2f}s, {len(orders) / seconds:.0f} orders/s; "
+              f"total sales DHS{service.total_sales():.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+Snapshot plus write-ahead log persistence for keyed records.
+"""
+import os
+import pickle
+import struct
+import zlib
+
+
+class SnapshotLog:
+    """
+    Keeps a dict of records on disk as a compact snapshot file plus a
+    checksummed write-ahead log of the changes made since.
+
+    Every change is appended to ``<base_name>.wal`` as a record framed by its
+    length and CRC-32, and the log is fsync'ed once per ``sync_every``
+    changes. Once the log holds more records than ``compact_every`` and half
+    the live records, the whole dict is written to ``<base_name>.snapshot``
+    (to a temporary file first, then renamed over the old one) and the log
+    starts again empty. Loading reads the snapshot and replays only the log
+    tail, so startup time follows the number of live records, not the
+    length of the history.
+
+    A record cut short or damaged by a crash fails its length or checksum
+    test; it and anything after it are truncated off the log, and everything
+    before it is kept.
+
+    encode(value) and decode(key, stored) convert between the values kept in
+    memory and what is written to disk, e.g. objects and versioned records.
+    """
+
+    HEADER = struct.Struct(">II")  # Payload length, CRC-32 of the payload
+    SNAPSHOT_MAGIC = b"TBSNAP1\n"
+
+    def __init__(self, base_name, sync_every=32, compact_every=1000, encode=None, decode=None):
+        self.__base_name = base_name
+        self.__encode = encode
+        self.__decode = decode
+        self.__snapshot_file = base_name + ".snapshot"
+        self.__log_file = base_name + ".wal"
+        self.__sync_every = sync_every
+        self.__compact_every = compact_every
+        self.__records = None     # key -> value, loaded on first use
+        self.__sequence = 0       # Sequence number of the last change
+        self.__log_records = 0    # Changes in the log since the snapshot
+        self.__file = None
+        self.__unsynced = 0
+
+    def __getstate__(self):
+        return {
+            "base_name": self.__base_name,
+            "sync_every": self.__sync_every,
+            "compact_every": self.__compact_every,
+            "encode": self.__encode,
+            "decode": self.__decode,
+        }
+
+    def __setstate__(self, state):
+        self.__init__(state["base_name"], state["sync_every"], state["compact_every"],
+                      state.get("encode"), state.get("decode"))
+
+    def exists(self):
+        """Tells whether a snapshot or log has been written yet."""
+        return os.path.exists(self.__snapshot_file) or os.path.exists(self.__log_file)
+
+    def get_records(self):
+        """Returns the live records as a dict of key -> value. Do not modify it."""
+        if self.__records is None:
+            self.load()
+        return self.__records
+
+    def load(self):
+        """Reads the snapshot, then replays the log written after it."""
+        self.__records, self.__sequence = self.__read_snapshot()
+        self.__log_records = 0
+        if not os.path.exists(self.__log_file):
+            return self.__records
+
+        valid_end = 0
+        with open(self.__log_file, "rb") as file:
+            while True:
+                payload = self.__read_frame(file)
+                if payload is None:
+                    break
+                sequence, key, value, deleted = pickle.loads(payload)
+                valid_end = file.tell()
+                if sequence <= self.__sequence:
+                    continue  # Already in the snapshot, the log was not yet reset
+                if self.__decode is not None and not deleted:
+                    value = self.__decode(key, value)
+                self.__apply(key, value, deleted)
+                self.__sequence = sequence
+                self.__log_records += 1
+
+        if os.path.getsize(self.__log_file) > valid_end:
+            with open(self.__log_file, "r+b") as file:
+                file.truncate(valid_end)  # Cut off the torn record
+                os.fsync(file.fileno())
+        return self.__records
+
+    def __read_frame(self, file):
+        """Returns the next intact payload, or None at the end or at a torn record."""
+        header = file.read(self.HEADER.size)
+        if len(header) < self.HEADER.size:
+            return None
+        length, checksum = self.HEADER.unpack(header)
+        payload = file.read(length)
+        if len(payload) < length or zlib.crc32(payload) != checksum:
+            return None
+        return payload
+
+    def __read_snapshot(self):
+        try:
+            with open(self.__snapshot_file, "rb") as file:
+                magic = file.read(len(self.SNAPSHOT_MAGIC))
+                payload = self.__read_frame(file)
+        except FileNotFoundError:
+            return {}, 0
+        if magic != self.SNAPSHOT_MAGIC or payload is None:
+            # Snapshots are replaced atomically, so this is damage, not a crash:
+            # refuse to start rather than carry on with the records missing
+            raise ValueError(f"Snapshot {self.__snapshot_file} is damaged.")
+        sequence, items = pickle.loads(payload)
+        if self.__decode is not None:
+            return {key: self.__decode(key, value) for key, value in items}, sequence
+        return dict(items), sequence
+
+    def __apply(self, key, value, deleted):
+        self.__records.pop(key, None)  # A rewritten record moves to the end, like in the log
+        if not deleted:
+            self.__records[key] = value
+
+    def __append(self, key, value, deleted):
+        records = self.get_records()
+        self.__sequence += 1
+        stored = value if self.__encode is None or deleted else self.__encode(value)
+        payload = pickle.dumps((self.__sequence, key, stored, deleted), pickle.HIGHEST_PROTOCOL)
+        if self.__file is None:
+            self.__file = open(self.__log_file, "ab")
+        self.__file.write(self.HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+        self.__apply(key, value, deleted)
+        self.__log_records += 1
+
+        self.__unsynced += 1
+        if self.__log_records >= max(self.__compact_every, len(records) // 2):
+            self.compact()
+        elif self.__unsynced >= self.__sync_every:
+            self.flush()
+
+    def put(self, key, value):
+        """Stores a record, replacing any record with the same key."""
+        self.__append(key, value, False)
+
+    def delete(self, key):
+        """Removes a record. Returns False if there was none."""
+        if key not in self.get_records():
+            return False
+        self.__append(key, None, True)
+        return True
+
+    def compact(self):
+        """Writes every live record to a new snapshot and empties the log."""
+        records = self.get_records()
+        items = list(records.items())
+        if self.__encode is not None:
+            items = [(key, self.__encode(value)) for key, value in items]
+        payload = pickle.dumps((self.__sequence, items), pickle.HIGHEST_PROTOCOL)
+        temporary_file = self.__snapshot_file + ".tmp"
+        with open(temporary_file, "wb") as file:
+            file.write(self.SNAPSHOT_MAGIC)
+            file.write(self.HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_file, self.__snapshot_file)
+        sync_directory(self.__snapshot_file)
+
+        # Records up to the snapshot's sequence number are skipped on replay,
+        # so a crash before the log is emptied loses nothing
+        if self.__file is not None:
+            self.__file.close()
+        self.__file = open(self.__log_file, "wb")
+        self.__log_records = 0
+        self.__unsynced = 0
+
+    def flush(self):
+        """Writes buffered log records and fsyncs the log."""
+        if self.__file is not None and self.__unsynced:
+            self.__file.flush()
+            os.fsync(self.__file.fileno())
+        self.__unsynced = 0
+
+    def close(self):
+        self.flush()
+        if self.__file is not None:
+            self.__file.close()
+            self.__file = None
+
+
+def sync_directory(file_name):
+    """Fsyncs the directory of a file, so a rename in it survives a crash."""
+    if not hasattr(os, "O_DIRECTORY"):
+        return  # Not available on Windows, where renames are already durable
+    descriptor = os.open(os.path.dirname(os.path.abspath(file_name)), os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
@@ -0,0 +1,843 @@
+"""
+Persistence backends for the ticket booking system.
+"""
+import bisect
+import contextlib
+import datetime
+import itertools
+import os
+import pickle
+import sqlite3
+import struct
+import time
+
+from . import models, serialization
+from .metrics import RECORDS_WRITTEN, STORAGE_SECONDS, count, timed
+from .sales import SalesCounters
+from .snapshot_log import SnapshotLog
+
+
+class OrderJournal:
+    """
+    Purchase orders kept in a SnapshotLog keyed by order_id, as
+    (guest_id, order) pairs in memory and versioned order records on disk.
+    Committing an order appends one checksummed log record instead of
+    rewriting every order. Orders are indexed in memory by order_id, by
+    guest and by idempotency key.
+    """
+
+    LEGACY_HEADER = struct.Struct(">I")  # Framing of the journal used before checksums
+
+    def __init__(self, base_name="purchase_orders", sync_every=32, compact_every=1000,
+                 legacy_files=("purchase_orders.journal", "purchase_orders.pkl")):
+        self.__base_name = base_name
+        self.__sync_every = sync_every
+        self.__compact_every = compact_every
+        self.__legacy_files = tuple(legacy_files)
+        self.__log = SnapshotLog(base_name, sync_every, compact_every, encode_order, decode_order)
+        self.__guest_orders = {}  # guest_id -> {order_id: PurchaseOrder}
+        self.__keys = {}          # Idempotency key -> order_id
+        self.__loaded = False
+
+    def __getstate__(self):
+        # Only the configuration is pickled, the index is rebuilt from disk on demand
+        return {
+            "base_name": self.__base_name,
+            "sync_every": self.__sync_every,
+            "compact_every": self.__compact_every,
+            "legacy_files": self.__legacy_files,
+        }
+
+    def __setstate__(self, state):
+        # Journals pickled by earlier versions have only some of these keys
+        self.__init__(state.get("base_name", "purchase_orders"), state.get("sync_every", 32),
+                      state.get("compact_every", 1000),
+                      state.get("legacy_files", ("purchase_orders.journal", "purchase_orders.pkl")))
+
+    def get_base_name(self):
+        return self.__base_name
+
+    def load(self):
+        """
+        Rebuilds the order index from the latest snapshot and the log tail.
+        A torn record left by an interrupted write is cut off the end of the log.
+        """
+        if self.__log.exists():
+            self.__log.load()
+        else:
+            self.__import_legacy_orders()
+        self.__guest_orders = {}
+        self.__keys = {}
+        for order_id, (guest_id, order) in self.__log.get_records().items():
+            self.__index(order_id, guest_id, order)
+        self.__loaded = True
+
+    def __import_legacy_orders(self):
+        """Moves orders from the journal or whole-list pickle used before into the log."""
+        journal_file, pickle_file = self.__legacy_files
+        if os.path.exists(journal_file):
+            records = self.__read_legacy_journal(journal_file)
+        else:
+            records = [(None, order) for order in load_pickle_list(pickle_file)]
+        for guest_id, order in records:
+            if isinstance(order, models.PurchaseOrder):
+                self.__log.put(order.get_order_id(), (guest_id, order))
+            else:
+                self.__log.delete(order)  # Tombstone of a cancelled order
+        if records:
+            self.__log.compact()
+
+    def __read_legacy_journal(self, file_name):
+        records = []
+        with open(file_name, "rb") as file:
+            while True:
+                header = file.read(self.LEGACY_HEADER.size)
+                if len(header) < self.LEGACY_HEADER.size:
+                    break
+                (length,) = self.LEGACY_HEADER.unpack(header)
+                payload = file.read(length)
+                if len(payload) < length:
+                    break  # Torn last record
+                records.append(pickle.loads(payload))
+        return records
+
+    def __ensure_loaded(self):
+        if not self.__loaded:
+            self.load()
+
+    def __index(self, order_id, guest_id, order):
+        self.__guest_orders.setdefault(guest_id, {})[order_id] = order
+        if order.get_idempotency_key() is not None:
+            self.__keys[order.get_idempotency_key()] = order_id
+
+    def __unindex(self, order_id):
+        record = self.__log.get_records().get(order_id)
+        if record is not None:
+            del self.__guest_orders[record[0]][order_id]
+            self.__keys.pop(record[1].get_idempotency_key(), None)
+        return record
+
+    def append(self, order, guest_id=None):
+        """Appends an order to the journal and indexes it by its order_id."""
+        self.__ensure_loaded()
+        order_id = order.get_order_id()
+        self.__unindex(order_id)  # Later records replace earlier ones
+        self.__log.put(order_id, (guest_id, order))
+        self.__index(order_id, guest_id, order)
+
+    def remove(self, order_id):
+        """
+        Appends a tombstone for a cancelled order and drops it from the index.
+        Returns the id of the guest who placed it, or None.
+        """
+        self.__ensure_loaded()
+        record = self.__unindex(order_id)
+        if record is None:
+            return None
+        self.__log.delete(order_id)
+        return record[0]
+
+    def compact(self):
+        """Writes a fresh snapshot of every order and empties the log."""
+        self.__ensure_loaded()
+        self.__log.compact()
+
+    def flush(self):
+        """Writes buffered records and fsyncs the log."""
+        self.__log.flush()
+
+    def close(self):
+        self.__log.close()
+
+    def get(self, order_id):
+        """Returns the order with the given id, or None."""
+        self.__ensure_loaded()
+        record = self.__log.get_records().get(order_id)
+        return record[1] if record else None
+
+    def get_by_key(self, idempotency_key):
+        """Returns (guest_id, order) of the order with the given idempotency key, or None."""
+        self.__ensure_loaded()
+        order_id = self.__keys.get(idempotency_key)
+        return self.__log.get_records()[order_id] if order_id is not None else None
+
+    def get_guest_id(self, order_id):
+        """Returns the id of the guest who placed the order, or None."""
+        self.__ensure_loaded()
+        record = self.__log.get_records().get(order_id)
+        return record[0] if record else None
+
+    def get_orders(self):
+        """Returns all orders in the journal."""
+        self.__ensure_loaded()
+        return [order for _, order in self.__log.get_records().values()]
+
+    def get_guest_orders(self, guest_id):
+        """Returns the orders placed by one guest, in journal order."""
+        self.__ensure_loaded()
+        return list(self.__guest_orders.get(guest_id, {}).values())
+
+    def __len__(self):
+        self.__ensure_loaded()
+        return len(self.__log.get_records())
+
+
+def encode_order(value):
+    guest_id, order = value
+    return serialization.dump_order(order, guest_id)
+
+
+def decode_order(order_id, record):
+    return serialization.load_order(record)
+
+
+def load_pickle_list(file_name):
+    """
+    Reads a list from a whole-list pickle file written by earlier versions.
+    A missing or empty file holds no items; a damaged one raises ValueError
+    instead of being read as empty, so its data is not silently lost.
+    """
+    try:
+        with open(file_name, "rb") as file:
+            if not file.read(1):
+                return []
+            file.seek(0)
+            return pickle.load(file)
+    except FileNotFoundError:
+        return []
+    except (EOFError, pickle.UnpicklingError) as error:
+        raise ValueError(f"{file_name} is damaged and could not be imported.") from error
+
+
+class GuestPersistenceManager:
+    """
+    Write-behind persistence for guests.
+
+    Changed guests are queued in memory and handed to the storage backend,
+    and written to their guest_<id>.txt files, in one batch once
+    ``batch_size`` changes are waiting, once the oldest queued change is
+    ``flush_interval`` seconds old, or when flush() is called.
+    """
+
+    def __init__(self, storage, batch_size=100, flush_interval=2.0):
+        self.__storage = storage
+        self.__batch_size = batch_size
+        self.__flush_interval = flush_interval
+        self.__dirty = {}         # guest_id -> Guest waiting to be written
+        self.__deleted = set()    # guest_ids waiting to be removed from storage
+        self.__first_change = None
+        self.__suspended = 0      # Nesting depth of batch() blocks
+        self.__write_text_files = True
+
+    def __getstate__(self):
+        # Pending changes belong to the live process, only the configuration is pickled
+        return {
+            "storage": self.__storage,
+            "batch_size": self.__batch_size,
+            "flush_interval": self.__flush_interval,
+        }
+
+    def __setstate__(self, state):
+        self.__init__(state["storage"], state["batch_size"], state["flush_interval"])
+
+    def get_pending_count(self):
+        return len(self.__dirty) + len(self.__deleted)
+
+    def mark_dirty(self, guest):
+        """Queues a guest to be written with the next batch."""
+        self.__deleted.discard(guest.get_guest_id())
+        self.__dirty[guest.get_guest_id()] = guest  # Repeated changes are written once
+        self.__after_change()
+
+    def mark_deleted(self, guest_id):
+        """Queues a guest to be removed from storage with the next batch."""
+        self.__dirty.pop(guest_id, None)
+        self.__deleted.add(guest_id)
+        self.__after_change()
+
+    @contextlib.contextmanager
+    def batch(self, write_text_files=True):
+        """
+        Holds every change made inside the block and writes them all in a
+        single flush when the block exits, optionally without .txt files.
+        """
+        if not self.__suspended:
+            self.flush()  # Earlier changes keep their own text file setting
+        self.__suspended += 1
+        try:
+            yield self
+        finally:
+            self.__suspended -= 1
+            if not self.__suspended:
+                previous = self.__write_text_files
+                self.__write_text_files = write_text_files
+                try:
+                    self.flush()
+                finally:
+                    self.__write_text_files = previous
+
+    def __after_change(self):
+        if self.__first_change is None:
+            self.__first_change = time.monotonic()
+        if self.__suspended:
+            return
+        if self.get_pending_count() >= self.__batch_size:
+            self.flush()
+        else:
+            self.flush_if_due()
+
+    def flush_if_due(self):
+        """Flushes the queue if its oldest change has waited flush_interval seconds."""
+        if (self.__first_change is not None and not self.__suspended
+                and time.monotonic() - self.__first_change >= self.__flush_interval):
+            self.flush()
+
+    def flush(self):
+        """
+        Writes every queued change to storage in a single batch. If the
+        storage write fails the changes stay queued for the next flush.
+        """
+        if not self.__dirty and not self.__deleted:
+            return
+        dirty, deleted = self.__dirty, self.__deleted
+        if deleted:
+            self.__storage.delete_guests(deleted)
+        if dirty:
+            self.__storage.save_guests(list(dirty.values()))
+            count(RECORDS_WRITTEN, "guest", len(dirty))
+        self.__dirty, self.__deleted = {}, set()  # Only once storage has them
+        self.__first_change = None
+
+        if self.__write_text_files:
+            for guest in dirty.values():
+                guest.save_to_text_file()
+
+
+class Storage:
+    """
+    Interface of the persistence backends behind TicketBookingSystem.
+    Guests and events are loaded bound to the system passed in.
+    """
+
+    def save_guests(self, guests):
+        raise NotImplementedError
+
+    def delete_guests(self, guest_ids):
+        raise NotImplementedError
+
+    def load_guests(self, system):
+        raise NotImplementedError
+
+    def save_event(self, event):
+        raise NotImplementedError
+
+    def load_events(self, system):
+        raise NotImplementedError
+
+    def save_order(self, order, guest_id=None, sales_changes=()):
+        """
+        Saves an order together with the sales counter changes it caused,
+        as (date, ticket type name, payment method, tickets, amount) rows.
+        """
+        raise NotImplementedError
+
+    def delete_order(self, order_id, sales_changes=()):
+        """
+        Deletes a cancelled order together with the counter changes that take
+        it back out of the sales. Returns the id of the guest who placed it.
+        """
+        raise NotImplementedError
+
+    def fetch_order(self, order_id):
+        raise NotImplementedError
+
+    def fetch_orders_for_guest(self, guest_id, after=None, limit=None):
+        """Returns a guest's orders in history order, after an (order_date, order_id) key and up to limit."""
+        raise NotImplementedError
+
+    def fetch_order_by_key(self, idempotency_key):
+        """Returns (guest_id, order) of the order saved with an idempotency key, or None."""
+        raise NotImplementedError
+
+    def iter_orders(self):
+        """Yields (guest_id, order) for every stored order, for exports."""
+        raise NotImplementedError
+
+    def sales_by_date(self, day):
+        raise NotImplementedError
+
+    def count_tickets_sold(self):
+        """Returns a dict of (ticket type name, visit date) -> tickets sold."""
+        raise NotImplementedError
+
+    def max_ticket_id(self):
+        """Returns the highest numeric ticket id stored, or 0."""
+        raise NotImplementedError
+
+    def load_sales(self):
+        """Returns the saved sales counters as rows, see save_order()."""
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+
+class PickleStorage(Storage):
+    """
+    Stores guests and events in SnapshotLogs, as versioned records of plain
+    values (see serialization) rather than pickled objects so no record drags
+    the whole system along, purchase orders in an OrderJournal and the sales
+    counters in a SnapshotLog of their own. The whole-list guests.pkl and
+    events.pkl files of earlier versions are imported on first use, and the
+    counters of a store that has none are counted from the journal.
+    """
+
+    def __init__(self, guests_file="guests.pkl", events_file="events.pkl", order_journal=None,
+                 sync_every=32, compact_every=1000, sales_name="sales"):
+        self.__guests_file = guests_file  # Legacy files, the logs are named after them
+        self.__events_file = events_file
+        self.__sales_name = sales_name
+        self.__sync_every = sync_every
+        self.__compact_every = compact_every
+        self.__guest_log = SnapshotLog(os.path.splitext(guests_file)[0], sync_every, compact_every)
+        self.__event_log = SnapshotLog(os.path.splitext(events_file)[0], sync_every, compact_every)
+        self.__order_journal = (order_journal if order_journal is not None
+                                else OrderJournal(sync_every=sync_every, compact_every=compact_every))
+        # (date, ticket type name, payment method) -> (tickets, amount)
+        self.__sales_log = SnapshotLog(sales_name, sync_every, compact_every)
+        self.__imported = False
+        self.__sales_imported = False
+
+    def __getstate__(self):
+        return {
+            "guests_file": self.__guests_file,
+            "events_file": self.__events_file,
+            "order_journal": self.__order_journal,
+            "sync_every": self.__sync_every,
+            "compact_every": self.__compact_every,
+            "sales_name": self.__sales_name,
+        }
+
+    def __setstate__(self, state):
+        self.__init__(state["guests_file"], state["events_file"], state["order_journal"],
+                      state.get("sync_every", 32), state.get("compact_every", 1000),
+                      state.get("sales_name", "sales"))
+
+    def get_order_journal(self):
+        return self.__order_journal
+
+    def __import_legacy_files(self):
+        """Moves guests and events out of the whole-list pickle files, once."""
+        if self.__imported:
+            return
+        self.__imported = True
+        if not self.__guest_log.exists():
+            guests = load_pickle_list(self.__guests_file)
+            for guest in guests:
+                self.__guest_log.put(guest.get_guest_id(), serialization.dump_guest(guest))
+            if guests:
+                self.__guest_log.compact()
+        if not self.__event_log.exists():
+            events = load_pickle_list(self.__events_file)
+            for event in events:
+                self.__event_log.put(event.get_name(), serialization.dump_event(event))
+            if events:
+                self.__event_log.compact()
+
+    @timed(STORAGE_SECONDS, "save_guests")
+    def save_guests(self, guests):
+        self.__import_legacy_files()
+        for guest in guests:
+            self.__guest_log.put(guest.get_guest_id(), serialization.dump_guest(guest))
+
+    @timed(STORAGE_SECONDS, "delete_guests")
+    def delete_guests(self, guest_ids):
+        self.__import_legacy_files()
+        for guest_id in guest_ids:
+            self.__guest_log.delete(guest_id)
+
+    def load_guests(self, system):
+        self.__import_legacy_files()
+        return [serialization.load_guest(record, system, guest_id)
+                for guest_id, record in self.__guest_log.get_records().items()]
+
+    @timed(STORAGE_SECONDS, "save_event")
+    def save_event(self, event):
+        self.__import_legacy_files()
+        self.__event_log.put(event.get_name(), serialization.dump_event(event))
+
+    def load_events(self, system):
+        self.__import_legacy_files()
+        return [serialization.load_event(record, system, name)
+                for name, record in self.__event_log.get_records().items()]
+
+    def __sales_records(self):
+        """Returns the sales counters, counted from the journal once if they were never saved."""
+        if not self.__sales_imported:
+            self.__sales_imported = True
+            if not self.__sales_log.exists():
+                sales = SalesCounters()
+                for order in self.__order_journal.get_orders():
+                    sales.record_order(order)
+                self.__save_sales_changes(sales.get_rows())
+                self.__sales_log.compact()
+        return self.__sales_log.get_records()
+
+    def __save_sales_changes(self, changes):
+        records = self.__sales_log.get_records()
+        for day, ticket_type, payment_method, tickets, amount in changes:
+            key = (day, ticket_type, payment_method)
+            old_tickets, old_amount = records.get(key, (0, 0))
+            self.__sales_log.put(key, (old_tickets + tickets, old_amount + amount))
+
+    def compact(self):
+        """Writes fresh snapshots of guests, events, orders and sales and empties their logs."""
+        self.__import_legacy_files()
+        self.__guest_log.compact()
+        self.__event_log.compact()
+        self.__order_journal.compact()
+        self.__sales_records()
+        self.__sales_log.compact()
+
+    @timed(STORAGE_SECONDS, "save_order")
+    def save_order(self, order, guest_id=None, sales_changes=()):
+        self.__sales_records()  # Counted from the journal before it holds this order
+        self.__order_journal.append(order, guest_id)
+        self.__save_sales_changes(sales_changes)
+
+    @timed(STORAGE_SECONDS, "delete_order")
+    def delete_order(self, order_id, sales_changes=()):
+        self.__sales_records()
+        guest_id = self.__order_journal.remove(order_id)
+        self.__save_sales_changes(sales_changes)
+        return guest_id
+
+    def fetch_order(self, order_id):
+        return self.__order_journal.get(order_id)
+
+    def fetch_order_by_key(self, idempotency_key):
+        return self.__order_journal.get_by_key(idempotency_key)
+
+    def fetch_orders_for_guest(self, guest_id, after=None, limit=None):
+        # Journal order is the order they were placed in, so this sort has little to do
+        orders = sorted(self.__order_journal.get_guest_orders(guest_id), key=models.PurchaseOrder.history_key)
+        if after is not None:
+            orders = orders[bisect.bisect_right(orders, after, key=models.PurchaseOrder.history_key):]
+        return orders if limit is None else orders[:limit]
+
+    def iter_orders(self):
+        for order in self.__order_journal.get_orders():
+            yield self.__order_journal.get_guest_id(order.get_order_id()), order
+
+    def sales_by_date(self, day):
+        # A few counters per day and ticket type, far fewer than the orders
+        return sum(amount for (counter_day, _, _), (_, amount) in self.__sales_records().items()
+                   if counter_day == day)
+
+    def count_tickets_sold(self):
+        counts = {}
+        for order in self.__order_journal.get_orders():
+            for ticket in order.get_tickets():
+                key = (ticket.get_ticket_type(), ticket.get_visit_date())
+                counts[key] = counts.get(key, 0) + 1
+        return counts
+
+    def max_ticket_id(self):
+        return max((ticket.get_ticket_id()
+                    for order in self.__order_journal.get_orders()
+                    for ticket in order.get_tickets()
+                    if isinstance(ticket.get_ticket_id(), int)), default=0)
+
+    def load_sales(self):
+        return [key + value for key, value in self.__sales_records().items()]
+
+    @timed(STORAGE_SECONDS, "flush")
+    def flush(self):
+        self.__guest_log.flush()
+        self.__event_log.flush()
+        self.__order_journal.flush()
+        self.__sales_log.flush()
+
+    def close(self):
+        self.__guest_log.close()
+        self.__event_log.close()
+        self.__order_journal.close()
+        self.__sales_log.close()
+
+
+class SQLiteStorage(Storage):
+    """
+    Stores guests, events, purchase orders and tickets as rows in an SQLite
+    database in WAL mode. Orders are indexed by guest_id and order_date and
+    by idempotency key, and tickets by visit_date, so writes touch single
+    rows and history or sales queries are index lookups.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS guests (
+            guest_id PRIMARY KEY,
+            name TEXT NOT NULL,
+            email TEXT NOT NULL,
+            password TEXT NOT NULL,
+            phone TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS events (
+            name TEXT PRIMARY KEY,
+            start_date TEXT NOT NULL,
+            end_date TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS orders (
+            order_id PRIMARY KEY,
+            guest_id,
+            total_price NUMERIC NOT NULL,
+            order_date TEXT NOT NULL,
+            payment_method TEXT NOT NULL DEFAULT 'Unknown',
+            idempotency_key TEXT
+        );
+        CREATE INDEX IF NOT EXISTS orders_guest_date ON orders (guest_id, order_date);
+        CREATE INDEX IF NOT EXISTS orders_order_date ON orders (order_date);
+        CREATE TABLE IF NOT EXISTS tickets (
+            order_id NOT NULL,
+            position INTEGER NOT NULL,
+            ticket_id,
+            ticket_type TEXT NOT NULL,
+            price NUMERIC NOT NULL,
+            visit_date INTEGER NOT NULL,  -- Date ordinal, 0 when no date was given
+            PRIMARY KEY (order_id, position)
+        );
+        CREATE INDEX IF NOT EXISTS tickets_visit_date ON tickets (visit_date);
+        CREATE TABLE IF NOT EXISTS sales (
+            day TEXT NOT NULL,
+            ticket_type TEXT NOT NULL,
+            payment_method TEXT NOT NULL,
+            tickets INTEGER NOT NULL,
+            amount NUMERIC NOT NULL,
+            PRIMARY KEY (day, ticket_type, payment_method)
+        );
+    """
+
+    # Parameterised statements, prepared once and reused from sqlite3's statement cache
+    UPSERT_GUEST = "INSERT OR REPLACE INTO guests VALUES (?, ?, ?, ?, ?)"
+    DELETE_GUEST = "DELETE FROM guests WHERE guest_id = ?"
+    SELECT_GUESTS = "SELECT guest_id, name, email, password, phone FROM guests ORDER BY rowid"
+    UPSERT_EVENT = "INSERT OR REPLACE INTO events VALUES (?, ?, ?)"
+    SELECT_EVENTS = "SELECT name, start_date, end_date FROM events ORDER BY rowid"
+    # Not INSERT OR REPLACE: that would also silently delete another order holding the same idempotency key
+    UPSERT_ORDER = (
+        "INSERT INTO orders (order_id, guest_id, total_price, order_date, payment_method, idempotency_key) "
+        "VALUES (?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT (order_id) DO UPDATE SET guest_id = excluded.guest_id, "
+        "total_price = excluded.total_price, order_date = excluded.order_date, "
+        "payment_method = excluded.payment_method, idempotency_key = excluded.idempotency_key"
+    )
+    DELETE_TICKETS = "DELETE FROM tickets WHERE order_id = ?"
+    DELETE_ORDER = "DELETE FROM orders WHERE order_id = ?"
+    SELECT_ORDER_GUEST = "SELECT guest_id FROM orders WHERE order_id = ?"
+    INSERT_TICKET = "INSERT INTO tickets VALUES (?, ?, ?, ?, ?, ?)"
+    SELECT_ORDER = (
+        "SELECT order_id, total_price, order_date, payment_method, idempotency_key FROM orders "
+        "WHERE order_id = ?"
+    )
+    SELECT_ORDER_BY_KEY = (
+        "SELECT guest_id, order_id, total_price, order_date, payment_method, idempotency_key FROM orders "
+        "WHERE idempotency_key = ?"
+    )
+    SELECT_GUEST_ORDERS = (
+        "SELECT order_id, total_price, order_date, payment_method, idempotency_key FROM orders "
+        "WHERE guest_id = ? AND (order_date > ? OR (order_date = ? AND CAST(order_id AS TEXT) > ?)) "
+        "ORDER BY order_date, CAST(order_id AS TEXT) LIMIT ?"
+    )
+    SELECT_TICKETS = (
+        "SELECT ticket_id, price, visit_date, ticket_type FROM tickets "
+        "WHERE order_id = ? ORDER BY position"
+    )
+    SELECT_ALL_ORDERS = (
+        "SELECT o.order_id, o.guest_id, o.total_price, o.order_date, o.payment_method, o.idempotency_key, "
+        "t.ticket_id, t.price, t.visit_date, t.ticket_type "
+        "FROM orders o LEFT JOIN tickets t ON t.order_id = o.order_id ORDER BY o.rowid, t.position"
+    )
+    SUM_SALES = (
+        "SELECT COALESCE(SUM(total_price), 0) FROM orders "
+        "WHERE order_date >= ? AND order_date < ?"
+    )
+    COUNT_TICKETS = "SELECT ticket_type, visit_date, COUNT(*) FROM tickets GROUP BY ticket_type, visit_date"
+    MAX_TICKET_ID = "SELECT COALESCE(MAX(ticket_id), 0) FROM tickets WHERE typeof(ticket_id) = 'integer'"
+    UPSERT_SALES = (
+        "INSERT INTO sales VALUES (?, ?, ?, ?, ?) "
+        "ON CONFLICT (day, ticket_type, payment_method) DO UPDATE SET "
+        "tickets = tickets + excluded.tickets, amount = amount + excluded.amount"
+    )
+    SELECT_SALES = "SELECT day, ticket_type, payment_method, tickets, amount FROM sales"
+
+    def __init__(self, file_name="ticket_booking.db"):
+        self.__file_name = file_name
+        self.__connection = None  # Opened on first use
+
+    def __getstate__(self):
+        return {"file_name": self.__file_name}
+
+    def __setstate__(self, state):
+        self.__init__(state["file_name"])
+
+    def __connect(self):
+        if self.__connection is None:
+            # Callers serialise access themselves (the GUI thread, or the API's storage thread)
+            connection = sqlite3.connect(self.__file_name, cached_statements=64, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")  # Durable at WAL checkpoints
+            connection.executescript(self.SCHEMA)
+            columns = [row[1] for row in connection.execute("PRAGMA table_info(orders)")]
+            if "payment_method" not in columns:  # Database created before payment methods were kept
+                connection.execute(
+                    "ALTER TABLE orders ADD COLUMN payment_method TEXT NOT NULL DEFAULT 'Unknown'")
+            if "idempotency_key" not in columns:  # Database created before idempotency keys were kept
+                connection.execute("ALTER TABLE orders ADD COLUMN idempotency_key TEXT")
+            # Created here rather than in SCHEMA, which older databases run before gaining the column
+            connection.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS orders_idempotency_key ON orders (idempotency_key)")
+            (version,) = connection.execute("PRAGMA user_version").fetchone()
+            if version < 1:
+                # Group tickets used to be stored at the per-person price and
+                # multiplied by 10 when read, they are now stored as charged
+                with connection:
+                    connection.execute("UPDATE tickets SET price = price * 10 WHERE ticket_type = 'GROUP_TICKET'")
+                    connection.execute("PRAGMA user_version = 1")
+            self.__connection = connection
+        return self.__connection
+
+    @timed(STORAGE_SECONDS, "save_guests")
+    def save_guests(self, guests):
+        connection = self.__connect()
+        with connection:  # One transaction for the whole batch
+            connection.executemany(self.UPSERT_GUEST, [
+                (guest.get_guest_id(), guest.get_name(), guest.get_email(),
+                 guest.get_password(), guest.get_phone())
+                for guest in guests
+            ])
+
+    @timed(STORAGE_SECONDS, "delete_guests")
+    def delete_guests(self, guest_ids):
+        connection = self.__connect()
+        with connection:
+            connection.executemany(self.DELETE_GUEST, [(guest_id,) for guest_id in guest_ids])
+
+    def load_guests(self, system):
+        rows = self.__connect().execute(self.SELECT_GUESTS)
+        return [models.Guest(guest_id, name, email, password, phone, system, restored=True)
+                for guest_id, name, email, password, phone in rows]
+
+    @timed(STORAGE_SECONDS, "save_event")
+    def save_event(self, event):
+        connection = self.__connect()
+        with connection:
+            connection.execute(self.UPSERT_EVENT, (
+                event.get_name(), event.get_start_date().isoformat(), event.get_end_date().isoformat()))
+
+    def load_events(self, system):
+        rows = self.__connect().execute(self.SELECT_EVENTS)
+        return [models.Event(name, start_date, end_date, system, restored=True)
+                for name, start_date, end_date in rows]
+
+    @timed(STORAGE_SECONDS, "save_order")
+    def save_order(self, order, guest_id=None, sales_changes=()):
+        connection = self.__connect()
+        order_id = order.get_order_id()
+        with connection:  # The order, its tickets and the counters commit together
+            connection.execute(self.UPSERT_ORDER, (
+                order_id, guest_id, order.get_total_price(),
+                order.get_order_date().isoformat(), order.get_payment_method(), order.get_idempotency_key()))
+            connection.execute(self.DELETE_TICKETS, (order_id,))
+            connection.executemany(self.INSERT_TICKET, [
+                (order_id, position, ticket.get_ticket_id(), ticket.get_ticket_type(),
+                 ticket.get_price(), ticket.get_visit_ordinal())
+                for position, ticket in enumerate(order.get_tickets())
+            ])
+            connection.executemany(self.UPSERT_SALES, [
+                (day.isoformat(), ticket_type, payment_method, tickets, amount)
+                for day, ticket_type, payment_method, tickets, amount in sales_changes
+            ])
+
+    @timed(STORAGE_SECONDS, "delete_order")
+    def delete_order(self, order_id, sales_changes=()):
+        connection = self.__connect()
+        with connection:
+            row = connection.execute(self.SELECT_ORDER_GUEST, (order_id,)).fetchone()
+            connection.execute(self.DELETE_TICKETS, (order_id,))
+            connection.execute(self.DELETE_ORDER, (order_id,))
+            connection.executemany(self.UPSERT_SALES, [
+                (day.isoformat(), ticket_type, payment_method, tickets, amount)
+                for day, ticket_type, payment_method, tickets, amount in sales_changes
+            ])
+        return row[0] if row else None
+
+    def __build_order(self, order_id, total_price, order_date, payment_method, idempotency_key):
+        tickets = [
+            models.Ticket(ticket_id, price, visit_date, models.TicketType[ticket_type])
+            for ticket_id, price, visit_date, ticket_type
+            in self.__connect().execute(self.SELECT_TICKETS, (order_id,))
+        ]
+        return models.PurchaseOrder(order_id, tickets, total_price,
+                                    datetime.datetime.fromisoformat(order_date), payment_method,
+                                    idempotency_key)
+
+    def fetch_order(self, order_id):
+        row = self.__connect().execute(self.SELECT_ORDER, (order_id,)).fetchone()
+        return self.__build_order(*row) if row else None
+
+    def fetch_order_by_key(self, idempotency_key):
+        row = self.__connect().execute(self.SELECT_ORDER_BY_KEY, (idempotency_key,)).fetchone()
+        return (row[0], self.__build_order(*row[1:])) if row else None
+
+    def fetch_orders_for_guest(self, guest_id, after=None, limit=None):
+        order_date, order_id = (after[0].isoformat(), after[1]) if after is not None else ("", "")
+        limit = -1 if limit is None else limit  # LIMIT -1 means no limit
+        rows = self.__connect().execute(
+            self.SELECT_GUEST_ORDERS, (guest_id, order_date, order_date, order_id, limit)).fetchall()
+        return [self.__build_order(*row) for row in rows]
+
+    def iter_orders(self):
+        # One pass over a join instead of a tickets query per order
+        rows = self.__connect().execute(self.SELECT_ALL_ORDERS)
+        for (order_id, guest_id, total_price, order_date, payment_method, idempotency_key), ticket_rows \
+                in itertools.groupby(rows, key=lambda row: row[:6]):
+            tickets = [
+                models.Ticket(ticket_id, price, visit_date, models.TicketType[ticket_type])
+                for *_, ticket_id, price, visit_date, ticket_type in ticket_rows
+                if ticket_type is not None  # An order without tickets joins to one empty row
+            ]
+            yield guest_id, models.PurchaseOrder(order_id, tickets, total_price,
+                                                 datetime.datetime.fromisoformat(order_date), payment_method,
+                                                 idempotency_key)
+
+    def sales_by_date(self, day):
+        start = datetime.datetime.combine(day, datetime.time())
+        end = start + datetime.timedelta(days=1)
+        (total,) = self.__connect().execute(
+            self.SUM_SALES, (start.isoformat(), end.isoformat())).fetchone()
+        return total
+
+    def count_tickets_sold(self):
+        rows = self.__connect().execute(self.COUNT_TICKETS)
+        return {(ticket_type, visit_date): count for ticket_type, visit_date, count in rows}
+
+    def max_ticket_id(self):
+        (ticket_id,) = self.__connect().execute(self.MAX_TICKET_ID).fetchone()
+        return ticket_id
+
+    def load_sales(self):
+        rows = self.__connect().execute(self.SELECT_SALES)
+        return [(datetime.date.fromisoformat(day), ticket_type, payment_method, tickets, amount)
+                for day, ticket_type, payment_method, tickets, amount in rows]
+
+    @timed(STORAGE_SECONDS, "flush")
+    def flush(self):
+        if self.__connection is not None:
+            self.__connection.commit()
+
+    def close(self):
+        if self.__connection is not None:
+            self.__connection.close()
+            self.__connection = None
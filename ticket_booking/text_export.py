@@ -0,0 +1,149 @@
+"""
+Background writer for the guest_<id>.txt and event_<name>.txt exports.
+"""
+import os
+import queue
+import threading
+import time
+
+from .metrics import REGISTRY, TEXT_FILE_SECONDS
+
+
+class TextExporter:
+    """
+    Writes text exports on worker threads, so callers (Tk callbacks among
+    them) only format the text and never wait on the disk.
+
+    Each file is handled by one worker, picked by the file's path, so writes
+    to a file happen in order. A file queued again before its worker gets to
+    it is written once, with the latest text. Workers take paths from bounded
+    queues; when ``max_pending`` files are waiting, write() blocks until the
+    workers catch up. Every file is written to a temporary file first and
+    renamed over the old one, so readers never see half a file.
+
+    With ``consolidated_file`` set, every export goes into that one file
+    instead, one section per guest or event, rewritten in the background
+    whenever sections change.
+    """
+
+    def __init__(self, directory=".", workers=2, max_pending=1000, consolidated_file=None):
+        self.__directory = directory
+        self.__worker_count = max(1, workers)
+        self.__max_pending = max_pending
+        self.__consolidated_file = consolidated_file
+        self.__pending = {}       # Path -> latest text not yet written
+        self.__sections = {}      # Consolidated mode: file name -> text, in the order first seen
+        self.__lock = threading.Lock()
+        self.__queues = []        # One bounded queue of paths per worker
+        self.__threads = []
+        self.__errors = []
+
+    def __getstate__(self):
+        # Queued writes and threads belong to the live process, only the configuration is pickled
+        return {
+            "directory": self.__directory,
+            "workers": self.__worker_count,
+            "max_pending": self.__max_pending,
+            "consolidated_file": self.__consolidated_file,
+        }
+
+    def __setstate__(self, state):
+        self.__init__(state["directory"], state["workers"], state["max_pending"], state["consolidated_file"])
+
+    def is_consolidated(self):
+        return self.__consolidated_file is not None
+
+    def get_pending_count(self):
+        with self.__lock:
+            return len(self.__pending)
+
+    def preload(self, file_name, text):
+        """
+        Adds a section to the consolidated file without writing it, for
+        guests and events loaded from storage. Does nothing otherwise.
+        """
+        if self.__consolidated_file is not None:
+            with self.__lock:
+                self.__sections[file_name] = text
+
+    def write(self, file_name, text):
+        """Queues text to be written to file_name, replacing any text still queued for it."""
+        if self.__consolidated_file is not None:
+            with self.__lock:
+                self.__sections[file_name] = text
+            file_name, text = self.__consolidated_file, None  # Rendered from the sections when written
+        path = os.path.abspath(os.path.join(self.__directory, file_name))  # Resolved now, in case of chdir
+
+        with self.__lock:
+            queued = path in self.__pending
+            self.__pending[path] = text
+        if not queued:
+            self.__start()
+            self.__queues[hash(path) % self.__worker_count].put(path)
+
+    def __start(self):
+        if self.__threads:
+            return
+        with self.__lock:
+            if self.__threads:
+                return
+            queue_size = max(1, self.__max_pending // self.__worker_count)
+            for number in range(self.__worker_count):
+                paths = queue.Queue(queue_size)
+                thread = threading.Thread(target=self.__work, args=(paths,),
+                                          name=f"text-export-{number}", daemon=True)
+                self.__queues.append(paths)
+                self.__threads.append(thread)
+                thread.start()
+
+    def __work(self, paths):
+        while True:
+            path = paths.get()
+            try:
+                if path is None:
+                    return
+                with self.__lock:
+                    text = self.__pending.pop(path)
+                    if text is None:
+                        text = "\n".join(self.__sections.values())
+                self.__write_file(path, text)
+            except OSError as error:
+                with self.__lock:
+                    self.__errors.append(error)
+            finally:
+                paths.task_done()
+
+    @staticmethod
+    def __write_file(path, text):
+        start = time.perf_counter() if REGISTRY.enabled else None
+        temporary_path = path + ".tmp"
+        with open(temporary_path, "w") as file:
+            file.write(text)
+        os.replace(temporary_path, path)
+        if start is not None:
+            TEXT_FILE_SECONDS.observe("background_write", time.perf_counter() - start)
+
+    def flush(self):
+        """
+        Waits until every queued file is written. Raises the first OSError
+        a worker met since the last flush, if any.
+        """
+        for paths in list(self.__queues):
+            paths.join()
+        with self.__lock:
+            errors, self.__errors = self.__errors, []
+        if errors:
+            raise errors[0]
+
+    def close(self):
+        """Writes every queued file and stops the workers."""
+        try:
+            self.flush()
+        finally:
+            with self.__lock:
+                queues, threads = self.__queues, self.__threads
+                self.__queues, self.__threads = [], []
+            for paths in queues:
+                paths.put(None)
+            for thread in threads:
+                thread.join()